@@ -40,6 +40,9 @@ class Application(BaseApplication):
         args_parser.add_argument('--socket',
                                  help='Path to daemon\'s control socket',
                                  default=DEFAULT_SOCKET_PATH)
+        args_parser.add_argument('--detach',
+                                 help='Run command in background, see jobs, attach and cancel commands',
+                                 action='store_true')
 
         params, cmd_args = args_parser.parse_known_args(args[1:])
         parsed_args = dict(arg.split('=', 2) for arg in cmd_args)
@@ -54,19 +57,20 @@ class Application(BaseApplication):
         self.depend(get_console_logger(self))
         self.depend(ClientService)
 
-    def _run(self, socket: str, command: str, optional: dict):
+    def _run(self, socket: str, command: str, optional: dict, detach=False):
         """ Actually run app
 
         :param str socket:
         :param str command:
         :param dict optional:
+        :param bool detach:
         :return None:
         """
         try:
             client = self.registry.control_client
 
             client.socket = socket
-            client.communicate(command, optional)
+            client.communicate(command, optional, detach)
 
         except Exception as e:
             raise RuntimeError('Failed to communicate with daemon process at %s: %s' % (socket or '[DEFAULT]', e))
@@ -81,7 +85,7 @@ class Application(BaseApplication):
             params, cmd_args = self._parse_args(args)
 
             self._init()
-            self._run(params.socket, params.command, cmd_args)
+            self._run(params.socket, params.command, cmd_args, params.detach)
 
         except (KeyboardInterrupt, SystemExit):
             self.stop(EXIT_CODE_TERM)
@@ -17,6 +17,7 @@ from dewyatochka.core import daemon
 from dewyatochka.core.application import Application
 from dewyatochka.core.application import EXIT_CODE_TERM
 from dewyatochka.core.log import get_daemon_logger
+from dewyatochka.core.metrics.tracing import tracer, Tracer
 from dewyatochka.core.config import get_common_config, get_conferences_config, get_extensions_config
 from dewyatochka.core.config.factory import COMMON_CONFIG_DEFAULT_PATH
 from dewyatochka.core.network.xmpp import service as xmpp
@@ -24,6 +25,7 @@ from dewyatochka.core.plugin.loader import LoaderService
 from dewyatochka.core.plugin.subsystem.message import service as m_service
 from dewyatochka.core.plugin.subsystem.helper import service as h_service
 from dewyatochka.core.plugin.subsystem.control import service as c_service
+from dewyatochka.core.utils.http import HTTPService
 
 from . import process
 
@@ -47,14 +49,18 @@ class DaemonApp(Application):
         args_parser.add_argument('--nodaemon',
                                  help='Do not detach process from console',
                                  action='store_true')
+        args_parser.add_argument('--profile-startup',
+                                 help='Import all the plugin modules on start and log time taken by each one',
+                                 action='store_true')
 
         return args_parser.parse_args(args[1:])
 
-    def _init(self, config_file: str, daemon_mode=True):
+    def _init(self, config_file: str, daemon_mode=True, profile_startup=False):
         """ Init dependent services
 
         :param str config_file:
         :param bool daemon_mode:
+        :param bool profile_startup: Log plugin modules import time
         :return None:
         """
         self.depend(get_common_config(self, config_file))
@@ -65,6 +71,8 @@ class DaemonApp(Application):
         self.depend(get_extensions_config(self))
 
         self.depend(LoaderService)
+        self.registry.plugins_loader.configure(self.registry.config.global_section.get('plugins_index'),
+                                               profile_startup)
         self.depend(m_service.Service)
         self.depend(h_service.Service)
         self.depend(c_service.Service)
@@ -73,8 +81,23 @@ class DaemonApp(Application):
         self.depend(process.Scheduler)
         self.depend(process.Daemon)
         self.depend(process.Control)
+        self.depend(process.MetricsExporter)
+        self.depend(process.Watchdog)
         self.depend(process.ChatManager, 'bot')
         self.depend(xmpp.XMPPConnectionManager)
+        self.depend(HTTPService)
+
+    def _enable_tracing(self):
+        """ Enable plugins invocations tracing if configured
+
+        :return None:
+        """
+        config = self.registry.config.section('tracing')
+        if str(config.get('enabled', '')).lower() not in ('1', 'yes', 'true', 'on'):
+            return
+
+        thresholds = {option[len('slow_'):]: value for option, value in config.items() if option.startswith('slow_')}
+        tracer.enable(int(config.get('size', Tracer.DEFAULT_SIZE)), thresholds, self.registry.log('tracing'))
 
     def _run(self, daemon_mode=True):
         """ Actually run app
@@ -86,6 +109,8 @@ class DaemonApp(Application):
             daemon.detach(lambda *_: self.stop())
             daemon.acquire_lock(self.registry.config.global_section.get('lock'))
 
+        self._enable_tracing()
+
         self.registry.message_plugin_provider.load()
         self.registry.helper_plugin_provider.load()
         self.registry.control_plugin_provider.load()
@@ -95,6 +120,8 @@ class DaemonApp(Application):
         self.registry.scheduler.start()
         self.registry.chat_manager.start()
         self.registry.control.start()
+        self.registry.metrics.start()
+        self.registry.watchdog.start()
 
         self.wait()
 
@@ -107,7 +134,7 @@ class DaemonApp(Application):
         try:
             params = self._parse_args(args)
 
-            self._init(params.config, not params.nodaemon)
+            self._init(params.config, not params.nodaemon, params.profile_startup)
             self._run(not params.nodaemon)
 
         except (KeyboardInterrupt, SystemExit):
@@ -10,6 +10,8 @@ Classes
     Bootstrap       -- Launches bootstrap tasks
     CriticalService -- Critical service interface
     Control         -- Listens for a control commands
+    MetricsExporter -- Serves runtime metrics to be scraped
+    Watchdog        -- Reports threads count exceeding a limit
 """
 
 import time
@@ -18,6 +20,9 @@ from functools import reduce
 from abc import ABCMeta, abstractmethod
 
 from dewyatochka.core.application import Application, Service
+from dewyatochka.core.metrics import registry as metrics
+from dewyatochka.core.metrics.exporter import Exporter
+from dewyatochka.core.metrics.threads import ThreadsWatchdog
 from dewyatochka.core.network.service import ConnectionManager
 from dewyatochka.core.network.service import ChatManager as ChatManager_
 from dewyatochka.core.network.entity import Message, Participant
@@ -25,7 +30,8 @@ from dewyatochka.core.plugin.subsystem.helper.service import Environment
 from dewyatochka.core.plugin.subsystem.control.network import SocketListener
 from dewyatochka.core.plugin.subsystem.control.network import Message as CTLMessage
 
-__all__ = ['Scheduler', 'Daemon', 'ChatManager', 'Bootstrap', 'CriticalService', 'Control']
+__all__ = ['Scheduler', 'Daemon', 'ChatManager', 'Bootstrap', 'CriticalService', 'Control', 'MetricsExporter',
+           'Watchdog']
 
 
 def _thread_wait(thread: threading.Thread, log=None):
@@ -290,26 +296,40 @@ class Control(_HelperService):
         :return None:
         """
         try:
-            plugins_provider = self.application.registry.control_plugin_provider
-
+            workers = int(self.config.get('workers', SocketListener.DEFAULT_WORKERS))
             with self._listener as listener:
-                for command, source in listener.commands:
-                    try:
-                        self.log.info('Received a control command "%s"', command.name)
-                        plugins_provider.get_command(command.name)(logger=self.log, command=command, source=source)
-
-                    except RuntimeError:
-                        source.send(CTLMessage(error='Command %s is not supported' % command.name).encode())
+                listener.serve(self._handle_command, workers)
 
         except Exception as e:
             self.application.fatal_error(self._log_name(), e)
 
+    def _handle_command(self, command: CTLMessage, source):
+        """ Handle a command in a listener worker thread
+
+        :param CTLMessage command:
+        :param socket.socket source:
+        :return None:
+        """
+        plugins_provider = self.application.registry.control_plugin_provider
+        try:
+            self.log.info('Received a control command "%s"', command.name)
+            command_plugin = plugins_provider.get_command(command.name)
+        except RuntimeError:
+            source.send(CTLMessage(error='Command %s is not supported' % command.name).encode())
+        else:
+            if command.detach:
+                job = plugins_provider.jobs.start(command, command_plugin, self.log)
+                source.send(CTLMessage(text='Started job #%d' % job.id, job=job.id).encode())
+            else:
+                command_plugin(logger=self.log, command=command, source=source)
+
     def wait(self):
         """ Wait until stopped
 
         :return None:
         """
         self._listener.close()
+        self.application.registry.control_plugin_provider.jobs.cancel_all()
         super().wait()
 
     @classmethod
@@ -321,6 +341,122 @@ class Control(_HelperService):
         return 'control'
 
 
+class MetricsExporter(_HelperService):
+    """ Serves runtime metrics to be scraped
+
+    Disabled unless an address to listen on is configured
+    """
+
+    def __init__(self, application: Application):
+        """ Initialize service & attach an application to it
+
+        :param Application application:
+        """
+        super().__init__(application)
+
+        address = self.config.get('address')
+        self._exporter = Exporter(address, log=self.log) if address else None
+
+        metrics.gauge('threads_active', 'Threads alive', callback=threading.active_count)
+
+    def start(self):
+        """ Start service if enabled
+
+        :return None:
+        """
+        if self._exporter is not None:
+            super().start()
+
+    def _run(self):
+        """ Do job
+
+        :return None:
+        """
+        try:
+            refresh_interval = float(self.config.get('refresh_interval', Exporter.DEFAULT_REFRESH_INTERVAL))
+            with self._exporter as exporter:
+                self.log.info('Serving metrics on %s', exporter.address)
+                exporter.serve(refresh_interval)
+
+        except Exception as e:
+            self.log.error('Metrics export stopped: %s', e)
+
+    def wait(self):
+        """ Wait until stopped
+
+        :return None:
+        """
+        if self._exporter is not None:
+            self._exporter.close()
+        super().wait()
+
+    @classmethod
+    def name(cls) -> str:
+        """ Get service unique name
+
+        :return str:
+        """
+        return 'metrics'
+
+
+class Watchdog(_HelperService):
+    """ Reports threads count exceeding a limit
+
+    Disabled unless a threads limit is configured
+    """
+
+    # Interval between threads count checks by default (sec.)
+    DEFAULT_CHECK_INTERVAL = 10
+
+    def __init__(self, application: Application):
+        """ Initialize service & attach an application to it
+
+        :param Application application:
+        """
+        super().__init__(application)
+
+        threads_limit = self.config.get('threads_limit')
+        self._watchdog = ThreadsWatchdog(int(threads_limit), self.log) if threads_limit else None
+
+    def start(self):
+        """ Start service if enabled
+
+        :return None:
+        """
+        if self._watchdog is not None:
+            super().start()
+
+    def _run(self):
+        """ Do job
+
+        :return None:
+        """
+        try:
+            check_interval = float(self.config.get('check_interval', self.DEFAULT_CHECK_INTERVAL))
+            while self.application.running:
+                self._watchdog.check()
+                self.application.sleep(check_interval)
+
+        except Exception as e:
+            self.log.error('Threads watchdog stopped: %s', e)
+
+    def wait(self):
+        """ Wait until stopped
+
+        :return None:
+        """
+        if self._watchdog is not None:
+            super().wait()
+
+    @classmethod
+    def name(cls) -> str:
+        """ Get service unique name
+
+        :return str:
+        """
+        return 'watchdog'
+
+
 class ChatManager(ChatManager_, CriticalService):
     """ Chat manager service implementation """
 
@@ -385,7 +521,7 @@ class ChatManager(ChatManager_, CriticalService):
         try:
             # noinspection PyTypeChecker
             for message in connection_manager.input_stream:
-                self.log.debug('Received a message from %s <<< %s >>>', message.sender, str(message))
+                self.log.debug('Received a message from %s <<< %s >>>', message.sender, message)
                 self._start_message_processing(message)
 
         except Exception as e:
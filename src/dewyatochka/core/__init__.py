@@ -15,10 +15,11 @@ Sub-packages
     daemon  -- Dewyatochka daemon implementation package
     utils   -- Miscellaneous useful modules
     data    -- Data access
+    metrics -- Runtime metrics collection
 
 Modules
 =======
     application -- Something like "framework" to build all dewyatochka apps on
 """
 
-__all__ = ['application', 'config', 'daemon', 'data', 'log', 'network', 'plugin', 'utils']
+__all__ = ['application', 'config', 'daemon', 'data', 'log', 'metrics', 'network', 'plugin', 'utils']
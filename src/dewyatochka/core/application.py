@@ -218,6 +218,9 @@ class Registry:
             raise RuntimeError('Service "%s" is already registered' % name)
 
         self._services[name] = service
+        if isinstance(name, str) and not hasattr(type(self), name):
+            # Accessible as a plain attribute, __getattr__ is not involved on each access then
+            self.__dict__[name] = service
 
     def add_service(self, service: Service):
         """ Add a service to the registry
@@ -31,6 +31,7 @@ class ConfigContainer(Service):
         """
         super().__init__(application)
         self._data = {}
+        self._source = None
 
     def load(self, config_parser: ConfigSource):
         """ Load config data from source
@@ -39,8 +40,21 @@ class ConfigContainer(Service):
         :return ConfigContainer:
         """
         self._data = config_parser.read()
+        self._source = config_parser
         return self
 
+    def reload(self):
+        """ Re-read config data from the source loaded before
+
+        Data is replaced at once, sections got before are left as they are
+
+        :return ConfigContainer:
+        """
+        if self._source is None:
+            raise RuntimeError('Config is not loaded')
+
+        return self.load(self._source)
+
     def section(self, section: str, require=False) -> dict:
         """ Get config section
 
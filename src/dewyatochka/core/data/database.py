@@ -12,6 +12,7 @@ Classes
     AbstractStorage     -- Very abstract storage
     SQLIteStorage       -- SQLIte based storage
     ThreadSafeSingleton -- Abstract metaclass for singletons implementations
+    FullTextIndex       -- SQLite FTS5 index over text columns of a regular table
 
 Functions
 =========
@@ -20,15 +21,18 @@ Functions
 """
 
 import os
+import time
 import threading
 from abc import ABCMeta, abstractproperty
 from functools import wraps
 
-from sqlalchemy import Table, MetaData, create_engine
+from sqlalchemy import Table, MetaData, DDL, create_engine, event, text
 from sqlalchemy.orm import mapper, sessionmaker, Session, reconstructor
 
+from dewyatochka.core.metrics import registry as metrics
+
 __all__ = ['ObjectMeta', 'StoreableObject', 'CacheableObject', 'UnmappedFieldError',
-           'StorageMeta', 'AbstractStorage', 'SQLIteStorage', 'ThreadSafeSingleton',
+           'StorageMeta', 'AbstractStorage', 'SQLIteStorage', 'ThreadSafeSingleton', 'FullTextIndex',
            'readable_query', 'writable_query']
 
 
@@ -145,22 +149,40 @@ def __sync_read_completed_event(obj) -> _SyncRFreeDbEvent:
     return __sync_wrapper_get_attr(obj, '__r_completed', _SyncRFreeDbEvent())
 
 
+def _get_query_time_histograms(method: callable, mode: str) -> tuple:
+    """ Get query lock wait time and execution time histograms
+
+    :param callable method: Storage method
+    :param str mode: read / write
+    :return tuple:
+    """
+    labels = {'query': '.'.join((method.__module__, method.__qualname__)), 'mode': mode}
+    return (metrics.histogram('db_lock_wait_seconds', 'Time waiting for concurrent queries completion', labels),
+            metrics.histogram('db_query_seconds', 'Storage query execution time', labels))
+
+
 def readable_query(method: callable) -> callable:
     """ Readable query decorator
 
     :param callable method: Storage method
     :return: callable
     """
+    lock_wait_time, query_time = _get_query_time_histograms(method, 'read')
+
     @wraps(method)
     def _wrapper(self_, *args, **kwargs):
         w_completed_event = __sync_write_completed_event(self_)
         r_completed_event = __sync_read_completed_event(self_)
 
         try:
+            requested_at = time.perf_counter()
             w_completed_event.wait()
             r_completed_event.clear()
 
+            started_at = time.perf_counter()
+            lock_wait_time.observe(started_at - requested_at)
             res = method(self_, *args, **kwargs)
+            query_time.observe(time.perf_counter() - started_at)
 
         finally:
             r_completed_event.set()
@@ -176,17 +198,23 @@ def writable_query(method: callable) -> callable:
     :param callable method: Storage method
     :return: callable
     """
+    lock_wait_time, query_time = _get_query_time_histograms(method, 'write')
+
     @wraps(method)
     def _wrapper(self_, *args, **kwargs):
         w_completed_event = __sync_write_completed_event(self_)
         r_completed_event = __sync_read_completed_event(self_)
 
         try:
+            requested_at = time.perf_counter()
             r_completed_event.wait()
             w_completed_event.wait()
             w_completed_event.clear()
 
+            started_at = time.perf_counter()
+            lock_wait_time.observe(started_at - requested_at)
             res = method(self_, *args, **kwargs)
+            query_time.observe(time.perf_counter() - started_at)
 
         finally:
             w_completed_event.set()
@@ -224,6 +252,13 @@ class ThreadSafeSingleton(type):
 
             return cls.__instance
 
+    def detached(cls):
+        """ Create a separate instance apart from the singleton one
+
+        :return object:
+        """
+        return super().__call__()
+
 
 class ObjectMeta(type, metaclass=ABCMeta):
     """ Abstract metaclass for ORM objects """
@@ -517,3 +552,156 @@ class SQLIteStorage(AbstractStorage):
             os.unlink(self.path)
 
         super().create()
+
+
+class FullTextIndex:
+    """ SQLite FTS5 index over text columns of a regular table
+
+    Index is an external content FTS5 table kept in sync with
+    the source table by triggers, so it is created automatically
+    along with the source table and needs no maintenance later
+    """
+
+    # Key to store an index instance in table info
+    _TABLE_INFO_KEY = 'fts_index'
+
+    # Suffixes of triggers keeping index in sync (after insert, delete, update)
+    _TRIGGERS_SUFFIXES = ('ai', 'ad', 'au')
+
+    def __init__(self, table: Table, *columns: str):
+        """ Create an index and bind it to the table
+
+        :param Table table: Source table
+        :param tuple columns: Indexed columns names
+        """
+        self._table = table
+        self._columns = columns
+        self._name = table.name + '_fts'
+
+        table.info[self._TABLE_INFO_KEY] = self
+        for statement in self._ddl:
+            event.listen(table, 'after_create', DDL(statement))
+
+    @property
+    def name(self) -> str:
+        """ Get FTS table name
+
+        :return str:
+        """
+        return self._name
+
+    @property
+    def _ddl(self) -> list:
+        """ Get index DDL statements
+
+        :return list:
+        """
+        params = {
+            'fts': self._name,
+            'table': self._table.name,
+            'pk': self._table.primary_key.columns.values()[0].name,
+            'columns': ', '.join(self._columns),
+            'new_values': ', '.join('new.' + column for column in self._columns),
+            'old_values': ', '.join('old.' + column for column in self._columns),
+        }
+
+        statements = (
+            'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} '
+            'USING fts5({columns}, content={table}, content_rowid={pk})',
+
+            'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN '
+            'INSERT INTO {fts} (rowid, {columns}) VALUES (new.{pk}, {new_values}); '
+            'END',
+
+            'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN '
+            'INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES (\'delete\', old.{pk}, {old_values}); '
+            'END',
+
+            'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN '
+            'INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES (\'delete\', old.{pk}, {old_values}); '
+            'INSERT INTO {fts} (rowid, {columns}) VALUES (new.{pk}, {new_values}); '
+            'END',
+        )
+
+        return [statement.format(**params) for statement in statements]
+
+    def create(self, session: Session):
+        """ Create index on already existing table if it is not created yet
+
+        Index is populated with the data already stored in the source table
+
+        :param Session session: DB session
+        :return None:
+        """
+        exists = session \
+            .execute(text('SELECT 1 FROM sqlite_master WHERE type = \'table\' AND name = :name'),
+                     {'name': self._name}) \
+            .first()
+
+        if exists:
+            for statement in self._ddl:
+                session.execute(statement)
+        else:
+            self.rebuild(session)
+
+    def suspend(self, session: Session):
+        """ Stop keeping index in sync with the source table
+
+        Useful for bulk inserts as the whole index rebuild is much faster
+        than a lot of separate updates. Index remains stale until rebuilt
+
+        :param Session session: DB session
+        :return None:
+        """
+        for suffix in self._TRIGGERS_SUFFIXES:
+            session.execute('DROP TRIGGER IF EXISTS {0}_{1}'.format(self._name, suffix))
+
+    def rebuild(self, session: Session):
+        """ Resume index maintenance and populate index from the source table from scratch
+
+        :param Session session: DB session
+        :return None:
+        """
+        for statement in self._ddl:
+            session.execute(statement)
+        session.execute('INSERT INTO {0} ({0}) VALUES (\'rebuild\')'.format(self._name))
+
+    def search(self, session: Session, query: str, limit=None) -> list:
+        """ Get source table primary keys matching the query, most relevant first
+
+        :param Session session: DB session
+        :param str query: FTS5 query expression
+        :param int limit: Max results count
+        :return list:
+        """
+        statement = 'SELECT rowid FROM {0} WHERE {0} MATCH :query ORDER BY rank'.format(self._name)
+        params = {'query': query}
+        if limit is not None:
+            statement += ' LIMIT :limit'
+            params['limit'] = limit
+
+        return [row[0] for row in session.execute(text(statement), params)]
+
+    @staticmethod
+    def escape_query(user_input: str, prefix=True) -> str:
+        """ Convert user input into a safe FTS5 query matching all the words
+
+        :param str user_input: Raw words
+        :param bool prefix: Match words as prefixes
+        :return str:
+        """
+        words = user_input.split()
+        if not words:
+            raise ValueError('Search query is empty')
+
+        suffix = '*' if prefix else ''
+        return ' '.join('"%s"%s' % (word.replace('"', '""'), suffix) for word in words)
+
+    @classmethod
+    def of(cls, table: Table):
+        """ Get an index bound to the table
+
+        :param Table table:
+        :return FullTextIndex:
+        """
+        return table.info[cls._TABLE_INFO_KEY]
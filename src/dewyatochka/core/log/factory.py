@@ -25,6 +25,9 @@ _INIT_MESSAGE = 'Logging started'
 _FORMAT_DAEMON_DEFAULT = '%(asctime)s :: %(levelname)-8s :: [%(name)s] %(message)s'
 _FORMAT_CONSOLE_DEFAULT = '%(levelname)s: %(message)s'
 
+# Size suffixes multipliers
+_SIZE_MULTIPLIERS = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
 
 def get_daemon_logger(application: Application, use_stdout=False) -> LoggingService:
     """ Get configured logger instance for daemonizeable apps
@@ -35,11 +38,18 @@ def get_daemon_logger(application: Application, use_stdout=False) -> LoggingServ
     """
     logger = LoggingService(application)
 
-    log_format = _FORMAT_DAEMON_DEFAULT
-    log_file = application.registry.config.section('log').get('file', _DEFAULT_LOG_FILE_PATH)
+    config = application.registry.config.section('log')
+    log_format = FORMAT_JSON if config.get('format') == FORMAT_JSON else _FORMAT_DAEMON_DEFAULT
+    log_file = config.get('file', _DEFAULT_LOG_FILE_PATH)
 
     try:
-        handler = STDOUTHandler(log_format) if use_stdout else FileHandler(log_format, log_file)
+        if use_stdout:
+            handler = STDOUTHandler(log_format)
+        else:
+            handler = _create_file_handler(log_format, log_file, config)
+            if _is_enabled(config.get('async')):
+                handler = AsyncHandler(handler, int(config.get('queue_size', AsyncHandler.DEFAULT_QUEUE_SIZE)))
+
         logger.register_handler(handler)
         logger().info(_INIT_MESSAGE)
     except:
@@ -49,6 +59,45 @@ def get_daemon_logger(application: Application, use_stdout=False) -> LoggingServ
     return logger
 
 
+def _create_file_handler(log_format: str, log_file: str, config: dict) -> FileHandler:
+    """ Create log file handler, rotating one if rotation is configured
+
+    :param str log_format:
+    :param str log_file:
+    :param dict config: Log config section
+    :return FileHandler:
+    """
+    max_size = _parse_size(config.get('rotate_size', '0'))
+    when = config.get('rotate_when')
+    if not max_size and not when:
+        return FileHandler(log_format, log_file)
+
+    return RotatingFileHandler(log_format, log_file, max_size, when,
+                               int(config.get('backup_count', RotatingFileHandler.DEFAULT_BACKUP_COUNT)),
+                               _is_enabled(config.get('compress')))
+
+
+def _parse_size(size: str) -> int:
+    """ Parse size in bytes with an optional K, M or G suffix
+
+    :param str size:
+    :return int:
+    """
+    size = str(size).strip().upper()
+    multiplier = _SIZE_MULTIPLIERS.get(size[-1:], 1)
+
+    return int(size[:-1] if multiplier > 1 else size) * multiplier
+
+
+def _is_enabled(value) -> bool:
+    """ Check if a yes / no option is enabled
+
+    :param value: Option value
+    :return bool:
+    """
+    return str(value or '').lower() in ('1', 'yes', 'true', 'on')
+
+
 def get_console_logger(application: Application) -> LoggingService:
     """ Get console app logger
 
@@ -6,21 +6,105 @@ Classes
 =======
     Handler       -- Abstract output handler
     STDOUTHandler -- Console output handler
-    FileHandler   -- Text file output handler
-    NullHandler   -- Empty handler (stub)
+    FileHandler         -- Text file output handler
+    RotatingFileHandler -- Text file output handler rotating files by size or time
+    NullHandler         -- Empty handler (stub)
+    AsyncHandler        -- Writes records to another handler in background
+    JSONFormatter       -- Formats records as JSON objects
+
+Attributes
+==========
+    FORMAT_JSON -- Log format name to output records as JSON lines
 """
 
+import os
 import sys
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
 import logging
+import logging.handlers
 import fcntl
 import termios
 import struct
 from abc import ABCMeta, abstractmethod
-from threading import Lock
+from threading import Lock, Thread, Event
+
+from dewyatochka.core.metrics import registry as metrics
 
 from .service import LEVEL_PROGRESS, LEVEL_NAME_PROGRESS
 
-__all__ = ['Handler', 'STDOUTHandler', 'FileHandler', 'NullHandler']
+__all__ = ['Handler', 'STDOUTHandler', 'FileHandler', 'RotatingFileHandler', 'NullHandler', 'AsyncHandler',
+           'JSONFormatter', 'FORMAT_JSON']
+
+
+# Log format name to output records as JSON lines
+FORMAT_JSON = 'json'
+
+
+class JSONFormatter(logging.Formatter):
+    """ Formats records as JSON objects, one per line
+
+    Besides the common fields, plugin and conference are output
+    when attached by log context and latency when passed in `extra`
+    """
+
+    # Optional record attributes output when set
+    _OPTIONAL_FIELDS = ('plugin', 'conference', 'latency')
+
+    # Encoder is reused as json.dumps() creates a new one on each call with non-default options
+    _encoder = json.JSONEncoder(ensure_ascii=False)
+
+    def __init__(self):
+        """ Create formatter """
+        super().__init__()
+        self._second = None
+        self._time_format = None
+
+    def _format_time(self, record: logging.LogRecord) -> str:
+        """ Format record time in ISO 8601 with milliseconds, formatted second is reused
+
+        :param logging.LogRecord record:
+        :return str:
+        """
+        second = int(record.created)
+        if second != self._second:
+            local_time = time.localtime(second)
+            self._time_format = time.strftime('%Y-%m-%dT%H:%M:%S.%%03d%z', local_time)
+            self._second = second
+
+        return self._time_format % record.msecs
+
+    def format(self, record: logging.LogRecord) -> str:
+        """ Format record
+
+        :param logging.LogRecord record:
+        :return str:
+        """
+        data = {
+            'time': self._format_time(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+
+        for field in self._OPTIONAL_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value if isinstance(value, (int, float)) else str(value)
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+
+        return self._encoder.encode(data)
 
 
 class Handler(metaclass=ABCMeta):
@@ -34,10 +118,10 @@ class Handler(metaclass=ABCMeta):
     def __init__(self, log_format: str):
         """ Set logging service
 
-        :param str log_format:
+        :param str log_format: Format string or FORMAT_JSON
         """
         self._handler = self._create_handler()
-        self._handler.setFormatter(logging.Formatter(log_format))
+        self._handler.setFormatter(JSONFormatter() if log_format == FORMAT_JSON else logging.Formatter(log_format))
 
         self._lock = Lock()
 
@@ -86,20 +170,71 @@ class Handler(metaclass=ABCMeta):
         :return None:
         """
         with self._lock:
-            if record.levelno == LEVEL_PROGRESS:
-                record.levelname = LEVEL_NAME_PROGRESS
-                self.__enable_cr_mode()
-                try:
-                    padding = ' ' * (self.__terminal_width - len(self.handler.format(record)))
-                except:
-                    padding = ''
-                record.msg += padding
+            self.__handle(record)
+
+    def handle_batch(self, records: list):
+        """ Log records batch, regular lines are written at once
+
+        :param list records: Log records instances to emit
+        :return None:
+        """
+        with self._lock:
+            lines = []
+            for record in records:
+                if record.levelno == LEVEL_PROGRESS or self.__in_cr_mode \
+                        or getattr(self.handler, 'stream', None) is None:
+                    # Progress output and lazy stream opening are left to the single record handling
+                    self.__write(lines)
+                    lines = []
+                    self.__handle(record)
+                elif self.handler.filter(record):
+                    try:
+                        lines.append((self.handler.format(record) + self.handler.terminator, record))
+                    except Exception:
+                        self.handler.handleError(record)
+
+            self.__write(lines)
+
+    def __handle(self, record: logging.LogRecord):
+        """ Log single record (lock is acquired by caller)
 
-            elif self.__in_cr_mode:
-                self.__disable_cr_mode()
-                self.handler.stream.write(self.handler.terminator)
+        :param logging.LogRecord record: Log record instance to emit
+        :return None:
+        """
+        if record.levelno == LEVEL_PROGRESS:
+            record.levelname = LEVEL_NAME_PROGRESS
+            self.__enable_cr_mode()
+            try:
+                padding = ' ' * (self.__terminal_width - len(self.handler.format(record)))
+            except:
+                padding = ''
+            record.msg += padding
 
-            self.handler.handle(record)
+        elif self.__in_cr_mode:
+            self.__disable_cr_mode()
+            self.handler.stream.write(self.handler.terminator)
+
+        self.handler.handle(record)
+
+    def __write(self, lines: list):
+        """ Write formatted lines to the stream and flush it once
+
+        :param list lines: List of (line, record) tuples
+        :return None:
+        """
+        if not lines:
+            return
+
+        try:
+            self.handler.stream.write(''.join(line for line, _ in lines))
+            self.handler.flush()
+
+            # Files rotation is checked once for a batch
+            if isinstance(self.handler, logging.handlers.BaseRotatingHandler) \
+                    and self.handler.shouldRollover(lines[-1][1]):
+                self.handler.doRollover()
+        except Exception:
+            self.handler.handleError(lines[-1][1])
 
     @property
     def handler(self):
@@ -149,6 +284,139 @@ class FileHandler(Handler):
         return logging.FileHandler(self._file, delay=True)
 
 
+class RotatingFileHandler(FileHandler):
+    """ Text file output handler rotating files by size or time
+
+    Rotated files are optionally compressed with gzip, compression
+    is done in background not to block logging, the next rotation
+    waits for it though if started before compression is finished.
+    Compression failure is logged with the next record handled
+    """
+
+    # Rotated files kept by default
+    DEFAULT_BACKUP_COUNT = 7
+
+    def __init__(self, log_format: str, file_path: str, max_size=0, when=None, backup_count=DEFAULT_BACKUP_COUNT,
+                 compress=False):
+        """ Set logging service
+
+        :param str log_format:
+        :param str file_path:
+        :param int max_size: Rotate file on reaching the size (bytes)
+        :param str when: Rotate file on time interval (midnight, h, d, w0-w6), overrides max_size
+        :param int backup_count: Rotated files kept
+        :param bool compress: Compress rotated files with gzip
+        """
+        if not max_size and not when:
+            raise ValueError('Either max size or time interval is required for log files rotation')
+        if backup_count <= 0:
+            raise ValueError('At least one rotated log file must be kept')
+
+        self._max_size = max_size
+        self._when = when
+        self._backup_count = backup_count
+        self._compress = compress
+        self._compressor = None
+        self._compression_error = None
+        super().__init__(log_format, file_path)
+
+    def _create_handler(self) -> logging.StreamHandler:
+        """ Create new inner handler instance
+
+        :return logging.Handler:
+        """
+        if self._when:
+            handler = logging.handlers.TimedRotatingFileHandler(self._file, self._when,
+                                                                backupCount=self._backup_count, delay=True)
+        else:
+            handler = logging.handlers.RotatingFileHandler(self._file, maxBytes=self._max_size,
+                                                           backupCount=self._backup_count, delay=True)
+
+        if self._compress:
+            handler.namer = self._get_compressed_name
+            handler.rotator = self._rotate
+
+        return handler
+
+    def _get_compressed_name(self, name: str) -> str:
+        """ Get rotated file name
+
+        Names are requested on rotation start, before the files rotated
+        earlier are renamed, so the last compression is waited for here
+
+        :param str name: Rotated file name assigned by handler
+        :return str:
+        """
+        self.wait_compression()
+        return name + '.gz'
+
+    def _rotate(self, source: str, dest: str):
+        """ Move current file away and compress it in background
+
+        :param str source: Current file path
+        :param str dest: Compressed rotated file path
+        :return None:
+        """
+        uncompressed = dest[:-len('.gz')]
+        os.rename(source, uncompressed)
+
+        self._compressor = Thread(name='log[Compressor]', target=self._compress_file, args=(uncompressed, dest),
+                                  daemon=True)
+        self._compressor.start()
+
+    def _compress_file(self, source: str, dest: str):
+        """ Compress file with gzip and remove the original
+
+        :param str source: File path
+        :param str dest: Compressed file path
+        :return None:
+        """
+        try:
+            with open(source, 'rb') as source_file, gzip.open(dest + '.tmp', 'wb') as dest_file:
+                shutil.copyfileobj(source_file, dest_file)
+            os.replace(dest + '.tmp', dest)
+            os.remove(source)
+        except OSError as e:
+            # Can not be logged right here: the handler may be locked by a rotation waiting for this thread
+            self._compression_error = e
+
+    def _report_compression_error(self):
+        """ Log the last compression failure if any (handler lock must not be held)
+
+        :return None:
+        """
+        error = self._compression_error
+        if error is not None:
+            self._compression_error = None
+            logging.getLogger(__name__).error('Failed to compress rotated log file: %s', error)
+
+    def handle(self, record: logging.LogRecord):
+        """ Do whatever it takes to actually log the specified logging record.
+
+        :param logging.LogRecord record: Log record instance to emit
+        :return None:
+        """
+        super().handle(record)
+        self._report_compression_error()
+
+    def handle_batch(self, records: list):
+        """ Log records batch, regular lines are written at once
+
+        :param list records: Log records instances to emit
+        :return None:
+        """
+        super().handle_batch(records)
+        self._report_compression_error()
+
+    def wait_compression(self):
+        """ Wait until the last rotated file is compressed
+
+        :return None:
+        """
+        if self._compressor is not None:
+            self._compressor.join()
+
+
 class NullHandler(Handler):
     """ Empty handler (stub) """
 
@@ -158,3 +426,179 @@ class NullHandler(Handler):
         :return logging.Handler:
         """
         return logging.NullHandler()
+
+
+class AsyncHandler:
+    """ Writes records to another handler in background
+
+    Records are put to a queue with no lock taken and written
+    by a single writer thread in batches. Records not fitting into
+    the queue are dropped and counted, the count is reported to the
+    log as soon as the queue is drained. The writer is started on
+    the first record logged by a process, so the handler survives
+    a fork made on daemonization
+    """
+
+    # Queue size by default
+    DEFAULT_QUEUE_SIZE = 10000
+
+    # Max records written at once
+    _BATCH_SIZE = 512
+
+    # Max time to wait for queue to be drained on flush (sec.)
+    _FLUSH_TIMEOUT = 5
+
+    def __init__(self, target: Handler, queue_size=DEFAULT_QUEUE_SIZE):
+        """ Wrap a handler
+
+        :param Handler target: Handler to write records to
+        :param int queue_size: Max records waiting to be written
+        """
+        self._target = target
+        self._queue_size = queue_size
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._pid = None
+        self._lock = Lock()
+
+        self._dropped = 0
+        self._dropped_reported = 0
+        self._dropped_counter = metrics.counter('log_records_dropped_total', 'Log records dropped on queue overflow')
+        metrics.gauge('log_queue_size', 'Log records waiting to be written', callback=self._get_queue_size)
+
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(before=self.flush, after_in_child=self._reset)
+
+    def __getattr__(self, item):
+        """ Inherit target handler methods/properties
+
+        :returns: Depending on target attributes
+        """
+        return getattr(self._target, item)
+
+    @property
+    def target(self) -> Handler:
+        """ Get handler records are written to
+
+        :return Handler:
+        """
+        return self._target
+
+    @property
+    def dropped(self) -> int:
+        """ Get count of records dropped on queue overflow
+
+        :return int:
+        """
+        return self._dropped
+
+    def _get_queue_size(self) -> int:
+        """ Get count of records waiting to be written
+
+        :return int:
+        """
+        return self._queue.qsize()
+
+    def handle(self, record: logging.LogRecord):
+        """ Enqueue record to be written
+
+        :param logging.LogRecord record: Log record instance to emit
+        :return None:
+        """
+        if self._pid != os.getpid():
+            self._start()
+
+        if self._queue.qsize() >= self._queue_size:
+            self._dropped += 1
+            self._dropped_counter.inc()
+            return
+
+        # Message is rendered now as its args may be changed until written
+        try:
+            record.msg = record.getMessage()
+        except Exception:
+            self._target.handler.handleError(record)
+            return
+
+        record.args = None
+        self._queue.put(record)
+
+    def _start(self):
+        """ Start writer in the current process
+
+        :return None:
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._writer = Thread(name='log[Writer]', target=self._write, daemon=True)
+                self._writer.start()
+                self._pid = os.getpid()
+
+    def _reset(self):
+        """ Forget writer of the parent process (in a child after fork)
+
+        :return None:
+        """
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._pid = None
+        self._lock = Lock()
+
+    def _write(self):
+        """ Write records until stopped
+
+        :return None:
+        """
+        while True:
+            items = [self._queue.get()]
+            try:
+                while len(items) < self._BATCH_SIZE:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            records = [item for item in items if isinstance(item, logging.LogRecord)]
+            if records:
+                self._target.handle_batch(records)
+            if self._queue.empty():
+                self._report_dropped()
+
+            # Flush & stop markers
+            for item in items:
+                if isinstance(item, Event):
+                    item.set()
+            if None in items:
+                break
+
+    def _report_dropped(self):
+        """ Log records dropped since the last report
+
+        :return None:
+        """
+        dropped = self._dropped - self._dropped_reported
+        if dropped:
+            self._dropped_reported += dropped
+            self._target.handle(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': logging.getLevelName(logging.WARNING),
+                'msg': '%d log records dropped on queue overflow', 'args': (dropped,),
+            }))
+
+    def flush(self):
+        """ Wait until records enqueued are written
+
+        :return None:
+        """
+        if self._pid == os.getpid() and self._writer.is_alive():
+            written = Event()
+            self._queue.put(written)
+            written.wait(self._FLUSH_TIMEOUT)
+
+    def close(self):
+        """ Write records enqueued and stop writer
+
+        :return None:
+        """
+        if self._pid == os.getpid() and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(self._FLUSH_TIMEOUT)
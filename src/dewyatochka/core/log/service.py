@@ -7,6 +7,10 @@ Classes
     LoggingService -- Logging app service
     LoggerWrapper  -- Extended logging.Logger
 
+Functions
+=========
+    log_context -- Attach fields to records logged by the current thread
+
 Attributes
 ==========
     LEVEL_PROGRESS      -- Special level no for progress messages
@@ -14,16 +18,83 @@ Attributes
 """
 
 import logging
+import threading
 
 from dewyatochka.core.application import Application, Service
 
-__all__ = ['LoggingService', 'LoggerWrapper', 'LEVEL_PROGRESS', 'LEVEL_NAME_PROGRESS']
+__all__ = ['LoggingService', 'LoggerWrapper', 'LEVEL_PROGRESS', 'LEVEL_NAME_PROGRESS', 'log_context']
 
 
 # Special level no for progress messages
 LEVEL_PROGRESS = 25
 LEVEL_NAME_PROGRESS = 'PROGRESS'
 
+# Fields attached to records by the current thread
+_context = threading.local()
+
+# Log record factory records with context fields are created by
+_record_factory = logging.getLogRecordFactory()
+
+
+class _LogContext:
+    """ Context manager attaching fields to records (not a generator for speed, used on each plugin call) """
+
+    __slots__ = ('_fields', '_outer_fields')
+
+    def __init__(self, fields: dict):
+        """ Create context
+
+        :param dict fields:
+        """
+        self._fields = fields
+        self._outer_fields = None
+
+    def __enter__(self):
+        """ Attach fields
+
+        :return None:
+        """
+        self._outer_fields = outer_fields = getattr(_context, 'fields', None)
+        _context.fields = dict(outer_fields, **self._fields) if outer_fields else self._fields
+
+    def __exit__(self, *_):
+        """ Restore fields of outer context
+
+        :param tuple _:
+        :return None:
+        """
+        _context.fields = self._outer_fields
+
+
+def log_context(**fields) -> _LogContext:
+    """ Attach fields to records logged by the current thread in with-block
+
+    Fields are set as record attributes (as `extra` does), so
+    they must not be passed in `extra` while the context is active
+
+    :param dict fields:
+    :return _LogContext:
+    """
+    return _LogContext(fields)
+
+
+def _create_record(*args, **kwargs) -> logging.LogRecord:
+    """ Create log record with context fields attached
+
+    :param tuple args: Record factory args
+    :param dict kwargs: Record factory kw args
+    :return logging.LogRecord:
+    """
+    record = _record_factory(*args, **kwargs)
+    fields = getattr(_context, 'fields', None)
+    if fields:
+        record.__dict__.update(fields)
+
+    return record
+
+
+logging.setLogRecordFactory(_create_record)
+
 
 class LoggerWrapper:
     """ Extended logging.Logger """
@@ -31,6 +102,18 @@ class LoggerWrapper:
     # Already instantiated loggers by name
     __instances = {}
 
+    @classmethod
+    def get(cls, name: str):
+        """ Get named logger wrapper, instantiated once for each name
+
+        :param str name: Logger name
+        :return LoggerWrapper:
+        """
+        try:
+            return cls.__instances[name]
+        except KeyError:
+            return cls.__instances.setdefault(name, cls(logging.getLogger(name)))
+
     def __init__(self, inner_logger: logging.Logger):
         """ Specify inner logger instance
 
@@ -134,4 +217,4 @@ class LoggingService(Service):
         :param str name: Module name to display in log
         :return LoggerWrapper:
         """
-        return LoggerWrapper(logging.getLogger(name or self._log_name()))
+        return LoggerWrapper.get(name or self._log_name())
@@ -0,0 +1,14 @@
+# -*- coding: UTF-8
+
+""" Runtime metrics
+
+Modules
+=======
+    registry -- Metrics registry, counters, gauges and histograms
+    exporter -- Metrics export in Prometheus text format
+    tracing  -- Plugins invocations tracing
+    profiler -- Statistical sampling profiler
+    threads  -- Threads census
+"""
+
+__all__ = ['registry', 'exporter', 'tracing', 'profiler', 'threads']
@@ -0,0 +1,335 @@
+# -*- coding: UTF-8
+
+""" Metrics export in Prometheus text format
+
+Metrics are rendered periodically in the serving thread, a scrape
+just sends the last snapshot rendered, so it never collects metrics
+and never waits for anything except the client socket
+
+Classes
+=======
+    Exporter -- Metrics snapshot HTTP server
+
+Functions
+=========
+    render -- Render metrics in Prometheus text exposition format
+
+Attributes
+==========
+    CONTENT_TYPE -- Content type of metrics rendered
+"""
+
+import os
+import math
+import time
+import socket
+import selectors
+from threading import Lock
+
+from .registry import default_registry
+
+__all__ = ['Exporter', 'render', 'CONTENT_TYPE']
+
+
+# Content type of metrics rendered
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value) -> str:
+    """ Format sample value
+
+    :param float value:
+    :return str:
+    """
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        if math.isnan(value):
+            return 'NaN'
+        return repr(value)
+
+    return str(int(value))
+
+
+def _format_labels(labels: dict) -> list:
+    """ Format labels as name="value" pairs
+
+    :param dict labels:
+    :return list:
+    """
+    return ['%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for name, value in sorted(labels.items())]
+
+
+def _render_samples(metric) -> list:
+    """ Render metric samples lines
+
+    :param Metric metric:
+    :return list:
+    """
+    value = metric.value
+    labels = _format_labels(metric.labels)
+    labels_str = '{%s}' % ','.join(labels) if labels else ''
+    if metric.type != 'histogram':
+        return [] if value is None else ['%s%s %s' % (metric.name, labels_str, _format_value(value))]
+
+    lines = []
+    accumulated = 0
+    bucket_labels = '{%s' % ''.join(label + ',' for label in labels)
+    for bound, count in zip(value.buckets + (float('inf'),), value.counts):
+        accumulated += count
+        lines.append('%s_bucket%sle="%s"} %d' % (metric.name, bucket_labels, _format_value(float(bound)), accumulated))
+    lines.append('%s_sum%s %s' % (metric.name, labels_str, _format_value(float(value.sum))))
+    lines.append('%s_count%s %d' % (metric.name, labels_str, value.count))
+
+    return lines
+
+
+def render(registry=None, log=None) -> bytes:
+    """ Render metrics in Prometheus text exposition format
+
+    Metrics failed to collect (a gauge callback failure) are skipped
+
+    :param MetricsRegistry registry: Registry to render, default one if not specified
+    :param logging.Logger log: Logger to report collection failures to
+    :return bytes:
+    """
+    lines = []
+    described = None
+    for metric in (registry or default_registry).metrics:
+        try:
+            samples = _render_samples(metric)
+        except Exception as e:
+            if log is not None:
+                log.warning('Failed to collect metric %s: %s', metric, e)
+            continue
+
+        if metric.name != described:
+            described = metric.name
+            if metric.description:
+                lines.append('# HELP %s %s' % (metric.name, metric.description.replace('\\', '\\\\')))
+            lines.append('# TYPE %s %s' % (metric.name, metric.type))
+        lines += samples
+
+    return ''.join(line + '\n' for line in lines).encode()
+
+
+class Exporter:
+    """ Metrics snapshot HTTP server
+
+    Listens on a TCP (host:port) or UNIX (file path) socket,
+    connections are served one by one in the serving thread
+    """
+
+    # Snapshot refresh interval by default (sec.)
+    DEFAULT_REFRESH_INTERVAL = 5
+
+    # Time allowed to a client to send a request and receive a response
+    _CLIENT_TIMEOUT = 1
+
+    # Max request head size read
+    _REQUEST_SIZE = 4096
+
+    def __init__(self, address: str, registry=None, log=None):
+        """ Create exporter
+
+        :param str address: host:port or UNIX socket path
+        :param MetricsRegistry registry: Registry to export, default one if not specified
+        :param logging.Logger log: Logger to report collection failures to
+        """
+        self._address = address
+        self._registry = registry or default_registry
+        self._log = log
+
+        self._snapshot = b''
+        self._socket = None
+        self._wakeup = None
+        self._status_change = Lock()
+        self._opened = False
+        self._serving = False
+
+    @property
+    def _unix(self) -> bool:
+        """ Check if UNIX socket is used
+
+        :return bool:
+        """
+        return ':' not in self._address
+
+    @property
+    def _bind_address(self):
+        """ Get socket address to bind to
+
+        :return str|tuple:
+        """
+        if self._unix:
+            return self._address
+
+        host, port = self._address.rsplit(':', 1)
+        return host.strip('[]') or 'localhost', int(port)
+
+    @property
+    def address(self):
+        """ Get actual address listened (useful when port 0 is configured)
+
+        :return str|tuple:
+        """
+        return self._socket.getsockname() if self._socket is not None else self._bind_address
+
+    @property
+    def snapshot(self) -> bytes:
+        """ Get metrics rendered last time
+
+        :return bytes:
+        """
+        return self._snapshot
+
+    def refresh(self):
+        """ Render metrics snapshot
+
+        :return None:
+        """
+        self._snapshot = render(self._registry, self._log)
+
+    def open(self):
+        """ Open socket
+
+        :return None:
+        """
+        with self._status_change:
+            if self._unix:
+                self._socket = socket.socket(socket.AF_UNIX)
+            else:
+                host, port = self._bind_address
+                self._socket = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET)
+                self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+            self._socket.bind(self._bind_address)
+            self._socket.listen()
+            self._socket.setblocking(False)
+            self._wakeup = socket.socketpair()
+            self._opened = True
+
+    def serve(self, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        """ Serve scrapes until closed
+
+        :param float refresh_interval: Snapshot refresh interval (sec.)
+        :return None:
+        """
+        with self._status_change:
+            if not self._opened:
+                return
+            self._serving = True
+
+        selector = selectors.DefaultSelector()
+        selector.register(self._socket, selectors.EVENT_READ)
+        selector.register(self._wakeup[0], selectors.EVENT_READ)
+
+        try:
+            refresh_at = 0
+            while self._opened:
+                if refresh_at <= time.monotonic():
+                    self.refresh()
+                    refresh_at = time.monotonic() + refresh_interval
+
+                for key, _ in selector.select(max(0, refresh_at - time.monotonic())):
+                    if key.fileobj is self._socket:
+                        self._accept()
+
+        finally:
+            selector.close()
+            with self._status_change:
+                self._serving = False
+                self._release()
+
+    def _accept(self):
+        """ Respond to all the clients connected
+
+        :return None:
+        """
+        while True:
+            try:
+                connection = self._socket.accept()[0]
+            except (BlockingIOError, InterruptedError):
+                break
+
+            try:
+                connection.settimeout(self._CLIENT_TIMEOUT)
+                self._respond(connection)
+            except OSError:
+                pass
+            finally:
+                connection.close()
+
+    def _respond(self, connection: socket.socket):
+        """ Read request head, send the last snapshot
+
+        :param socket.socket connection:
+        :return None:
+        """
+        request = b''
+        while b'\r\n\r\n' not in request and len(request) < self._REQUEST_SIZE:
+            chunk = connection.recv(self._REQUEST_SIZE)
+            if not chunk:
+                break
+            request += chunk
+
+        body = self._snapshot
+        if request.startswith(b'GET '):
+            status, body = ('200 OK', body) if request.split(b' ', 2)[1].split(b'?')[0] == b'/metrics' \
+                else ('404 Not Found', b'')
+        else:
+            status, body = '405 Method Not Allowed', b''
+
+        head = 'HTTP/1.0 %s\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: close\r\n\r\n' \
+               % (status, CONTENT_TYPE, len(body))
+        connection.sendall(head.encode() + body)
+
+    def _release(self):
+        """ Close sockets, remove socket file
+
+        :return None:
+        """
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            if self._unix:
+                try:
+                    os.unlink(self._address)
+                except FileNotFoundError:
+                    pass
+
+        for wakeup_socket in self._wakeup or ():
+            wakeup_socket.close()
+        self._wakeup = None
+
+    def close(self):
+        """ Stop serving
+
+        :return None:
+        """
+        with self._status_change:
+            if not self._opened:
+                return
+
+            self._opened = False
+            if self._serving:
+                self._wakeup[1].send(b'\0')  # Serving thread releases resources itself
+            else:
+                self._release()
+
+    def __enter__(self):
+        """ Open socket on enter
+
+        :return self:
+        """
+        self.open()
+        return self
+
+    def __exit__(self, *_):
+        """ Close on exit
+
+        :param tuple _:
+        :return None:
+        """
+        self.close()
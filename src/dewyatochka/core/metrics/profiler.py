@@ -0,0 +1,190 @@
+# -*- coding: UTF-8
+
+""" Statistical sampling profiler
+
+Samples stacks of all the threads periodically in a background
+thread, so it can be started and stopped at any time without
+restarting the application. Samples are aggregated by stack and
+dumped in the collapsed stacks format (one "frame;frame;... count"
+line per stack) accepted by flamegraph tools
+
+Classes
+=======
+    SamplingProfiler -- Statistical sampling profiler
+
+Attributes
+==========
+    profiler -- Profiler used by the application code
+"""
+
+import os
+import sys
+import threading
+
+from .threads import get_group_name
+
+__all__ = ['SamplingProfiler', 'profiler']
+
+
+class SamplingProfiler:
+    """ Statistical sampling profiler
+
+    Memory used is bounded: stacks seen after `max_stacks` distinct
+    stacks are collected are counted as a single truncated stack
+    """
+
+    # Samples per second by default
+    DEFAULT_RATE = 50
+
+    # Max distinct stacks collected by default
+    DEFAULT_MAX_STACKS = 10000
+
+    # Max frames kept in a stack (the outermost ones)
+    _MAX_DEPTH = 128
+
+    # Pseudo-frame for stacks not fitting into the limit
+    _TRUNCATED = '[truncated]'
+
+    def __init__(self):
+        """ Create stopped profiler """
+        self._stacks = {}
+        self._max_stacks = self.DEFAULT_MAX_STACKS
+        self._samples = 0
+        self._thread_names = {}
+
+        self._sampler = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """ Check if sampling is in progress
+
+        :return bool:
+        """
+        return self._sampler is not None
+
+    @property
+    def samples(self) -> int:
+        """ Get count of samples taken
+
+        :return int:
+        """
+        return self._samples
+
+    def start(self, rate=DEFAULT_RATE, max_stacks=DEFAULT_MAX_STACKS):
+        """ Start sampling, samples collected before are kept
+
+        :param float rate: Samples per second
+        :param int max_stacks: Max distinct stacks collected
+        :return None:
+        """
+        if rate <= 0 or max_stacks <= 0:
+            raise ValueError('Sampling rate and stacks limit must be positive')
+
+        with self._lock:
+            if self._sampler is not None:
+                raise RuntimeError('Profiler is already running')
+
+            self._max_stacks = max_stacks
+            self._stop.clear()
+            self._sampler = threading.Thread(name='profiler[Sampler]', target=self._run, args=(1 / rate,),
+                                             daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """ Stop sampling
+
+        :return None:
+        """
+        with self._lock:
+            if self._sampler is None:
+                raise RuntimeError('Profiler is not running')
+
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def reset(self):
+        """ Drop samples collected
+
+        :return None:
+        """
+        with self._lock:
+            self._stacks = {}
+            self._samples = 0
+
+    def _run(self, interval: float):
+        """ Sample until stopped
+
+        :param float interval: Interval between samples (sec.)
+        :return None:
+        """
+        while not self._stop.wait(interval):
+            self.sample()
+
+    def sample(self):
+        """ Take a sample of all the threads stacks (except the current one)
+
+        :return None:
+        """
+        current = threading.get_ident()
+        stacks = self._stacks
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == current:
+                continue
+
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            key = (self._get_thread_name(thread_id),) + tuple(codes[:-self._MAX_DEPTH - 1:-1])
+
+            try:
+                stacks[key] += 1
+            except KeyError:
+                if len(stacks) >= self._max_stacks:
+                    key = (key[0], self._TRUNCATED)
+                stacks[key] = stacks.get(key, 0) + 1
+
+        self._samples += 1
+
+    def _get_thread_name(self, thread_id: int) -> str:
+        """ Get thread name with unique parts stripped
+
+        :param int thread_id:
+        :return str:
+        """
+        try:
+            return self._thread_names[thread_id]
+        except KeyError:
+            pass
+
+        self._thread_names = {thread.ident: get_group_name(thread.name)
+                              for thread in threading.enumerate()}
+        return self._thread_names.setdefault(thread_id, 'Thread')
+
+    @staticmethod
+    def _format_frame(code) -> str:
+        """ Format stack frame
+
+        :param code: Code object or a pseudo-frame string
+        :return str:
+        """
+        if isinstance(code, str):
+            return code
+
+        return '%s (%s)' % (code.co_name, os.path.basename(code.co_filename))
+
+    def dump(self) -> list:
+        """ Get stacks collected in collapsed format, the most frequent first
+
+        :return list:
+        """
+        stacks = sorted(self._stacks.copy().items(), key=lambda item: item[1], reverse=True)
+        return ['%s %d' % (';'.join(self._format_frame(frame).replace(';', ':') for frame in stack), count)
+                for stack, count in stacks]
+
+
+# Profiler used by the application code
+profiler = SamplingProfiler()
@@ -0,0 +1,383 @@
+# -*- coding: UTF-8
+
+""" Metrics registry, counters, gauges and histograms
+
+Counters and histograms are accumulated in per-thread cells, so
+updating a metric never takes a lock (except the first update made
+by a thread), values are summed over all the cells on collection.
+
+Classes
+=======
+    MetricsRegistry -- Metrics container
+    Metric          -- Abstract metric
+    Counter         -- Monotonically increasing value
+    Gauge           -- Value set directly or computed on collection
+    Histogram       -- Observed values distribution with fixed buckets
+
+Functions
+=========
+    counter   -- Get a counter from the default registry
+    gauge     -- Get a gauge from the default registry
+    histogram -- Get a histogram from the default registry
+
+Attributes
+==========
+    default_registry  -- Registry used by the application code
+    LATENCY_BUCKETS   -- Default histogram buckets for time measurement (seconds)
+    HistogramSnapshot -- Histogram values collected
+"""
+
+import time
+import threading
+from abc import ABCMeta, abstractmethod
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import contextmanager
+
+__all__ = ['MetricsRegistry', 'Metric', 'Counter', 'Gauge', 'Histogram', 'HistogramSnapshot',
+           'counter', 'gauge', 'histogram', 'default_registry', 'LATENCY_BUCKETS']
+
+
+# Default histogram buckets for time measurement (seconds)
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+# Histogram values collected, counts are not cumulative, the last one is for values above all the bounds
+HistogramSnapshot = namedtuple('HistogramSnapshot', ['buckets', 'counts', 'sum', 'count'])
+
+
+class Metric(metaclass=ABCMeta):
+    """ Abstract metric """
+
+    # Metric type name
+    type = None
+
+    # Min cells count to merge cells of finished threads at on a new cell creation
+    _PRUNE_THRESHOLD = 64
+
+    def __init__(self, name: str, description='', labels=None):
+        """ Create metric
+
+        :param str name: Metric name
+        :param str description: Human-readable description
+        :param dict labels: Labels distinguishing metrics with the same name
+        """
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+
+        self._local = threading.local()
+        self._cells = []
+        self._retired = self._new_cell()
+        self._prune_at = self._PRUNE_THRESHOLD
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_cell(self) -> list:  # pragma: nocover
+        """ Create empty accumulation cell
+
+        :return list:
+        """
+        pass
+
+    @property
+    def _cell(self) -> list:
+        """ Get accumulation cell of the current thread
+
+        :return list:
+        """
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = self._new_cell()
+            with self._lock:
+                # Short-living threads would pile up between collections otherwise
+                if len(self._cells) >= self._prune_at:
+                    self._prune()
+                    self._prune_at = max(self._PRUNE_THRESHOLD, len(self._cells) * 2)
+                self._cells.append((threading.current_thread(), cell))
+            return cell
+
+    def _prune(self):
+        """ Merge cells of finished threads into one (lock is acquired by caller)
+
+        :return None:
+        """
+        alive_cells = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                alive_cells.append((thread, cell))
+            else:
+                for i, value in enumerate(cell):
+                    self._retired[i] += value
+
+        self._cells = alive_cells
+
+    def _collect_cells(self) -> list:
+        """ Get all the cells, cells of finished threads are merged into one
+
+        :return list:
+        """
+        with self._lock:
+            self._prune()
+            return [self._retired] + [cell for _, cell in self._cells]
+
+    @property
+    @abstractmethod
+    def value(self):  # pragma: nocover
+        """ Get current value
+
+        :return any:
+        """
+        pass
+
+    def __str__(self) -> str:
+        """ Get metric name with labels
+
+        :return str:
+        """
+        if not self.labels:
+            return self.name
+
+        return '%s{%s}' % (self.name, ','.join('%s="%s"' % label for label in sorted(self.labels.items())))
+
+
+class Counter(Metric):
+    """ Monotonically increasing value """
+
+    type = 'counter'
+
+    def _new_cell(self) -> list:
+        """ Create empty accumulation cell
+
+        :return list:
+        """
+        return [0]
+
+    def inc(self, amount=1):
+        """ Increment counter
+
+        :param int amount:
+        :return None:
+        """
+        self._cell[0] += amount
+
+    @property
+    def value(self) -> int:
+        """ Get current value
+
+        :return int:
+        """
+        return sum(cell[0] for cell in self._collect_cells())
+
+
+class Gauge(Metric):
+    """ Value set directly or computed on collection """
+
+    type = 'gauge'
+
+    def __init__(self, name: str, description='', labels=None, callback=None):
+        """ Create metric
+
+        :param str name: Metric name
+        :param str description: Human-readable description
+        :param dict labels: Labels distinguishing metrics with the same name
+        :param callable callback: Function to compute value on collection
+        """
+        super().__init__(name, description, labels)
+        self._callback = callback
+        self._value = 0
+
+    def _new_cell(self) -> list:
+        """ Not used, gauge value is shared
+
+        :return list:
+        """
+        return []
+
+    def bind(self, callback: callable):
+        """ Compute value on collection with the function specified
+
+        :param callable callback:
+        :return None:
+        """
+        self._callback = callback
+
+    def set(self, value):
+        """ Set current value
+
+        :param float value:
+        :return None:
+        """
+        self._value = value
+
+    @property
+    def value(self):
+        """ Get current value
+
+        :return float:
+        """
+        return self._callback() if self._callback is not None else self._value
+
+
+class Histogram(Metric):
+    """ Observed values distribution with fixed buckets """
+
+    type = 'histogram'
+
+    def __init__(self, name: str, description='', labels=None, buckets=LATENCY_BUCKETS):
+        """ Create metric
+
+        :param str name: Metric name
+        :param str description: Human-readable description
+        :param dict labels: Labels distinguishing metrics with the same name
+        :param tuple buckets: Buckets upper bounds ascending
+        """
+        self.buckets = tuple(buckets)
+        super().__init__(name, description, labels)
+
+    def _new_cell(self) -> list:
+        """ Create empty accumulation cell: count by bucket and values sum at the end
+
+        :return list:
+        """
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, value: float):
+        """ Add observed value
+
+        :param float value:
+        :return None:
+        """
+        cell = self._cell
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    @contextmanager
+    def time(self):
+        """ Measure time spent in with-block
+
+        :return None:
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+    @property
+    def value(self) -> HistogramSnapshot:
+        """ Get values collected
+
+        :return HistogramSnapshot:
+        """
+        cells = self._collect_cells()
+        counts = [sum(column) for column in zip(*(cell[:-1] for cell in cells))]
+        return HistogramSnapshot(self.buckets, counts, sum(cell[-1] for cell in cells), sum(counts))
+
+    @staticmethod
+    def quantile(snapshot: HistogramSnapshot, q: float) -> float:
+        """ Estimate quantile as the upper bound of bucket it falls into
+
+        :param HistogramSnapshot snapshot:
+        :param float q: Quantile, 0..1
+        :return float: Bound or float('inf') if above all the bounds, None if nothing observed
+        """
+        if not snapshot.count:
+            return None
+
+        rank = q * snapshot.count
+        accumulated = 0
+        for bound, count in zip(snapshot.buckets, snapshot.counts):
+            accumulated += count
+            if accumulated >= rank:
+                return bound
+
+        return float('inf')
+
+
+class MetricsRegistry:
+    """ Metrics container """
+
+    def __init__(self):
+        """ Create empty registry """
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, metric_class: type, name: str, description: str, labels: dict, **kwargs) -> Metric:
+        """ Get metric registered, register a new one if not exists yet
+
+        :param type metric_class:
+        :param str name:
+        :param str description:
+        :param dict labels:
+        :param dict kwargs: Metric specific args
+        :return Metric:
+        """
+        key = (name, tuple(sorted((labels or {}).items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = metric_class(name, description, labels, **kwargs)
+
+        if not isinstance(metric, metric_class):
+            raise TypeError('Metric %s is already registered as a %s' % (metric, metric.type))
+
+        return metric
+
+    def counter(self, name: str, description='', labels=None) -> Counter:
+        """ Get a counter
+
+        :param str name: Metric name
+        :param str description: Human-readable description
+        :param dict labels: Labels distinguishing metrics with the same name
+        :return Counter:
+        """
+        return self._get(Counter, name, description, labels)
+
+    def gauge(self, name: str, description='', labels=None, callback=None) -> Gauge:
+        """ Get a gauge
+
+        Callback specified replaces the one the gauge has been bound to before
+
+        :param str name: Metric name
+        :param str description: Human-readable description
+        :param dict labels: Labels distinguishing metrics with the same name
+        :param callable callback: Function to compute value on collection
+        :return Gauge:
+        """
+        metric = self._get(Gauge, name, description, labels, callback=callback)
+        if callback is not None:
+            metric.bind(callback)
+
+        return metric
+
+    def histogram(self, name: str, description='', labels=None, buckets=LATENCY_BUCKETS) -> Histogram:
+        """ Get a histogram
+
+        :param str name: Metric name
+        :param str description: Human-readable description
+        :param dict labels: Labels distinguishing metrics with the same name
+        :param tuple buckets: Buckets upper bounds ascending
+        :return Histogram:
+        """
+        return self._get(Histogram, name, description, labels, buckets=buckets)
+
+    @property
+    def metrics(self) -> list:
+        """ Get all the metrics registered ordered by name and labels
+
+        :return list:
+        """
+        with self._lock:
+            return [self._metrics[key] for key in sorted(self._metrics)]
+
+
+# Registry used by the application code
+default_registry = MetricsRegistry()
+
+# Shortcuts to the default registry
+counter = default_registry.counter
+gauge = default_registry.gauge
+histogram = default_registry.histogram
@@ -0,0 +1,173 @@
+# -*- coding: UTF-8
+
+""" Threads census
+
+Threads of the same kind (e.g. message processing threads of a plugin)
+are grouped by name with per-thread ids stripped. Thread age is taken
+from /proc where available, otherwise it is counted from the moment
+the thread is seen by census for the first time
+
+Classes
+=======
+    ThreadsWatchdog -- Reports threads count exceeding a limit
+
+Functions
+=========
+    get_group_name -- Get name of threads group a thread belongs to
+    census         -- Get alive threads grouped by kind
+    dump_stacks    -- Get stacks of alive threads
+
+Attributes
+==========
+    ThreadsGroup -- Threads group info structure
+    ThreadStack  -- Thread stack dump structure
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+import traceback
+from collections import namedtuple
+
+__all__ = ['ThreadsWatchdog', 'ThreadsGroup', 'ThreadStack', 'get_group_name', 'census', 'dump_stacks']
+
+
+# Threads group info structure
+ThreadsGroup = namedtuple('ThreadsGroup', ['name', 'count', 'oldest_age', 'newest_age'])
+
+# Thread stack dump structure
+ThreadStack = namedtuple('ThreadStack', ['name', 'ident', 'age', 'daemon', 'stack'])
+
+# Parts of thread names differing from one thread to another of the same kind (object ids, thread numbers)
+_THREAD_NAME_IDS_RE = re.compile(r'\[[0-9a-f]{6,}\]|(?<=^Thread)-\d+( \(.*\))?$')
+
+# Threads first seen time by ident (when start time is not available from /proc)
+_first_seen = {}
+
+
+def get_group_name(name: str) -> str:
+    """ Get name of threads group a thread belongs to
+
+    :param str name: Thread name
+    :return str:
+    """
+    return _THREAD_NAME_IDS_RE.sub('', name)
+
+
+def _get_uptime() -> float:
+    """ Get system uptime (sec.)
+
+    :return float: Uptime or None if not available
+    """
+    try:
+        with open('/proc/uptime') as uptime_file:
+            return float(uptime_file.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _get_age(thread: threading.Thread, now: float, uptime: float) -> float:
+    """ Get time passed since thread start (sec.)
+
+    :param threading.Thread thread:
+    :param float now: Current time
+    :param float uptime: System uptime
+    :return float:
+    """
+    native_id = getattr(thread, 'native_id', None)
+    if uptime is not None and native_id is not None:
+        try:
+            with open('/proc/self/task/%d/stat' % native_id) as stat_file:
+                # Fields after the command name, start time is the 22nd field of stat
+                started_at = int(stat_file.read().rsplit(')', 1)[1].split()[19])
+            return max(0., uptime - started_at / os.sysconf('SC_CLK_TCK'))
+        except (OSError, ValueError, IndexError):
+            pass
+
+    return now - _first_seen.setdefault(thread.ident, now)
+
+
+def _get_ages(threads: list) -> dict:
+    """ Get threads ages by ident, forget threads not alive anymore
+
+    :param list threads:
+    :return dict:
+    """
+    now = time.time()
+    uptime = _get_uptime()
+    ages = {thread.ident: _get_age(thread, now, uptime) for thread in threads}
+
+    for ident in set(_first_seen) - set(ages):
+        _first_seen.pop(ident, None)
+
+    return ages
+
+
+def census() -> list:
+    """ Get alive threads grouped by kind, the most numerous groups first
+
+    :return list: List of ThreadsGroup
+    """
+    threads = threading.enumerate()
+    ages = _get_ages(threads)
+
+    groups = {}
+    for thread in threads:
+        groups.setdefault(get_group_name(thread.name), []).append(ages[thread.ident])
+
+    return sorted((ThreadsGroup(name, len(group_ages), max(group_ages), min(group_ages))
+                   for name, group_ages in groups.items()),
+                  key=lambda group: (-group.count, group.name))
+
+
+def dump_stacks() -> list:
+    """ Get stacks of alive threads ordered by name
+
+    :return list: List of ThreadStack
+    """
+    threads = threading.enumerate()
+    ages = _get_ages(threads)
+    frames = sys._current_frames()
+
+    return [ThreadStack(thread.name, thread.ident, ages[thread.ident], thread.daemon,
+                        ''.join(traceback.format_stack(frames[thread.ident])) if thread.ident in frames else '')
+            for thread in sorted(threads, key=lambda thread: thread.name)]
+
+
+class ThreadsWatchdog:
+    """ Reports threads count exceeding a limit
+
+    Reported once on the limit crossing and then every time
+    threads count doubles until it drops below the limit
+    """
+
+    def __init__(self, limit: int, log):
+        """ Create watchdog
+
+        :param int limit: Max threads count expected
+        :param logging.Logger log: Logger to report to
+        """
+        self._limit = limit
+        self._log = log
+        self._reported = 0
+
+    def check(self) -> bool:
+        """ Check threads count, report if exceeds the limit
+
+        :return bool: Limit is exceeded or not
+        """
+        count = threading.active_count()
+        if count <= self._limit:
+            if self._reported:
+                self._log.info('Threads count is back to normal: %d (limit %d)', count, self._limit)
+            self._reported = 0
+            return False
+
+        if count >= self._reported * 2:
+            self._reported = count
+            groups = ', '.join('%s: %d' % (group.name, group.count) for group in census()[:10])
+            self._log.warning('Too many threads: %d (limit %d), the largest groups: %s', count, self._limit, groups)
+
+        return True
@@ -0,0 +1,191 @@
+# -*- coding: UTF-8
+
+""" Plugins invocations tracing
+
+Tracing is disabled by default. When enabled, wall and CPU time of
+each plugin invocation is recorded into a ring buffer of the last
+traces. Invocations running longer than a threshold set for their
+plugin type are logged with a stack sampled while still running
+
+Classes
+=======
+    Tracer -- Plugins invocations tracer
+
+Attributes
+==========
+    Trace  -- Plugin invocation trace structure
+    tracer -- Tracer used by the application code
+"""
+
+import sys
+import time
+import threading
+import traceback
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+__all__ = ['Tracer', 'Trace', 'tracer']
+
+
+# Plugin invocation trace structure
+Trace = namedtuple('Trace', ['plugin', 'type', 'subject', 'started_at', 'wall_time', 'cpu_time', 'error', 'stack'])
+
+
+class _Invocation:
+    """ Plugin invocation in progress """
+
+    __slots__ = ('thread_id', 'started_at', 'threshold', 'stack')
+
+    def __init__(self, threshold: float):
+        """ Start invocation in the current thread
+
+        :param float threshold: Slow invocation threshold (sec.)
+        """
+        self.thread_id = threading.get_ident()
+        self.started_at = time.perf_counter()
+        self.threshold = threshold
+        self.stack = None
+
+
+class Tracer:
+    """ Plugins invocations tracer """
+
+    # Traces kept by default
+    DEFAULT_SIZE = 100
+
+    # Bounds of interval between running invocations checks (sec.)
+    _MIN_SAMPLE_INTERVAL = .05
+    _MAX_SAMPLE_INTERVAL = 1
+
+    def __init__(self):
+        """ Create disabled tracer """
+        self._traces = deque(maxlen=self.DEFAULT_SIZE)
+        self._thresholds = {}
+        self._log = None
+        self._enabled = False
+
+        self._running = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        """ Check if tracing is enabled
+
+        :return bool:
+        """
+        return self._enabled
+
+    def enable(self, size=DEFAULT_SIZE, thresholds=None, log=None):
+        """ Start tracing
+
+        :param int size: Traces kept
+        :param dict thresholds: Slow invocation threshold by plugin type (sec.)
+        :param logging.Logger log: Logger to report slow invocations to
+        :return None:
+        """
+        self.disable()
+
+        self._traces = deque(self._traces, maxlen=size)
+        self._thresholds = {type_: float(threshold) for type_, threshold in (thresholds or {}).items()
+                            if float(threshold) > 0}
+        self._log = log
+        self._enabled = True
+
+        if self._thresholds:
+            interval = min(self._thresholds.values()) / 2
+            interval = max(self._MIN_SAMPLE_INTERVAL, min(self._MAX_SAMPLE_INTERVAL, interval))
+            self._stop.clear()
+            self._sampler = threading.Thread(name='tracer[Sampler]', target=self._sample, args=(interval,),
+                                             daemon=True)
+            self._sampler.start()
+
+    def disable(self):
+        """ Stop tracing, traces recorded are kept
+
+        :return None:
+        """
+        self._enabled = False
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    @contextmanager
+    def trace(self, plugin: str, type_: str, subject=None):
+        """ Trace plugin invocation made in with-block
+
+        :param str plugin: Plugin name
+        :param str type_: Plugin type
+        :param str subject: ID of a message (command, etc.) triggered invocation
+        :return None:
+        """
+        invocation = _Invocation(self._thresholds.get(type_))
+        if invocation.threshold is not None:
+            with self._lock:
+                self._running[id(invocation)] = invocation
+
+        started_at = time.time()
+        cpu_started_at = time.thread_time()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            wall_time = time.perf_counter() - invocation.started_at
+            cpu_time = time.thread_time() - cpu_started_at
+            if invocation.threshold is not None:
+                with self._lock:
+                    del self._running[id(invocation)]
+
+            trace = Trace(plugin, type_, subject, started_at, wall_time, cpu_time, error, invocation.stack)
+            self._traces.append(trace)
+            if invocation.threshold is not None and wall_time >= invocation.threshold:
+                self._report_slow(trace)
+
+    def _report_slow(self, trace: Trace):
+        """ Log slow invocation
+
+        :param Trace trace:
+        :return None:
+        """
+        if self._log is None:
+            return
+
+        self._log.warning('Slow %s plugin %s (%s): %.3fs wall, %.3fs CPU, stack sampled:\n%s',
+                          trace.type, trace.plugin, trace.subject, trace.wall_time, trace.cpu_time,
+                          trace.stack or '  (finished before sampling)', extra={'latency': trace.wall_time})
+
+    def _sample(self, interval: float):
+        """ Sample stacks of invocations exceeded threshold
+
+        :param float interval: Check interval (sec.)
+        :return None:
+        """
+        while not self._stop.wait(interval):
+            now = time.perf_counter()
+            with self._lock:
+                overdue = [invocation for invocation in self._running.values()
+                           if invocation.stack is None and now - invocation.started_at >= invocation.threshold]
+
+            if overdue:
+                frames = sys._current_frames()
+                for invocation in overdue:
+                    frame = frames.get(invocation.thread_id)
+                    if frame is not None:
+                        invocation.stack = ''.join(traceback.format_stack(frame))
+
+    @property
+    def traces(self) -> list:
+        """ Get traces recorded, the oldest first
+
+        :return list:
+        """
+        return list(self._traces)
+
+
+# Tracer used by the application code
+tracer = Tracer()
@@ -19,6 +19,7 @@ from sleekxmpp.stanza.message import Message as SMessage
 from sleekxmpp.stanza.presence import Presence
 
 from . import _base
+from dewyatochka.core.metrics import registry as metrics
 from dewyatochka.core.network.entity import Message, TextMessage
 from dewyatochka.core.network.xmpp.entity import *
 from dewyatochka.core.network.xmpp.exception import *
@@ -88,6 +89,9 @@ class Client(_base.Client):
         self._connection_lock = threading.Lock()
         self._message_queue = queue.Queue()
 
+        metrics.gauge('xmpp_input_queue_size', 'Messages received but not read yet', {'jid': str(self.jid)},
+                      callback=self._message_queue.qsize)
+
     def disconnect(self, wait=True, notify=True):
         """ Close connection
 
@@ -16,6 +16,7 @@ import threading
 
 from dewyatochka.core.application import Application
 from dewyatochka.core.config.exception import ConfigError
+from dewyatochka.core.metrics import registry as metrics
 
 from ..service import ConnectionManager
 
@@ -78,6 +79,14 @@ class PresenceHelper:
         )
         self._running = False
 
+        labels = {'connection': self._connection_manager.name()}
+        self._reenters_counter = metrics.counter('xmpp_conference_reenters_total', 'Conference re-enters scheduled',
+                                                 labels)
+        metrics.gauge('xmpp_alive_conferences', 'Conferences entered', labels,
+                      callback=lambda: len(self._alive_conferences))
+        metrics.gauge('xmpp_reenter_queue_size', 'Conferences waiting for re-enter', labels,
+                      callback=lambda: len(self._reconnect_queue))
+
     def start(self):
         """ Start conferences management
 
@@ -114,7 +123,7 @@ class PresenceHelper:
                 self._alive_conferences.add(conference.bare)
                 self._alive_nicknames[conference.bare] = conference.resource
             else:
-                log.debug('Discarded to enter to a conference %s while it is marked as alive', str(conference))
+                log.debug('Discarded to enter to a conference %s while it is marked as alive', conference)
 
     def leave(self, conference: Conference):
         """ Leave conference
@@ -128,12 +137,12 @@ class PresenceHelper:
             conference = conference.bare
 
             if conference in self._alive_conferences and conference in self._alive_nicknames:
-                log.info('Leaving conference %s', str(conference))
+                log.info('Leaving conference %s', conference)
                 self._connection_manager.client.chat.leave(conference, self._alive_nicknames[conference])
                 self._alive_conferences.remove(conference)
                 del self._alive_nicknames[conference]
             else:
-                log.debug('Discarded to leave conference %s while it is not marked as alive', str(conference))
+                log.debug('Discarded to leave conference %s while it is not marked as alive', conference)
 
     def clear_state(self):
         """ Flush reconnection queue and mark all conferences as dead
@@ -173,6 +182,7 @@ class PresenceHelper:
 
         log = self._connection_manager.log
         log.error('Server-to-server connection to %s seems to be broken, scheduling reconnect', conference)
+        self._reenters_counter.inc()
 
         with self._alive_set_lock:
             try:
@@ -187,7 +197,7 @@ class PresenceHelper:
                     self._reconnect_queue.append(self.__ReconnectTask(conference_, time.time()))
                     break
             else:
-                log.debug('Discarded attempt to schedule re-enter to not configured conference: %s', str(conference))
+                log.debug('Discarded attempt to schedule re-enter to not configured conference: %s', conference)
 
     def get_presence_jid(self, participant: JID) -> Conference:
         """ Get full conference presence JID
@@ -353,6 +363,12 @@ class XMPPConnectionManager(ConnectionManager):
         self.__client = xmpp_client
         self._presence_helper = presence_helper or PresenceHelper(self)
 
+        labels = {'connection': self.name()}
+        self._received_counter = metrics.counter('messages_received_total', 'Messages received', labels)
+        self._send_time = metrics.histogram('message_send_seconds', 'Message sending time', labels)
+        self._reconnects_counter = metrics.counter('xmpp_reconnects_total', 'Server reconnection attempts', labels)
+        self._connect_attempted = False
+
     @property
     def _connection_config(self) -> dict:
         """ Get xmpp connection config options
@@ -390,7 +406,7 @@ class XMPPConnectionManager(ConnectionManager):
         while self.application.running and time.time() - time_start < _XMPP_OFFLINE_TIME_LIMIT:
             try:
                 attempts += 1
-                self.client.connect()
+                self._connect_client()
                 self._presence_helper.enter_all()
             except C2SConnectionError as e:
                 self.log.error('%s (attempt #%d), sleeping %d seconds before the next attempt',
@@ -402,6 +418,17 @@ class XMPPConnectionManager(ConnectionManager):
 
         return success
 
+    def _connect_client(self):
+        """ Connect xmpp client counting every attempt but the very first one as a reconnection
+
+        :return None:
+        """
+        if self._connect_attempted:
+            self._reconnects_counter.inc()
+
+        self._connect_attempted = True
+        self.client.connect()
+
     @property
     def client(self) -> client.Client:
         """ XMPP client instance getter
@@ -446,7 +473,7 @@ class XMPPConnectionManager(ConnectionManager):
 
         :return None:
         """
-        self.__try(self.client.connect)
+        self.__try(self._connect_client)
         self.__try(self._presence_helper.start)
         self.__try(self._presence_helper.enter_all)
 
@@ -463,6 +490,7 @@ class XMPPConnectionManager(ConnectionManager):
             try:
                 msg = self.__try(self.client.read)
                 if msg is not None:
+                    self._received_counter.inc()
                     if msg.receiver == self.client.jid:
                         msg.receiver = self._presence_helper.get_presence_jid(msg.sender)
                     yield msg
@@ -504,7 +532,8 @@ class XMPPConnectionManager(ConnectionManager):
         if not self._presence_helper.is_alive(chat):
             raise S2SConnectionError('Chat %s is not online now' % chat, remote=chat)
 
-        self.client.chat(message, chat.bare)
+        with self._send_time.time():
+            self.client.chat(message, chat.bare)
 
     @classmethod
     def name(cls) -> str:
@@ -17,11 +17,15 @@ Attributes
         and attributes which plugin has been registered with
 """
 
+import time
 from collections import namedtuple
 from abc import ABCMeta, abstractmethod, abstractproperty
 
 from dewyatochka.core.application import Registry, Application
 from dewyatochka.core.application import Service as AppService
+from dewyatochka.core.metrics import registry as metrics
+from dewyatochka.core.metrics.tracing import tracer
+from dewyatochka.core.log.service import log_context
 
 from .exceptions import PluginRegistrationError
 
@@ -48,6 +52,9 @@ class Environment:
         self._plugin = plugin
         self._registry = registry
 
+        # Plugin type (entry point type) assigned by wrapper
+        self.type = None
+
     def invoke(self, **kwargs):
         """ Invoke plugin in environment registered
 
@@ -58,11 +65,11 @@ class Environment:
 
     @property
     def name(self) -> str:
-        """ Get unique name
+        """ Get unique name (class name is used for a callable object)
 
         :return str:
         """
-        return '.'.join((self._plugin.__module__, self._plugin.__name__))
+        return '.'.join((self._plugin.__module__, getattr(self._plugin, '__name__', type(self._plugin).__name__)))
 
     def __str__(self) -> str:
         """ Convert to string (=name)
@@ -78,13 +85,65 @@ class Environment:
         :param dict kwargs:
         :return None:
         """
+        if not self._should_invoke(**kwargs):
+            return
+
+        started_at = time.perf_counter()
+        with log_context(plugin=self.name, **self._get_log_context(**kwargs)):
+            try:
+                if tracer.enabled:
+                    with tracer.trace(self.name, self.type, self._get_trace_subject(**kwargs)):
+                        self.invoke(**kwargs)
+                else:
+                    self.invoke(**kwargs)
+            except Exception as e:
+                self._metrics[1].inc()
+                if logger is not None:
+                    logger.error('Plugin %s failed: %s', self, e, extra={'latency': time.perf_counter() - started_at})
+                else:
+                    raise
+            finally:
+                self._metrics[0].observe(time.perf_counter() - started_at)
+
+    def _should_invoke(self, **kwargs) -> bool:
+        """ Check if the plugin is to be invoked on the params at all
+
+        Skipped invocations are neither traced nor measured
+
+        :param dict kwargs: Params to path to a plugin
+        :return bool:
+        """
+        return True
+
+    def _get_trace_subject(self, **kwargs):
+        """ Get ID of a message (command, etc.) the plugin is invoked on
+
+        :param dict kwargs: Params to path to a plugin
+        :return str:
+        """
+        return None
+
+    def _get_log_context(self, **kwargs) -> dict:
+        """ Get fields to attach to records logged by the plugin (besides plugin name)
+
+        :param dict kwargs: Params to path to a plugin
+        :return dict:
+        """
+        return {}
+
+    @property
+    def _metrics(self) -> tuple:
+        """ Get invocation latency histogram and failures counter
+
+        :return tuple:
+        """
         try:
-            self.invoke(**kwargs)
-        except Exception as e:
-            if logger is not None:
-                logger.error('Plugin %s failed: %s', self, e)
-            else:
-                raise
+            return self.__metrics
+        except AttributeError:
+            labels = {'plugin': self.name}
+            self.__metrics = (metrics.histogram('plugin_invocation_seconds', 'Plugin invocation time', labels),
+                              metrics.counter('plugin_failures_total', 'Plugin invocations failed', labels))
+            return self.__metrics
 
 
 class Wrapper:
@@ -136,7 +195,10 @@ class Wrapper:
         :param PluginEntry entry: Raw plugin entry
         :return Environment:
         """
-        return Environment(entry.plugin, self._get_registry(entry))
+        environment = Environment(entry.plugin, self._get_registry(entry))
+        environment.type = entry.params.get('type')
+
+        return environment
 
 
 class Service(AppService, metaclass=ABCMeta):
@@ -163,19 +225,40 @@ class Service(AppService, metaclass=ABCMeta):
 
         :return None:
         """
-        self._plugins = []
+        self.swap(self.build())
 
-        for loader in self.application.registry.plugins_loader.loaders:
-            for entry in loader.load(self):
-                try:
-                    self._register_plugin(entry)
-                except Exception as e:
-                    self.log.error('Failed to register plugin %s.%s: %s',
-                                   entry.plugin.__module__,
-                                   entry.plugin.__name__,
-                                   e)
+    def build(self):
+        """ Load plugins into a new generation of the service
+
+        Plugins in use are not affected until the generation is swapped in
 
-        self.log.debug('Loaded %d %s plugins', len(self._plugins), self.name().split('_')[0])
+        :return Service: Service instance holding plugins loaded
+        """
+        generation = self.__class__(self.application)
+        generation._plugins = []
+
+        for entry in self.application.registry.plugins_loader.get_entries(*self.accepts):
+            try:
+                generation._register_plugin(entry)
+            except Exception as e:
+                self.log.error('Failed to register plugin %s.%s: %s',
+                               entry.plugin.__module__,
+                               entry.plugin.__name__,
+                               e)
+
+        self.log.debug('Loaded %d %s plugins', len(generation._plugins), self.name().split('_')[0])
+
+        return generation
+
+    def swap(self, generation):
+        """ Replace plugins with a generation built
+
+        Plugins invoked before keep running on the previous generation
+
+        :param Service generation: Service instance returned by build()
+        :return None:
+        """
+        self._plugins = generation._plugins
 
     def _register_plugin(self, entry: PluginEntry):
         """ Register a single plugin
@@ -220,13 +303,38 @@ class Loader(metaclass=ABCMeta):
     """ Abstract plugins loader """
 
     @abstractmethod
-    def load(self, service: Service) -> list:  # pragma: no cover
+    def get_entries(self, service: Service, *types) -> tuple:  # pragma: no cover
+        """ Load plugins and get entries of the types given
+
+        :param Service service: Reference to a service initiated load
+        :param tuple types: Plugin types
+        :return tuple: Tuple of PluginEntry
+        """
+        pass
+
+    def load(self, service: Service) -> list:
         """ Load and return plugins
 
         :param Service service: Reference to a service initiated load
         :return list: List of PluginEntry
         """
-        pass
+        return list(self.get_entries(service, *service.accepts))
+
+    def reload(self, service: Service) -> list:
+        """ Reload plugins changed since loaded (not supported by default)
+
+        :param Service service: Reference to a service initiated reload
+        :return list: Names of plugin modules reloaded
+        """
+        return []
+
+    def get_pinned(self, service: Service) -> list:
+        """ Get plugin modules changed but not reloaded on the last reload (restart is required)
+
+        :param Service service: Reference to a service initiated reload
+        :return list: Module names
+        """
+        return []
 
 
 class PluginLogService(AppService):
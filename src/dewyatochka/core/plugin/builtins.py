@@ -13,13 +13,21 @@ Functions
 """
 
 import time
+import threading
 
 from dewyatochka import __version__
 from dewyatochka.core.application import Registry
+from dewyatochka.core.config.container import ExtensionsConfig
+from dewyatochka.core.metrics import registry as metrics
+from dewyatochka.core.metrics.tracing import tracer
+from dewyatochka.core.metrics.profiler import profiler, SamplingProfiler
+from dewyatochka.core.metrics.threads import census, dump_stacks, get_group_name
 from dewyatochka.core.plugin import chat_message, chat_command, control
 from dewyatochka.core.plugin.loader import LoaderService
-from dewyatochka.core.plugin.subsystem.control.service import Service as CtlService
+from dewyatochka.core.plugin.subsystem.control.service import Service as CtlService, PLUGIN_TYPE_CTL
 from dewyatochka.core.plugin.subsystem.message.service import Service as MSysService
+from dewyatochka.core.plugin.subsystem.helper.service import Service as HSysService
+from dewyatochka.core.plugin.subsystem.message.matcher import PLUGIN_TYPE_COMMAND
 from dewyatochka.core.network.entity import Participant
 
 __all__ = ['ActivityInfo', 'get_activity_info', 'register_entry_points']
@@ -49,6 +57,9 @@ class ActivityInfo:
 # Conference jid -> last activity
 _conference_last_activity = {}
 
+# Lock to prevent simultaneous plugins reloading
+_reload_lock = threading.Lock()
+
 
 def get_activity_info(participant: Participant) -> ActivityInfo:
     """ Get conference activity info
@@ -76,6 +87,17 @@ def register_entry_points():
 
     control('list', _CtlCommandsList.DESCRIPTION, services=[LoaderService, CtlService])(_CtlCommandsList)
     control('version', _version_info.DESCRIPTION)(_version_info)
+    control('jobs', _jobs_list.DESCRIPTION, services=[CtlService])(_jobs_list)
+    control('attach', _job_attach.DESCRIPTION, services=[CtlService])(_job_attach)
+    control('cancel', _job_cancel.DESCRIPTION, services=[CtlService])(_job_cancel)
+    control('stats', _stats.DESCRIPTION)(_stats)
+    control('traces', _traces.DESCRIPTION)(_traces)
+    control('profile_start', _profile_start.DESCRIPTION)(_profile_start)
+    control('profile_stop', _profile_stop.DESCRIPTION)(_profile_stop)
+    control('profile_dump', _profile_dump.DESCRIPTION)(_profile_dump)
+    control('threads', _threads.DESCRIPTION)(_threads)
+    control('reload', _reload.DESCRIPTION,
+            services=[ExtensionsConfig, LoaderService, MSysService, HSysService, CtlService])(_reload)
 
 
 def _chat_on_message_input(inp, **_):
@@ -112,29 +134,269 @@ def _version_info(outp, **_):
 _version_info.DESCRIPTION = 'Show version'
 
 
+def _get_job(inp, registry):
+    """ Get job by ID passed as job=<ID> arg
+
+    :param inp:
+    :param registry:
+    :return Job:
+    """
+    try:
+        job_id = int((inp.args or {}).get('job'))
+    except (TypeError, ValueError):
+        raise RuntimeError('Job ID is not specified, use job=<ID>')
+
+    return registry.control_plugin_provider.jobs.get(job_id)
+
+
+def _jobs_list(outp, registry, **_):
+    """ List background jobs
+
+    :param outp:
+    :param registry:
+    :param _:
+    :return None:
+    """
+    jobs = registry.control_plugin_provider.jobs.jobs
+    if not jobs:
+        outp.say('No jobs started')
+
+    for job in jobs:
+        outp.say('%s', job)
+
+_jobs_list.DESCRIPTION = 'List background jobs (commands started with --detach)'
+
+
+def _job_attach(inp, outp, registry, **_):
+    """ Stream a background job output until it is finished
+
+    :param inp:
+    :param outp:
+    :param registry:
+    :param _:
+    :return None:
+    """
+    job = _get_job(inp, registry)
+    job.attach(outp)
+    outp.say('%s', job)
+
+_job_attach.DESCRIPTION = 'Show a background job output until it is finished (job=<ID>)'
+
+
+def _job_cancel(inp, outp, registry, **_):
+    """ Request a background job cancellation
+
+    :param inp:
+    :param outp:
+    :param registry:
+    :param _:
+    :return None:
+    """
+    job = _get_job(inp, registry)
+    job.cancel()
+    outp.say('Cancellation of job #%d requested', job.id)
+
+_job_cancel.DESCRIPTION = 'Cancel a background job (job=<ID>)'
+
+
+def _format_metric_value(metric) -> str:
+    """ Get metric value human-readable representation
+
+    :param metrics.Metric metric:
+    :return str:
+    """
+    value = metric.value
+    if metric.type != 'histogram':
+        return '%s' % value
+
+    if not value.count:
+        return 'count=0'
+
+    quantiles = ('p%d<=%s' % (q * 100, metrics.Histogram.quantile(value, q)) for q in (.5, .95, .99))
+    return 'count=%d avg=%.4f %s' % (value.count, value.sum / value.count, ' '.join(quantiles))
+
+
+def _stats(inp, outp, **_):
+    """ Show runtime metrics
+
+    :param inp:
+    :param outp:
+    :param _:
+    :return None:
+    """
+    prefix = (inp.args or {}).get('name', '')
+    collected = [metric for metric in metrics.default_registry.metrics if metric.name.startswith(prefix)]
+    if not collected:
+        outp.say('No metrics collected')
+
+    for metric in collected:
+        outp.say('%s = %s', metric, _format_metric_value(metric))
+
+_stats.DESCRIPTION = 'Show runtime metrics (name=<prefix> to filter)'
+
+
+def _traces(inp, outp, **_):
+    """ Show the last plugins invocations traces
+
+    :param inp:
+    :param outp:
+    :param _:
+    :return None:
+    """
+    args = inp.args or {}
+    prefix = args.get('plugin', '')
+    limit = int(args.get('limit', 20))
+
+    traces = [trace for trace in tracer.traces if trace.plugin.startswith(prefix)][-limit:] if limit > 0 else []
+    if not traces:
+        outp.say('No traces recorded' if tracer.enabled else 'Tracing is disabled')
+
+    for trace in traces:
+        outp.say('%s %s %s (%s): %.3fs wall, %.3fs CPU%s',
+                 time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(trace.started_at)),
+                 trace.type, trace.plugin, trace.subject or '-', trace.wall_time, trace.cpu_time,
+                 ', failed: %s' % trace.error if trace.error else '')
+        if trace.stack and args.get('stack'):
+            outp.say('%s', trace.stack.rstrip())
+
+_traces.DESCRIPTION = 'Show the last plugins invocations traces (plugin=<prefix>, limit=<N>, stack=1)'
+
+
+def _profile_start(inp, outp, **_):
+    """ Start sampling profiler
+
+    :param inp:
+    :param outp:
+    :param _:
+    :return None:
+    """
+    args = inp.args or {}
+    rate = float(args.get('rate', SamplingProfiler.DEFAULT_RATE))
+    profiler.start(rate, int(args.get('max_stacks', SamplingProfiler.DEFAULT_MAX_STACKS)))
+    outp.say('Profiler started, %g samples per second', rate)
+
+_profile_start.DESCRIPTION = 'Start sampling profiler (rate=<samples per sec.>, max_stacks=<N>)'
+
+
+def _profile_stop(outp, **_):
+    """ Stop sampling profiler
+
+    :param outp:
+    :param _:
+    :return None:
+    """
+    profiler.stop()
+    outp.say('Profiler stopped, %d samples collected', profiler.samples)
+
+_profile_stop.DESCRIPTION = 'Stop sampling profiler'
+
+
+def _profile_dump(inp, outp, **_):
+    """ Dump stacks sampled in collapsed format (for flamegraph tools)
+
+    :param inp:
+    :param outp:
+    :param _:
+    :return None:
+    """
+    args = inp.args or {}
+    lines = profiler.dump()
+    if args.get('file'):
+        with open(args['file'], 'w') as file:
+            file.writelines(line + '\n' for line in lines)
+        outp.say('%d stacks (%d samples) written to %s', len(lines), profiler.samples, args['file'])
+    else:
+        for line in lines:
+            outp.write(line)
+
+    if args.get('reset'):
+        profiler.reset()
+
+_profile_dump.DESCRIPTION = 'Dump stacks sampled in collapsed format for flamegraphs (file=<path>, reset=1)'
+
+
+def _threads(inp, outp, **_):
+    """ Show alive threads grouped by kind
+
+    :param inp:
+    :param outp:
+    :param _:
+    :return None:
+    """
+    args = inp.args or {}
+    prefix = args.get('name', '')
+
+    groups = [group for group in census() if group.name.startswith(prefix)]
+    outp.say('%d threads in %d groups', sum(group.count for group in groups), len(groups))
+    for group in groups:
+        outp.say('%-40s %5d  age %s .. %s', group.name, group.count,
+                 _format_age(group.newest_age), _format_age(group.oldest_age))
+
+    if args.get('stacks'):
+        for stack in dump_stacks():
+            if get_group_name(stack.name).startswith(prefix):
+                outp.write('\n%s (%d%s), age %s:\n%s', stack.name, stack.ident, ', daemon' if stack.daemon else '',
+                           _format_age(stack.age), stack.stack.rstrip())
+
+_threads.DESCRIPTION = 'Show alive threads grouped by kind with ages (name=<prefix>, stacks=1)'
+
+
+def _reload(outp, registry, **_):
+    """ Re-read extensions config and reload plugins changed
+
+    All the plugin services are rebuilt first and then swapped in,
+    plugins invoked before keep running on the previous generation.
+    Modules with bootstrap / daemon plugins are not reloaded
+
+    :param outp:
+    :param registry:
+    :param _:
+    :return None:
+    """
+    providers = [registry.message_plugin_provider, registry.helper_plugin_provider, registry.control_plugin_provider]
+
+    with _reload_lock:
+        registry.extensions_config.reload()
+        modules = registry.plugins_loader.reload()
+        pinned = registry.plugins_loader.get_pinned()
+
+        generations = [provider.build() for provider in providers]
+        for provider, generation in zip(providers, generations):
+            provider.swap(generation)
+
+    outp.say('Plugin modules reloaded: %s', ', '.join(modules) or 'none')
+    if pinned:
+        outp.say('Plugin modules not reloaded (bootstrap / daemon plugins, restart required): %s', ', '.join(pinned))
+    outp.say('Plugins loaded: %d message, %d helper, %d ctl', *[len(provider.plugins) for provider in providers])
+
+_reload.DESCRIPTION = 'Re-read extensions config and reload plugin modules changed'
+
+
+def _format_age(age: float) -> str:
+    """ Format thread age
+
+    :param float age: Age (sec.)
+    :return str:
+    """
+    age = int(age)
+    if age < 3600:
+        return '%d:%02d' % divmod(age, 60)
+
+    return '%dh%02d:%02d' % (age // 3600, age % 3600 // 60, age % 60)
+
+
 class _ChatHelpMessage:
     """ Show help message """
 
-    def __init__(self):
-        """ Init object """
-        self.__commands = None
-
-    def _get_commands(self, registry: Registry) -> frozenset:
-        """ Get available commands
+    @staticmethod
+    def _get_commands(registry: Registry) -> frozenset:
+        """ Get available commands (not cached as plugins may be reloaded)
 
         :param Registry registry:
         :return frozenset:
         """
-        if self.__commands is None:
-            commands = []
-            prefix = registry.message_plugin_provider.config['command_prefix']
-            for loader in registry.plugins_loader.loaders:
-                commands += [prefix + entry.params['command']
-                             for entry in loader.load(registry.message_plugin_provider)
-                             if 'command' in entry.params]
-            self.__commands = frozenset(commands)
-
-        return self.__commands
+        prefix = registry.message_plugin_provider.config['command_prefix']
+        return frozenset(prefix + command for command in registry.plugins_loader.get_commands(PLUGIN_TYPE_COMMAND))
 
     def __call__(self, inp, outp, registry, **_):
         """ Invoke command
@@ -160,22 +422,15 @@ class _CtlCommandsList:
     # Command description
     DESCRIPTION = 'List all the commands available'
 
-    def __init__(self):
-        """ Init object """
-        self.__commands = None
-
-    def _get_commands(self, registry: Registry) -> dict:
-        """ Get available commands
+    @staticmethod
+    def _get_commands(registry: Registry) -> dict:
+        """ Get available commands (not cached as plugins may be reloaded)
 
         :param Registry registry:
         :return dict:
         """
-        if self.__commands is None:
-            self.__commands = {}
-            for loader in registry.plugins_loader.loaders:
-                self.__commands.update({entry.params['name']: entry.params['description']
-                                        for entry in loader.load(registry.control_plugin_provider)})
-        return self.__commands
+        return {name: entry.params['description']
+                for name, entry in registry.plugins_loader.get_commands(PLUGIN_TYPE_CTL, 'name').items()}
 
     def __call__(self, outp, registry, **_):
         """ Invoke command
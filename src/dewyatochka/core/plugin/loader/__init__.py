@@ -14,6 +14,8 @@ Classes
     LoaderService -- Simple loader service
 """
 
+from itertools import chain
+
 from dewyatochka.core.application import Service
 
 from . import internal
@@ -24,13 +26,79 @@ __all__ = ['internal', 'LoaderService']
 class LoaderService(Service):
     """ Simple loader service """
 
+    def __init__(self, application):
+        """ Initialize service & attach an application to it
+
+        :param Application application:
+        """
+        super().__init__(application)
+
+        self._index_path = None
+        self._profile_imports = False
+
+    def configure(self, index_path=None, profile_imports=False):
+        """ Set up python plugins loading
+
+        :param str index_path: Plugins index file path, modules are imported on the first use if set
+        :param bool profile_imports: Import all the modules on start and log time taken by each one
+        :return None:
+        """
+        self._index_path = index_path
+        self._profile_imports = profile_imports
+
     @property
     def loaders(self) -> list:
         """ Get all loaders available
 
         :return list:
         """
-        return [internal.Loader()]
+        return [internal.Loader(self._index_path, self._profile_imports)]
+
+    def get_entries(self, *types) -> tuple:
+        """ Get plugin entries of the types given from all the loaders
+
+        Plugins are loaded on the first call
+
+        :param tuple types: Plugin types
+        :return tuple: Tuple of PluginEntry
+        """
+        loaders = self.loaders
+        if len(loaders) == 1:
+            return loaders[0].get_entries(self, *types)
+
+        return tuple(chain.from_iterable(loader.get_entries(self, *types) for loader in loaders))
+
+    def reload(self) -> list:
+        """ Reload plugins changed since loaded by all the loaders
+
+        Plugin services are to be rebuilt to start using plugins reloaded
+
+        :return list: Names of plugin modules reloaded
+        """
+        return list(chain.from_iterable(loader.reload(self) for loader in self.loaders))
+
+    def get_pinned(self) -> list:
+        """ Get plugin modules changed but not reloaded on the last reload by all the loaders
+
+        Such modules have plugins run once on application start, restart is required to reload them
+
+        :return list: Module names
+        """
+        return list(chain.from_iterable(loader.get_pinned(self) for loader in self.loaders))
+
+    def get_commands(self, plugin_type: str, name_param='command') -> dict:
+        """ Get command plugin entries by command name
+
+        :param str plugin_type: Plugin type
+        :param str name_param: Entry param holding command name
+        :return dict: Command name -> PluginEntry, the first one registered is kept on names collision
+        """
+        commands = {}
+        for entry in self.get_entries(plugin_type):
+            if name_param in entry.params:
+                commands.setdefault(entry.params[name_param], entry)
+
+        return commands
 
     @classmethod
     def name(cls) -> str:
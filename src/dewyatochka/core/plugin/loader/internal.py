@@ -2,6 +2,18 @@
 
 """ Internal python modules loader
 
+Plugin modules may be registered with no import using an index of
+entry points saved on a previous run, so heavy dependencies are not
+imported before the bot connects. Module is imported on the first call
+of any of its plugins then. Index record is renewed on a module change
+(module is imported on start once to get its entry points)
+
+Plugin modules changed since loaded may be re-imported with no restart,
+entry points are rebuilt then. Plugins got from the loader before are
+left as they are, so they keep running the code imported before.
+Modules with bootstrap or daemon plugins are never re-imported: their
+state is set up once on start, so a restart is required to apply changes
+
 Classes
 =======
     Loader -- Python plugins loader
@@ -9,25 +21,60 @@ Classes
 Functions
 =========
     entry_point -- Plugin entry point decorator
+    get_entry   -- Get entry point registered with the params given
 """
 
 import os
+import sys
+import json
+import time
+import threading
 from collections import defaultdict
 import importlib
-from functools import reduce
 
 from dewyatochka import plugins  # Be careful to remove this import
 from dewyatochka.core.plugin.base import Loader as BaseLoader
 from dewyatochka.core.plugin.base import PluginEntry
 from dewyatochka.core.plugin.base import Service
+from dewyatochka.core.plugin.exceptions import PluginRegistrationError
 from dewyatochka.core.config.exception import SectionRetrievingError
 
-__all__ = ['Loader', 'entry_point']
+__all__ = ['Loader', 'entry_point', 'get_entry']
 
 
 # Entry points dict grouped by entry point type
 _entry_points = defaultdict(lambda: [])
 
+# Entry points registered by each module in order of registration
+_module_entries = defaultdict(lambda: [])
+
+# Modules registered from index, their entry points are added on import as lazy plugins already
+_lazy_modules = set()
+
+# Lazy plugin entries by name of module registered from index
+_lazy_entries = {}
+
+# Plugin modules loaded in order of loading, module name -> module files signature
+_loaded_modules = {}
+
+# Lock to prevent simultaneous modules reloading
+_reload_lock = threading.Lock()
+
+# Entries tuples by set of plugin types requested, dropped on every registration
+_entries_cache = {}
+
+# Modules registered from index being imported now, their lazy entries are replaced with actual ones
+_importing_modules = set()
+
+# Modules changed but not reloaded on the last reload as they have plugins run once on start
+_pinned_modules = []
+
+# Plugin types run once on start, modules registering them require restart to reload
+_PINNED_TYPES = frozenset(['bootstrap', 'daemon'])
+
+# Plugins index format version
+_INDEX_VERSION = 1
+
 
 def entry_point(entry_point_type, **kwargs) -> callable:
     """ Plugin entry point decorator
@@ -41,12 +88,105 @@ def entry_point(entry_point_type, **kwargs) -> callable:
         fn_obj.__name__ = fn.__name__ if hasattr(fn, '__name__') else fn_obj.__class__
         params = kwargs.copy()
         params['type'] = entry_point_type
-        _entry_points[entry_point_type].append(PluginEntry(fn_obj, params))
+        entry = PluginEntry(fn_obj, params)
+        _module_entries[fn_obj.__module__].append(entry)
+        if fn_obj.__module__ not in _lazy_modules:
+            _entry_points[entry_point_type].append(entry)
+            _entries_cache.clear()
         return fn
 
     return _decorator
 
 
+def get_entry(entry_point_type: str, **params):
+    """ Get entry point of the type registered with the params given
+
+    Lazy entries of a module being imported are skipped as
+    the module registers the same entries once again on import
+
+    :param str entry_point_type: Entry point type
+    :param dict params: Entry point params to match
+    :return PluginEntry: Entry or None if not found
+    """
+    for entry in _entry_points.get(entry_point_type, ()):
+        if isinstance(entry.plugin, _LazyPlugin) and entry.plugin.__module__ in _importing_modules:
+            continue
+        if all(entry.params.get(name) == value for name, value in params.items()):
+            return entry
+
+    return None
+
+
+def _get_entries(types: frozenset) -> tuple:
+    """ Get entry points of the types in order of registration
+
+    :param frozenset types: Entry point types
+    :return tuple: Tuple of PluginEntry
+    """
+    try:
+        return _entries_cache[types]
+    except KeyError:
+        pass
+
+    entries = tuple(entry for p_type, type_entries in list(_entry_points.items()) if p_type in types
+                    for entry in type_entries)
+    _entries_cache[types] = entries
+
+    return entries
+
+
+class _LazyPlugin:
+    """ Plugin registered from index, imports plugin module on the first call """
+
+    def __init__(self, module: str, name: str, ordinal: int):
+        """ Create plugin proxy
+
+        :param str module: Plugin module name
+        :param str name: Plugin name
+        :param int ordinal: Plugin entry point number in module
+        """
+        self.__module__ = module
+        self.__name__ = name
+        self._ordinal = ordinal
+        self._plugin = None
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        """ Invoke plugin
+
+        :param tuple args:
+        :param dict kwargs:
+        :returns: Depending on plugin
+        """
+        plugin = self._plugin
+        if plugin is None:
+            plugin = self._import()
+
+        return plugin(*args, **kwargs)
+
+    def _import(self) -> callable:
+        """ Import plugin module and get the actual plugin
+
+        :return callable:
+        """
+        with self._lock:
+            if self._plugin is None:
+                _importing_modules.add(self.__module__)
+                try:
+                    importlib.import_module(self.__module__)
+                finally:
+                    _importing_modules.discard(self.__module__)
+
+                entries = _module_entries[self.__module__]
+                plugin = entries[self._ordinal].plugin if self._ordinal < len(entries) else None
+                if getattr(plugin, '__name__', None) != self.__name__:
+                    raise PluginRegistrationError('Plugin %s.%s is not found, plugins index is stale'
+                                                  % (self.__module__, self.__name__))
+                self._plugin = plugin
+
+            return self._plugin
+
+
 class Loader(BaseLoader):
     """ Python plugins loader
 
@@ -68,6 +208,15 @@ class Loader(BaseLoader):
     # Flag if modules loading is completed
     __ready = False
 
+    def __init__(self, index_path=None, profile_imports=False):
+        """ Create loader
+
+        :param str index_path: Plugins index file path, modules are imported on start if not set
+        :param bool profile_imports: Import all the modules on start and log time taken by each one
+        """
+        self._index_path = index_path
+        self._profile_imports = profile_imports
+
     def _get_modules(self, service: Service) -> list:
         """ Load optional plugin modules
 
@@ -96,27 +245,312 @@ class Loader(BaseLoader):
 
         return modules
 
-    def load(self, service: Service) -> list:
-        """ Load and return plugins
+    def get_entries(self, service: Service, *types) -> tuple:
+        """ Load plugins and get entries of the types given
 
         :param Service service: Reference to a service initiated load
-        :return list: List of PluginEntry
+        :param tuple types: Plugin types
+        :return tuple: Tuple of PluginEntry
         """
         if not self.__class__.__ready:
             from dewyatochka.core.plugin import builtins
             builtins.register_entry_points()
 
-            for load_name in self._get_modules(service):
-                try:
-                    importlib.import_module(load_name)
-                    service.application.registry.log(__name__).debug('Loaded plugins from %s', load_name)
-                except Exception as e:
-                    service.application.registry.log(__name__).error('Failed to load module %s: %s', load_name, e)
+            self._load_modules(service)
 
             self.__class__.__ready = True
 
-        return reduce(lambda res, p_type: res + (_entry_points[p_type] if p_type in service.accepts else []),
-                      _entry_points, [])
+        return _get_entries(frozenset(types))
+
+    def _load_modules(self, service: Service):
+        """ Import plugin modules or register their plugins from index
+
+        :param Service service: Reference to a service initiated load
+        :return None:
+        """
+        log = service.application.registry.log(__name__)
+        index = self._read_index(log) if self._index_path and not self._profile_imports else {}
+        new_index = {}
+        import_times = []
+
+        for load_name in self._get_modules(service):
+            signature = self.__get_signature(load_name)
+            record = index.get(load_name)
+            if record is not None and record.get('signature') == signature:
+                self._register_lazy(load_name, record['entries'])
+                _loaded_modules[load_name] = signature
+                new_index[load_name] = record
+                log.debug('Registered plugins from %s, import is postponed', load_name)
+                continue
+
+            try:
+                modules = set(sys.modules)
+                started_at = time.perf_counter()
+                importlib.import_module(load_name)
+                import_times.append((time.perf_counter() - started_at, load_name, set(sys.modules) - modules))
+                _loaded_modules[load_name] = signature
+                log.debug('Loaded plugins from %s', load_name)
+            except Exception as e:
+                log.error('Failed to load module %s: %s', load_name, e)
+                continue
+
+            entries = self._export_entries(_module_entries[load_name])
+            if entries is not None:
+                new_index[load_name] = {'signature': signature, 'entries': entries}
+
+        if self._index_path and new_index != index:
+            self._write_index(new_index, log)
+        if self._profile_imports:
+            self._report_import_times(import_times, log)
+
+    def reload(self, service: Service) -> list:
+        """ Re-import plugin modules changed since loaded and rebuild entry points
+
+        Modules disabled since loaded are dropped, new ones are imported.
+        Module failed to re-import is left as it has been loaded before
+
+        :param Service service: Reference to a service initiated reload
+        :return list: Names of modules re-imported or dropped
+        """
+        with _reload_lock:
+            if not self.__class__.__ready:
+                self.get_entries(service)
+                return []
+
+            log = service.application.registry.log(__name__)
+            loaded = {}
+            reloaded = []
+            del _pinned_modules[:]
+            for load_name in self._get_modules(service):
+                signature = self.__get_signature(load_name)
+                if _loaded_modules.get(load_name) != signature:
+                    if self._reimport(load_name, log):
+                        reloaded.append(load_name)
+                    else:
+                        signature = _loaded_modules.get(load_name)
+                if signature is not None:
+                    loaded[load_name] = signature
+
+            dropped = [load_name for load_name in _loaded_modules if load_name not in loaded]
+            for load_name in dropped:
+                log.info('Plugins from %s are dropped', load_name)
+
+            _loaded_modules.clear()
+            _loaded_modules.update(loaded)
+            self._rebuild_entry_points()
+
+            if self._index_path and (reloaded or dropped):
+                self._update_index(reloaded, log)
+
+            return reloaded + dropped
+
+    def get_pinned(self, service: Service) -> list:
+        """ Get plugin modules changed but not reloaded on the last reload
+
+        :param Service service: Reference to a service initiated reload
+        :return list: Module names
+        """
+        return list(_pinned_modules)
+
+    @staticmethod
+    def _is_pinned(entries) -> bool:
+        """ Check if module entries contain plugins run once on start
+
+        :param list entries: List of PluginEntry
+        :return bool:
+        """
+        return any(entry.params['type'] in _PINNED_TYPES for entry in entries)
+
+    @classmethod
+    def _reimport(cls, load_name: str, log) -> bool:
+        """ Import a plugin module again (with its submodules)
+
+        Module is imported as a new module object, so plugins of the previous
+        one keep their globals. Previous module is restored on import failure
+        or if the module has bootstrap / daemon plugins (before or after import)
+
+        :param str load_name: Module name
+        :param logging.Logger log:
+        :return bool: Success or not
+        """
+        lazy = load_name in _lazy_modules
+        if cls._is_pinned(_lazy_entries[load_name] if lazy else _module_entries.get(load_name, [])):
+            log.warning('Plugins from %s are run on start, restart is required to reload them', load_name)
+            _pinned_modules.append(load_name)
+            return False
+
+        entries = _module_entries.pop(load_name, [])
+        lazy_entries = _lazy_entries.pop(load_name, None)
+        _lazy_modules.discard(load_name)
+        cls._rebuild_entry_points()  # Release names of the module commands
+
+        prefix = load_name + cls.__PKG_SEP
+        modules = {name: module for name, module in list(sys.modules.items())
+                   if name == load_name or name.startswith(prefix)}
+        for name in modules:
+            del sys.modules[name]
+
+        try:
+            importlib.import_module(load_name)
+            imported = True
+        except Exception as e:
+            log.error('Failed to reload module %s: %s', load_name, e)
+            imported = False
+
+        if imported and cls._is_pinned(_module_entries[load_name]):
+            log.warning('Plugins from %s are run on start, restart is required to load them', load_name)
+            _pinned_modules.append(load_name)
+            imported = False
+
+        if not imported:
+            for name in [name for name in sys.modules if name == load_name or name.startswith(prefix)]:
+                del sys.modules[name]
+            sys.modules.update(modules)
+            _module_entries[load_name] = entries
+            if lazy:
+                _lazy_modules.add(load_name)
+                _lazy_entries[load_name] = lazy_entries
+            return False
+
+        log.info('Reloaded plugins from %s', load_name)
+
+        return True
+
+    @staticmethod
+    def _rebuild_entry_points():
+        """ Build entry points of the modules loaded from scratch
+
+        Entry points registered outside of plugins package come first
+
+        :return None:
+        """
+        global _entry_points
+
+        entry_points = defaultdict(lambda: [])
+        prefix = plugins.__name__ + '.'
+        modules = [module for module in _module_entries if not module.startswith(prefix)] + list(_loaded_modules)
+        for module in modules:
+            for entry in _lazy_entries[module] if module in _lazy_modules else _module_entries.get(module, []):
+                entry_points[entry.params['type']].append(entry)
+
+        _entry_points = entry_points
+        _entries_cache.clear()
+
+    def _update_index(self, reloaded: list, log):
+        """ Update plugins index after modules reload
+
+        :param list reloaded: Names of modules re-imported
+        :param logging.Logger log:
+        :return None:
+        """
+        index = {load_name: record for load_name, record in self._read_index(log).items()
+                 if load_name in _loaded_modules and load_name not in reloaded}
+        for load_name in reloaded:
+            entries = self._export_entries(_module_entries[load_name])
+            if entries is not None:
+                index[load_name] = {'signature': _loaded_modules[load_name], 'entries': entries}
+
+        self._write_index(index, log)
+
+    @staticmethod
+    def _register_lazy(load_name: str, entries: list):
+        """ Register plugins of a module from index with no import
+
+        :param str load_name: Module name
+        :param list entries: Entry points exported to index
+        :return None:
+        """
+        _lazy_modules.add(load_name)
+        _lazy_entries[load_name] = [PluginEntry(_LazyPlugin(load_name, name, ordinal), params)
+                                    for ordinal, (name, params) in enumerate(entries)]
+        for entry in _lazy_entries[load_name]:
+            _entry_points[entry.params['type']].append(entry)
+        _entries_cache.clear()
+
+    @staticmethod
+    def _export_entries(entries: list):
+        """ Get entry points of a module in a form to be saved to index
+
+        :param list entries: List of PluginEntry
+        :return list: List of (name, params) or None if entry points can not be saved
+        """
+        exported = []
+        for entry in entries:
+            params = entry.params.copy()
+            if params.get('services') is not None:
+                params['services'] = [service if isinstance(service, str) else service.name()
+                                      for service in params['services']]
+            exported.append([entry.plugin.__name__, params])
+
+        try:
+            restored = json.loads(json.dumps(exported))
+        except (TypeError, ValueError):
+            return None
+
+        # Only JSON-compatible params are restored as is
+        return exported if restored == exported else None
+
+    def _read_index(self, log) -> dict:
+        """ Read plugins index
+
+        :param logging.Logger log:
+        :return dict: Index records by module name
+        """
+        try:
+            with open(self._index_path) as index_file:
+                index = json.load(index_file)
+            return index['modules'] if index.get('version') == _INDEX_VERSION else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            log.warning('Failed to read plugins index %s: %s', self._index_path, e)
+            return {}
+
+    def _write_index(self, index: dict, log):
+        """ Save plugins index
+
+        :param dict index: Index records by module name
+        :param logging.Logger log:
+        :return None:
+        """
+        try:
+            tmp_path = self._index_path + '.tmp'
+            with open(tmp_path, 'w') as index_file:
+                json.dump({'version': _INDEX_VERSION, 'modules': index}, index_file, indent=1, sort_keys=True)
+            os.replace(tmp_path, self._index_path)
+        except OSError as e:
+            log.warning('Failed to save plugins index %s: %s', self._index_path, e)
+
+    @staticmethod
+    def _report_import_times(import_times: list, log):
+        """ Log time taken by plugin modules import, the slowest first
+
+        :param list import_times: List of (time, module name, modules imported)
+        :param logging.Logger log:
+        :return None:
+        """
+        log.info('Plugin modules imported in %.3fs', sum(import_time for import_time, *_ in import_times))
+        for import_time, load_name, modules in sorted(import_times, key=lambda item: item[0], reverse=True):
+            packages = sorted({module.split('.')[0] for module in modules} - {plugins.__name__.split('.')[0]})
+            log.info('  %.3fs %s (%d modules imported%s)', import_time, load_name, len(modules),
+                     ': ' + ', '.join(packages) if packages else '')
+
+    @classmethod
+    def __get_signature(cls, load_name: str) -> list:
+        """ Get module files modification signature
+
+        :param str load_name: Module name
+        :return list: Last modification time (ns) and total size of module files
+        """
+        path = os.sep.join([cls.__PLUGINS_PATH, load_name.split(cls.__PKG_SEP)[-1]])
+        if os.path.isdir(path):
+            files = [os.path.join(directory, file) for directory, _, files in os.walk(path) for file in files
+                     if file.endswith(cls.__MODULE_EXT)]
+        else:
+            files = [path + cls.__MODULE_EXT]
+
+        stats = [os.stat(file) for file in files]
+        return [max(stat.st_mtime_ns for stat in stats), sum(stat.st_size for stat in stats)]
 
     @classmethod
     def lock_state(cls):
@@ -7,6 +7,7 @@ Modules
     service  -- Ctl plugins container service
     py_entry -- Entry decorators for python modules
     network  -- Dewyatochka control protocol impl
+    job      -- Detached control commands (jobs) implementation
 """
 
-__all__ = ['service', 'py_entry', 'network']
+__all__ = ['service', 'py_entry', 'network', 'job']
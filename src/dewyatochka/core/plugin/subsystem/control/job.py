@@ -0,0 +1,272 @@
+# -*- coding: UTF-8
+
+""" Detached control commands (jobs) implementation
+
+Classes
+=======
+    CancelToken       -- Cooperative cancellation flag
+    JobCancelledError -- Error raised by a command on cancellation
+    Job               -- Control command running in background
+    JobManager        -- Running jobs container
+
+Attributes
+==========
+    JOB_STATUS_RUNNING   -- Job is running
+    JOB_STATUS_DONE      -- Job is completed successfully
+    JOB_STATUS_FAILED    -- Job is completed with an error
+    JOB_STATUS_CANCELLED -- Job is cancelled
+"""
+
+import time
+import threading
+from collections import deque, OrderedDict
+
+__all__ = ['CancelToken', 'JobCancelledError', 'Job', 'JobManager',
+           'JOB_STATUS_RUNNING', 'JOB_STATUS_DONE', 'JOB_STATUS_FAILED', 'JOB_STATUS_CANCELLED']
+
+
+# Job statuses
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_DONE = 'done'
+JOB_STATUS_FAILED = 'failed'
+JOB_STATUS_CANCELLED = 'cancelled'
+
+
+class JobCancelledError(Exception):
+    """ Error raised by a command on cancellation """
+    pass
+
+
+class CancelToken:
+    """ Cooperative cancellation flag
+
+    Checked by a command between batches of work
+    """
+
+    def __init__(self):
+        """ Create not cancelled token """
+        self.__event = threading.Event()
+
+    def cancel(self):
+        """ Request cancellation
+
+        :return None:
+        """
+        self.__event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """ Check if cancellation is requested
+
+        :return bool:
+        """
+        return self.__event.is_set()
+
+    def raise_if_cancelled(self):
+        """ Abort command if cancellation is requested
+
+        :return None:
+        """
+        if self.cancelled:
+            raise JobCancelledError('Cancelled')
+
+
+class Job:
+    """ Control command running in background
+
+    Pretends to be a client connection for the command output,
+    so all the output is broadcast to clients attached. Output is
+    only stored by the job, each client attached forwards it in it's
+    own thread, so a slow client does not stall the job or the others
+    """
+
+    # Last output frames kept to replay to a client attached
+    _HISTORY_SIZE = 100
+
+    # Max time an attached client waits for output before checking it's connection (sec.)
+    _ATTACH_POLL_INTERVAL = 1
+
+    def __init__(self, id_: int, command, environment):
+        """ Create a job not started yet
+
+        :param int id_: Job ID
+        :param .network.Message command: Command message
+        :param .service.Environment environment: Command plugin environment
+        """
+        self.id = id_
+        self.command = command
+        self.status = JOB_STATUS_RUNNING
+        self.started_at = time.time()
+        self.finished_at = None
+        self.token = CancelToken()
+
+        self._environment = environment
+        self._history = deque(maxlen=self._HISTORY_SIZE)
+        self._sent = 0
+        self._lock = threading.Lock()
+        self._output = threading.Condition(self._lock)
+        self._done = threading.Event()
+
+    @property
+    def name(self) -> str:
+        """ Get command name
+
+        :return str:
+        """
+        return self.command.name
+
+    def run(self, logger=None):
+        """ Run command till the end, the result status is stored
+
+        :param logging.Logger logger:
+        :return None:
+        """
+        try:
+            self._environment.invoke(command=self.command, source=self, cancel_token=self.token)
+            self.status = JOB_STATUS_DONE
+        except JobCancelledError:
+            self.status = JOB_STATUS_CANCELLED
+        except Exception as e:
+            self.status = JOB_STATUS_FAILED
+            if logger is not None:
+                logger.error('Job #%d (%s) failed: %s', self.id, self.name, e)
+        finally:
+            with self._lock:
+                self.finished_at = time.time()
+                self._done.set()
+                self._output.notify_all()
+
+    def send(self, data: bytes):
+        """ Broadcast command output to clients attached
+
+        :param bytes data: Encoded message
+        :return None:
+        """
+        with self._lock:
+            self._history.append(data)
+            self._sent += 1
+            self._output.notify_all()
+
+    def _next_frames(self, forwarded: int, wait_time: float) -> tuple:
+        """ Wait for output not forwarded to a client yet
+
+        :param int forwarded: Count of frames forwarded to the client before
+        :param float wait_time: Max time to wait for
+        :return tuple: (frames, total frames count, job is finished or not)
+        """
+        with self._lock:
+            if forwarded == self._sent and not self._done.is_set() and wait_time > 0:
+                self._output.wait(wait_time)
+
+            skipped = max(0, forwarded - self._sent + len(self._history))
+            return list(self._history)[skipped:], self._sent, self._done.is_set()
+
+    def attach(self, client, timeout=None) -> bool:
+        """ Replay recent output to a client and stream the rest until job is finished
+
+        Returns earlier if client is disconnected
+
+        :param .service.Output client: Client output
+        :param float timeout: Max time to wait for
+        :return bool: Job is finished or not
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        forwarded = 0
+        while True:
+            wait_time = self._ATTACH_POLL_INTERVAL
+            if deadline is not None:
+                wait_time = min(wait_time, deadline - time.monotonic())
+
+            frames, forwarded, finished = self._next_frames(forwarded, wait_time)
+            for data in frames:
+                if not client.forward(data):
+                    return finished
+
+            if finished:
+                return True
+            if deadline is not None and time.monotonic() >= deadline or not client.connected:
+                return False
+
+    def cancel(self):
+        """ Request job cancellation
+
+        :return None:
+        """
+        self.token.cancel()
+
+    @property
+    def finished(self) -> bool:
+        """ Check if job is finished
+
+        :return bool:
+        """
+        return self._done.is_set()
+
+    def __str__(self) -> str:
+        """ Job short description
+
+        :return str:
+        """
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return '#%d %s: %s (%ds)' % (self.id, self.name, self.status, elapsed)
+
+
+class JobManager:
+    """ Running jobs container """
+
+    # Count of finished jobs to remember
+    _FINISHED_JOBS_KEPT = 20
+
+    def __init__(self):
+        """ Create empty container """
+        self._jobs = OrderedDict()
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def start(self, command, environment, logger=None) -> Job:
+        """ Start command in a background thread
+
+        :param .network.Message command: Command message
+        :param .service.Environment environment: Command plugin environment
+        :param logging.Logger logger: Logger for jobs failures
+        :return Job:
+        """
+        with self._lock:
+            self._last_id += 1
+            job = Job(self._last_id, command, environment)
+            self._jobs[job.id] = job
+
+            finished = [job_id for job_id, job_ in self._jobs.items() if job_.finished]
+            for job_id in finished[:max(0, len(finished) - self._FINISHED_JOBS_KEPT)]:
+                del self._jobs[job_id]
+
+        threading.Thread(name='job[#%d %s]' % (job.id, job.name), target=job.run, args=(logger,), daemon=True).start()
+        return job
+
+    def get(self, job_id: int) -> Job:
+        """ Get job by ID
+
+        :param int job_id:
+        :return Job:
+        """
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise RuntimeError('Job #%s is not found' % job_id)
+
+    @property
+    def jobs(self) -> list:
+        """ Get all the jobs known (running and recently finished)
+
+        :return list:
+        """
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel_all(self):
+        """ Request all the running jobs cancellation
+
+        :return None:
+        """
+        for job in self.jobs:
+            job.cancel()
@@ -4,11 +4,12 @@
 
 Classes
 =======
-    SocketListener      -- Abstract socket listener
+    SocketListener      -- Control socket server
     Message             -- Abstract client request
     InvalidMessageError -- Error on invalid message payload
     Client              -- Control client impl
     StreamReader        -- Messages stream reader
+    FrameDecoder        -- Incremental messages stream decoder
 
 Attributes
 ==========
@@ -19,9 +20,12 @@ import os
 import socket
 import json
 import time
+import selectors
 from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
 
-__all__ = ['Message', 'SocketListener', 'Client', 'StreamReader', 'InvalidMessageError', 'DEFAULT_SOCKET_PATH']
+__all__ = ['Message', 'SocketListener', 'Client', 'StreamReader', 'FrameDecoder', 'InvalidMessageError',
+           'DEFAULT_SOCKET_PATH']
 
 
 # Default path to socket
@@ -53,12 +57,17 @@ class Message:
         """
         return self._data
 
-    def encode(self) -> bytes:
+    def encode(self, length_prefixed=False) -> bytes:
         """ Serialize message
 
+        :param bool length_prefixed: Use length-prefixed frame instead of NUL-delimited one
         :return bytes:
         """
-        return json.dumps(self.data).encode() + StreamReader.MSG_DELIMITER
+        payload = json.dumps(self.data).encode()
+        if length_prefixed:
+            return StreamReader.FRAME_PREFIX + len(payload).to_bytes(StreamReader.FRAME_LENGTH_SIZE, 'big') + payload
+
+        return payload + StreamReader.MSG_DELIMITER
 
     def __getattr__(self, item: str):
         """ Attribute data access
@@ -101,6 +110,74 @@ class Message:
             raise InvalidMessageError()
 
 
+class FrameDecoder:
+    """ Incremental messages stream decoder
+
+    Splits data fed into message frames, both NUL-delimited
+    and length-prefixed frames are accepted in the same stream
+    """
+
+    # Consumed data is dropped from buffer when exceeds
+    _COMPACT_SIZE = 65536
+
+    def __init__(self):
+        """ Create decoder with empty buffer """
+        self._buffer = bytearray()
+        self._frame_start = 0
+        self._scan_pos = 0
+        self.ended = False
+
+    def feed(self, data: bytes):
+        """ Append data received to buffer
+
+        :param bytes data:
+        :return None:
+        """
+        self._buffer += data
+
+    def next_frame(self) -> bytes:
+        """ Get next complete frame payload
+
+        :return bytes: Frame payload or None if end of stream is reached or frame is incomplete yet
+        """
+        buffer, start = self._buffer, self._frame_start
+        if self.ended or start == len(buffer):
+            return None
+
+        if buffer.startswith(StreamReader.MSG_END, start):
+            self.ended = True
+            return None
+
+        if buffer.startswith(StreamReader.FRAME_PREFIX, start):
+            length_start = start + len(StreamReader.FRAME_PREFIX)
+            payload_start = length_start + StreamReader.FRAME_LENGTH_SIZE
+            if len(buffer) < payload_start:
+                return None
+            frame_end = payload_start + int.from_bytes(buffer[length_start:payload_start], 'big')
+            if len(buffer) < frame_end:
+                return None
+            next_start = frame_end
+        else:
+            if len(buffer) - start < len(StreamReader.MSG_END) and StreamReader.MSG_END.startswith(buffer[start:]):
+                return None  # Can not distinguish partial end of stream mark from a message yet
+
+            frame_end = buffer.find(StreamReader.MSG_DELIMITER, max(self._scan_pos, start))
+            if frame_end == -1:
+                self._scan_pos = len(buffer)  # Do not scan the same data again
+                return None
+            payload_start, next_start = start, frame_end + 1
+
+        with memoryview(buffer) as view:
+            payload = bytes(view[payload_start:frame_end])
+
+        self._frame_start = self._scan_pos = next_start
+        if next_start >= self._COMPACT_SIZE and next_start * 2 >= len(buffer):
+            del buffer[:next_start]
+            self._frame_start = self._scan_pos = 0
+
+        return payload
+
+
 class StreamReader:
     """ Messages stream reader """
 
@@ -110,51 +187,61 @@ class StreamReader:
     # End of stream flag
     MSG_END = b'\x01\x00'
 
+    # Length-prefixed frame start mark, followed by payload length and payload itself
+    FRAME_PREFIX = b'\x02'
+
+    # Length-prefixed frame payload length size, big-endian
+    FRAME_LENGTH_SIZE = 4
+
+    # Max bytes to receive at once
+    _RECV_SIZE = 65536
+
     def __init__(self, sock: socket.socket):
         """ Init helper
 
         :param socket.socket sock:
         """
         self.__sock = sock
-        self.__tail = b''
+        self.__decoder = FrameDecoder()
 
     def read_message(self) -> Message:
         """ Read a message from a socket
 
-        :return Message:
+        :return Message: Message or None on end of stream
         """
-        message = None
-        reset = False
-
-        while not reset:
-            chunk = self.__tail
-            if self.__tail:
-                self.__tail = b''
+        while True:
+            frame = self.__decoder.next_frame()
+            if frame is not None:
+                return Message.from_bytes(frame)
+            if self.__decoder.ended:
+                return None
 
             try:
-                chunk += self.__sock.recv(4096)
+                chunk = self.__sock.recv(self._RECV_SIZE)
             except ConnectionResetError:
-                reset = True
+                chunk = b''
 
-            if chunk.startswith(self.MSG_END):
-                # Reached end of stream, return None
-                break
+            if not chunk:
+                return None
+
+            self.__decoder.feed(chunk)
 
-            delimiter_pos = chunk.find(self.MSG_DELIMITER)
-            if ~delimiter_pos:
-                # Chunk is a complete message
-                chunk, self.__tail = chunk[:delimiter_pos], chunk[delimiter_pos + 1:]
-                message = Message.from_bytes(chunk)
-                break
 
-            # Message end is not reached, continue
-            self.__tail += chunk
+class SocketListener:
+    """ Control socket server
 
-        return message
+    Connections are multiplexed by a selector in the serving thread,
+    commands received are handled by a worker threads pool
+    """
 
+    # Max commands handled at once by default
+    DEFAULT_WORKERS = 4
 
-class SocketListener:
-    """ Abstract socket listener """
+    # Time allowed to a client to send a command
+    _CLIENT_TIMEOUT = 5
+
+    # Max bytes to receive at once
+    _RECV_SIZE = 4096
 
     def __init__(self, address=None, backlog=0):
         """ Init listener instance
@@ -168,6 +255,8 @@ class SocketListener:
         self.__socket = None
         self.__status_change = Lock()
         self.__opened = False
+        self.__serving = False
+        self.__wakeup = None
 
     @property
     def _socket(self) -> socket.socket:
@@ -194,70 +283,183 @@ class SocketListener:
         :return None:
         """
         with self.__status_change:
-            self._socket.settimeout(0.45)
             self._socket.bind(self.__address)
             self._socket.listen(self.__backlog)
+            self._socket.setblocking(False)
+            self.__wakeup = socket.socketpair()
             self.__opened = True
 
-    @property
-    def commands(self):
-        """ Iterator over input data
+    def serve(self, handler: callable, workers=DEFAULT_WORKERS):
+        """ Handle commands received until closed
 
-        :return socket.socket:
+        Commands being handled on close are completed, the ones not started yet are dropped
+
+        :param callable handler: Command handler, (Message, socket.socket) -> None
+        :param int workers: Max commands handled at once
+        :return None:
         """
-        def __send(conn, msg):
-            try:
-                conn.send(msg)
-            except BrokenPipeError:
-                pass
+        with self.__status_change:
+            if not self.__opened:
+                return
+            self.__serving = True
 
+        selector = selectors.DefaultSelector()
+        selector.register(self._socket, selectors.EVENT_READ)
+        selector.register(self.__wakeup[0], selectors.EVENT_READ)
+        pending = {}
+        executor = ThreadPoolExecutor(workers)
+
+        try:
+            while self.__opened:
+                timeout = max(0, min(pending.values()) - time.monotonic()) if pending else None
+                for key, _ in selector.select(timeout):
+                    if key.fileobj is self._socket:
+                        self._accept(selector, pending)
+                    elif key.fileobj in pending:
+                        self._receive(key.fileobj, selector, pending, executor, handler)
+
+                now = time.monotonic()
+                for connection in [c for c, deadline in pending.items() if deadline <= now]:
+                    del pending[connection]
+                    selector.unregister(connection)
+                    self._disconnect(connection)
+
+        finally:
+            for connection in pending:
+                self._disconnect(connection)
+            selector.close()
+            executor.shutdown(wait=True)
+
+            with self.__status_change:
+                self.__serving = False
+                self._release()
+
+    def _accept(self, selector: selectors.BaseSelector, pending: dict):
+        """ Accept all the connections awaiting
+
+        :param selectors.BaseSelector selector: Selector to register connections in
+        :param dict pending: Connections waiting for a command with their deadlines
+        :return None:
+        """
         while True:
-            connection = None
             try:
-                # Black magic
-                # For some reason unable to acquire lock in another tread
-                # on slow hardware without this small delay
-                time.sleep(0.05)
+                connection = self._socket.accept()[0]
+            except (BlockingIOError, InterruptedError):
+                break
+
+            connection.setblocking(False)
+            selector.register(connection, selectors.EVENT_READ, FrameDecoder())
+            pending[connection] = time.monotonic() + self._CLIENT_TIMEOUT
 
-                with self.__status_change:
-                    if not self.__opened:
-                        break
-                    connection = self._socket.accept()[0]
+    def _receive(self, connection: socket.socket, selector: selectors.BaseSelector, pending: dict,
+                 executor: ThreadPoolExecutor, handler: callable):
+        """ Read available data, dispatch command to a worker once a complete message is received
 
-                command = StreamReader(connection).read_message()
-                if not command.name:
-                    raise InvalidMessageError()
-                yield command, connection
+        :param socket.socket connection:
+        :param selectors.BaseSelector selector:
+        :param dict pending: Connections waiting for a command with their deadlines
+        :param ThreadPoolExecutor executor:
+        :param callable handler:
+        :return None:
+        """
+        try:
+            chunk = connection.recv(self._RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except ConnectionError:
+            chunk = b''
+
+        decoder = selector.get_key(connection).data
+        decoder.feed(chunk)
+        frame = decoder.next_frame()
+        if frame is None and chunk and not decoder.ended:
+            return  # Message end is not reached, continue
+
+        del pending[connection]
+        selector.unregister(connection)
+        connection.setblocking(True)
 
-            except socket.timeout:
-                pass
+        try:
+            command = Message.from_bytes(frame)
+            if not command.name:
+                raise InvalidMessageError()
+        except InvalidMessageError:
+            self._send(connection, 'Message format unrecognized'.encode())
+            self._disconnect(connection)
+        else:
+            executor.submit(self._handle, handler, command, connection)
 
-            except InvalidMessageError:
-                __send(connection, 'Message format unrecognized'.encode())
+    def _handle(self, handler: callable, command: Message, connection: socket.socket):
+        """ Handle a command in a worker thread
 
-            else:
-                __send(connection, StreamReader.MSG_END)
+        :param callable handler:
+        :param Message command:
+        :param socket.socket connection:
+        :return None:
+        """
+        try:
+            if self.__opened:
+                handler(command, connection)
+        finally:
+            self._send(connection, StreamReader.MSG_END)
+            self._disconnect(connection)
+
+    @staticmethod
+    def _send(connection: socket.socket, data: bytes):
+        """ Send data ignoring disconnected clients
+
+        :param socket.socket connection:
+        :param bytes data:
+        :return None:
+        """
+        try:
+            connection.sendall(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    @staticmethod
+    def _disconnect(connection: socket.socket):
+        """ Close client connection
+
+        :param socket.socket connection:
+        :return None:
+        """
+        try:
+            connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        connection.close()
+
+    def _release(self):
+        """ Close listening socket and wakeup channel, remove socket file
 
-            finally:
-                if connection:
-                    time.sleep(0.05)
-                    connection.shutdown(socket.SHUT_RDWR)
-                    connection.close()
+        :return None:
+        """
+        self._socket.close()
+        self.__socket = None
+        for wakeup_socket in self.__wakeup or ():
+            wakeup_socket.close()
+        self.__wakeup = None
+
+        try:
+            os.unlink(self._address)
+        except FileNotFoundError:
+            pass
 
     def close(self):
-        """ Close socket
+        """ Close socket, stop serving
 
         :return None:
         """
         with self.__status_change:
             if not self.__opened:
                 return
-            try:
-                self.__opened = False
-                self._socket.close()
-                os.unlink(self._address)
-            except FileNotFoundError:
-                pass
+
+            self.__opened = False
+            if self.__serving:
+                self.__wakeup[1].send(b'\0')  # Serving thread releases resources itself
+            else:
+                self._release()
 
     def __enter__(self):
         """ Open socket on enter
@@ -7,7 +7,7 @@ Functions
     control -- Decorator for ctl-plugin
 """
 
-from dewyatochka.core.plugin.loader.internal import entry_point
+from dewyatochka.core.plugin.loader.internal import entry_point, get_entry
 from dewyatochka.core.plugin.exceptions import PluginRegistrationError
 
 from .service import PLUGIN_TYPE_CTL
@@ -15,10 +15,6 @@ from .service import PLUGIN_TYPE_CTL
 __all__ = ['control']
 
 
-# Commands already in use
-_used_commands = set()
-
-
 def control(name: str, description: str, *, services=None) -> callable:
     """ Register this function as a ctl command
 
@@ -36,9 +32,8 @@ def control(name: str, description: str, *, services=None) -> callable:
             module_name = fn.__module__.split('.')[-1]
             full_name = '.'.join((module_name, name))
 
-        if full_name in _used_commands:
+        if get_entry(PLUGIN_TYPE_CTL, name=full_name) is not None:
             raise PluginRegistrationError('ctl command "%s" is already in use' % full_name)
-        _used_commands.add(full_name)
 
         return entry_point(PLUGIN_TYPE_CTL, services=services, name=full_name, description=description)(fn)
 
@@ -16,6 +16,8 @@ Attributes
     PLUGIN_TYPES     -- All plugin types list
 """
 
+import socket
+
 from dewyatochka.core.application import Application
 from dewyatochka.core.application import Service as BaseService
 from dewyatochka.core.plugin.base import Service as BasePluginService
@@ -25,6 +27,7 @@ from dewyatochka.core.plugin.base import PluginEntry
 from dewyatochka.core.plugin.exceptions import PluginRegistrationError
 
 from .network import Message, Client
+from .job import CancelToken, JobManager
 
 __all__ = ['Service', 'Output', 'Wrapper', 'Environment', 'ClientService', 'PLUGIN_TYPE_CTL', 'PLUGIN_TYPES']
 
@@ -40,14 +43,16 @@ class Output:
     Passed to each plugin to allow communication to client
     """
 
-    def __init__(self, connection, logger):
+    def __init__(self, connection, logger, cancel_token=None):
         """ Bind output wrapper to xmpp-client and a conference
 
-        :param socket connection:
+        :param socket connection: Client connection or a job
         :param logger:
+        :param CancelToken cancel_token: Token to check for cancellation
         """
         self._connection = connection
         self._log = logger
+        self._cancel_token = cancel_token or CancelToken()
 
     def __send(self, message: Message):
         """ Send a message
@@ -74,6 +79,15 @@ class Output:
         self.__send(Message(text=formatted_text))
         self._log.info(text, *args)
 
+    def write(self, text: str, *args):
+        """ Send something to client only with no logging (for bulky output)
+
+        :param str text: Message content
+        :param tuple args: Args for message format
+        :return None:
+        """
+        self.__send(Message(text=(text % args) if args else text))
+
     def error(self, text: str, *args):
         """ Send error message
 
@@ -94,6 +108,64 @@ class Output:
         """
         self._log.debug(text, *args)
 
+    def progress(self, text: str, *args):
+        """ Send progress info, replaces the previous one on client side
+
+        :param str text: Message content
+        :param tuple args: Args for message format
+        :return None:
+        """
+        formatted_text = (text % args) if args else text
+        self.__send(Message(progress=formatted_text))
+        self._log.progress(text, *args)
+
+    def forward(self, data: bytes) -> bool:
+        """ Send already encoded data as is
+
+        :param bytes data:
+        :return bool: Client is still connected or not
+        """
+        try:
+            if self._connection:
+                self._connection.sendall(data)
+                return True
+        except (BrokenPipeError, ConnectionResetError):
+            self._connection = None
+
+        return False
+
+    @property
+    def connected(self) -> bool:
+        """ Check if client is still connected (peer has not closed connection)
+
+        :return bool:
+        """
+        if isinstance(self._connection, socket.socket):
+            try:
+                if not self._connection.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT):
+                    self._connection = None
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self._connection = None
+
+        return bool(self._connection)
+
+    @property
+    def cancelled(self) -> bool:
+        """ Check if command cancellation is requested
+
+        :return bool:
+        """
+        return self._cancel_token.cancelled
+
+    def raise_if_cancelled(self):
+        """ Abort command if cancellation is requested, to be called between batches of work
+
+        :return None:
+        """
+        self._cancel_token.raise_if_cancelled()
+
     # Some useful aliases
     log = say = info
 
@@ -107,21 +179,25 @@ class Wrapper(BaseWrapper):
         :param PluginEntry entry: Raw plugin entry
         :return Environment:
         """
-        return Environment(entry.plugin, self._get_registry(entry))
+        environment = Environment(entry.plugin, self._get_registry(entry))
+        environment.type = entry.params.get('type')
+
+        return environment
 
 
 class Environment(BaseEnvironment):
     """ Environment for a ctl plugin """
 
-    def invoke(self, *, command, source, **kwargs):
+    def invoke(self, *, command, source, cancel_token=None, **kwargs):
         """ Invoke plugin in environment registered
 
         :param .network.Message command: Message to process
-        :param socket.socket source: Message source
+        :param socket.socket source: Message source (client connection or a job)
+        :param CancelToken cancel_token: Token to check for cancellation
         :param dict kwargs: Params to path to a plugin
         :return None:
         """
-        output = Output(source, self._registry.log)
+        output = Output(source, self._registry.log, cancel_token)
 
         try:
             super().invoke(inp=command, outp=output, **kwargs)
@@ -129,6 +205,15 @@ class Environment(BaseEnvironment):
             output.error('%s', e)
             raise
 
+    def _get_trace_subject(self, *, command, **_):
+        """ Get command name the plugin is invoked on
+
+        :param .network.Message command:
+        :param dict _:
+        :return str:
+        """
+        return command.name
+
 
 class Service(BasePluginService):
     """ Ctl plugins container service """
@@ -144,6 +229,7 @@ class Service(BasePluginService):
         super().__init__(application)
 
         self._commands = {}
+        self._jobs = JobManager()
 
     @property
     def accepts(self) -> list:
@@ -167,6 +253,17 @@ class Service(BasePluginService):
         self._commands[entry.params['name']] = wrapped
         self._plugins.append(wrapped)
 
+    def swap(self, generation):
+        """ Replace plugins with a generation built
+
+        Background jobs are kept running
+
+        :param Service generation: Service instance returned by build()
+        :return None:
+        """
+        self._commands = generation._commands
+        super().swap(generation)
+
     def get_command(self, name: str):
         """ Get command to use
 
@@ -181,6 +278,14 @@ class Service(BasePluginService):
 
         return self._commands[name]
 
+    @property
+    def jobs(self) -> JobManager:
+        """ Get detached commands container
+
+        :return JobManager:
+        """
+        return self._jobs
+
     @classmethod
     def name(cls) -> str:
         """ Get service unique name
@@ -202,15 +307,20 @@ class ClientService(BaseService):
 
         self.socket = None
 
-    def communicate(self, command: str, optional: dict):
+    def communicate(self, command: str, optional: dict, detach=False):
         """ Communicate with daemon
 
         :param str command: Command name
         :param dict optional: Optional command args
+        :param bool detach: Run command as a background job
         :return None:
         """
+        message = Message(name=command, args=optional or {})
+        if detach:
+            message.detach = True
+
         with Client(self.socket) as ctl_client:
-            ctl_client.send(Message(name=command, args=optional or {}))
+            ctl_client.send(message)
             for msg in ctl_client.input:
                 if msg.error:
                     self.log.error('Server error: %s', msg.error)
@@ -218,6 +328,9 @@ class ClientService(BaseService):
                 elif msg.text:
                     self.log.info(msg.text)
 
+                elif msg.progress:
+                    self.log.progress(msg.progress)
+
                 else:
                     self.log.error('Unhandled message: %s', str(msg.data))
 
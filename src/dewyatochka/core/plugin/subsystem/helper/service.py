@@ -95,6 +95,7 @@ class Wrapper(BaseWrapper):
         else:
             environment = Environment(entry.plugin, registry)
 
+        environment.type = entry.params['type']
         return environment
 
 
@@ -128,6 +129,15 @@ class Service(BaseService):
         self._plugins.append(wrapped)
         self.__plugins_by_type[entry.params['type']].append(wrapped)
 
+    def swap(self, generation):
+        """ Replace plugins with a generation built
+
+        :param Service generation: Service instance returned by build()
+        :return None:
+        """
+        self.__plugins_by_type = generation.__plugins_by_type
+        super().swap(generation)
+
     @property
     def accepts(self) -> list:
         """ Get list of acceptable plugin types
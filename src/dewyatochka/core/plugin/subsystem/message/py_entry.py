@@ -9,17 +9,13 @@ Functions
     chat_accost  -- Decorator for chat accost plugin
 """
 
-from dewyatochka.core.plugin.loader.internal import entry_point
+from dewyatochka.core.plugin.loader.internal import entry_point, get_entry
 from dewyatochka.core.plugin.exceptions import PluginRegistrationError
 from .matcher import PLUGIN_TYPE_COMMAND, PLUGIN_TYPE_MESSAGE, PLUGIN_TYPE_ACCOST
 
 __all__ = ['chat_command', 'chat_message', 'chat_accost']
 
 
-# Commands already in use
-_reserved_commands = set()
-
-
 def chat_message(fn=None, *, services=None, regular=False, system=False, own=False) -> callable:
     """ Decorator to mark function as message handler entry point
 
@@ -42,10 +38,9 @@ def chat_command(command, *, services=None) -> callable:
     :param str command: Command name without prefix
     :return callable:
     """
-    if command in _reserved_commands:
+    if get_entry(PLUGIN_TYPE_COMMAND, command=command) is not None:
         raise PluginRegistrationError('Chat command %s is already in use' % command)
 
-    _reserved_commands.add(command)
     return entry_point(PLUGIN_TYPE_COMMAND, services=services, command=command)
 
 
@@ -63,8 +63,34 @@ class Environment(BaseEnvironment):
         :param dict kwargs: Params to path to a plugin
         :return None:
         """
-        if self._matcher.match(message):
-            super().invoke(inp=message, outp=self._get_output_wrapper(message.sender), **kwargs)
+        super().invoke(inp=message, outp=self._get_output_wrapper(message.sender), **kwargs)
+
+    def _should_invoke(self, *, message, **_) -> bool:
+        """ Check if the message is acceptable for the plugin
+
+        :param Message message:
+        :param dict _:
+        :return bool:
+        """
+        return self._matcher.match(message)
+
+    def _get_trace_subject(self, *, message, **_):
+        """ Get ID of the message the plugin is invoked on (same as in message processing thread name)
+
+        :param Message message:
+        :param dict _:
+        :return str:
+        """
+        return '%x' % id(message)
+
+    def _get_log_context(self, *, message, **_) -> dict:
+        """ Get conference the message is received from to attach to records logged
+
+        :param Message message:
+        :param dict _:
+        :return dict:
+        """
+        return {'conference': message.sender.chat}
 
     def _get_output_wrapper(self, destination: Participant):
         """ Get output wrapper for a conference
@@ -109,7 +135,10 @@ class Wrapper(BaseWrapper):
         c_manager = self._service.application.registry.chat_manager
         matcher_ = self._get_matcher(entry)
 
-        return Environment(entry.plugin, registry, c_manager, matcher_)
+        environment = Environment(entry.plugin, registry, c_manager, matcher_)
+        environment.type = entry.params.get('type')
+
+        return environment
 
 
 class Service(BaseService):
@@ -4,10 +4,14 @@
 
 Classes
 =======
-    WebClient -- Simple high-level HTTP-client for browsing
+    WebClient     -- Simple high-level HTTP-client for browsing
+    ResponseCache -- Size bounded memory + disk HTTP responses cache
+    HTTPService   -- Keep-alive web clients pool service
 
 Attributes
 ==========
+    CachedResponse -- Cached response structure
+
     TYPE_HTML -- text/html
     TYPE_JSON -- application/json
     TYPE_TEXT -- text/plain
@@ -15,16 +19,29 @@ Attributes
 
 from http.client import HTTPConnection, HTTPSConnection, HTTPResponse
 from urllib.parse import urlencode
+from collections import defaultdict, namedtuple, OrderedDict
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+import os
 import json
-from html.parser import HTMLParser
+import time
+import zlib
+import pickle
+import hashlib
+import re
+import codecs
+import threading
 
 from dewyatochka import __version__
+from dewyatochka.core.application import Service
+from dewyatochka.core.metrics import registry as metrics
 
-__all__ = ['WebClient']
+__all__ = ['WebClient', 'ResponseCache', 'CachedResponse', 'HTTPService']
 
 
 try:
     from pyquery import PyQuery
+    from lxml import html as lxml_html, etree as lxml_etree
 
 except ImportError:  # pragma: nocover
     class PyQuery:
@@ -40,16 +57,73 @@ except ImportError:  # pragma: nocover
             """ Allow to fetch raw html as a fallback """
             return self._html
 
+    lxml_html = None
+
 
 # Default user agent to use
 _DEFAULT_USER_AGENT = 'Dewyatochka/%s' % __version__
 
+# Errors on attempt to use a connection closed by remote host
+_STALE_CONNECTION_ERRORS = (ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+# Max idle connections kept per host by default
+_DEFAULT_POOL_SIZE = 4
+
+# Idle connection lifetime by default (sec.)
+_DEFAULT_IDLE_TIMEOUT = 60
+
+# Memory cache size by default (bytes)
+_DEFAULT_CACHE_SIZE = 8 * 2 ** 20
+
+# Disk cache size by default (bytes)
+_DEFAULT_CACHE_DISK_SIZE = 64 * 2 ** 20
+
+# Cached response structure (headers: dict, body: bytes, expires_at: float)
+CachedResponse = namedtuple('CachedResponse', ['headers', 'body', 'expires_at'])
+
+# Response headers updated in cache on revalidation
+_REVALIDATION_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Expires', 'Date')
+
+# Content encodings supported
+_ACCEPT_ENCODING = 'gzip, deflate'
+
+# Body chunk size to read at once on streaming
+_STREAM_CHUNK_SIZE = 65536
+
+# Number of leading html-doc bytes to look for <meta> charset declaration in
+_PRESCAN_SIZE = 4096
+
+# Byte order marks recognized in html-docs
+_BOM_ENCODINGS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be'))
+
+# Matches both <meta charset="..."> and <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET_RE = re.compile(rb'''<meta\s[^>]*?charset\s*=\s*["']?\s*([-\w.:]+)''', re.IGNORECASE)
+
+# Html comments to skip while sniffing
+_COMMENT_RE = re.compile(rb'<!--.*?(?:-->|$)', re.DOTALL)
+
 # Content-types
 TYPE_HTML = 'text/html'
 TYPE_JSON = 'application/json'
 TYPE_TEXT = 'text/plain'
 
 
+def _get_header(headers: dict, name: str, default=None) -> str:
+    """ Get header value case-insensitively
+
+    :param dict headers:
+    :param str name: Header name
+    :param str default:
+    :return str:
+    """
+    name = name.lower()
+    for header, value in headers.items():
+        if header.lower() == name:
+            return value
+
+    return default
+
+
 def _parse_content_type_enc(content_type: str, default=None) -> str:
     """ Get encoding from content-type value
 
@@ -72,7 +146,7 @@ def _get_http_encoding(headers: dict, default='UTF-8') -> str:
     :param str default:
     :return str:
     """
-    content_type = headers.get('Content-Type', '')
+    content_type = _get_header(headers, 'Content-Type', '')
     return _parse_content_type_enc(content_type, default)
 
 
@@ -94,53 +168,96 @@ def _json_parser(content: bytes, headers: dict):
     :returns: Content dependent
     """
     encoding = _get_http_encoding(headers)
-    return json.loads(content.decode(encoding), encoding)
+    return json.loads(content.decode(encoding))
 
 
-def _html_parser(content, headers: dict) -> PyQuery:
-    """ str -> PyQuery parser or a stub
+def _sniff_html_encoding(content: bytes) -> str:
+    """ Get encoding declared by BOM or <meta> in the first bytes of html-doc
 
-    :param str content:
-    :param dict headers:
-    :return PyQuery:
+    :param bytes content:
+    :return str: Encoding name or None if not declared / unknown
     """
-    class _HTMLParser(HTMLParser):
-        """ Private html parser implementation """
+    for bom, bom_encoding in _BOM_ENCODINGS:
+        if content.startswith(bom):
+            return bom_encoding
+
+    head = _COMMENT_RE.sub(b'', content[:_PRESCAN_SIZE])
+    for match in _META_CHARSET_RE.finditer(head):
+        try:
+            encoding = codecs.lookup(match.group(1).decode('ascii')).name
+        except LookupError:
+            continue
 
-        __html_encoding = None
+        # Document is already known to be ascii compatible if meta is readable
+        return 'utf-8' if encoding.startswith('utf-16') else encoding
 
-        def handle_starttag(self, tag: str, attrs: list):
-            """ Handle start tag
-            :param str tag: Tag name
-            :param list attrs: Attributes
-            """
-            if self.__html_encoding or tag.lower() != 'meta':
-                return  # FIXME: Completely break when encoding is found
+    return None
+
+
+def _html_parser(content: bytes, headers: dict) -> PyQuery:
+    """ bytes -> PyQuery parser or a stub
+
+    :param bytes content:
+    :param dict headers:
+    :return PyQuery:
+    """
+    # Html-doc encoding takes precedence, use 1-byte encoding by default
+    encoding = _sniff_html_encoding(content) or _get_http_encoding(headers, 'iso-8859-1')
 
-            attrs_dict = dict(attrs)
-            if attrs_dict.get('http-equiv') != 'Content-Type':
-                return
+    if lxml_html is not None:
+        try:
+            return PyQuery(lxml_html.fromstring(content, parser=lxml_html.HTMLParser(encoding=encoding)))
+        except LookupError:
+            pass  # Encoding is known to python but not to libxml2
+        except lxml_etree.ParserError:
+            pass  # Blank document, let PyQuery handle it
 
-            self.__html_encoding = _parse_content_type_enc(attrs_dict.get('content', ''))
+    return PyQuery(content.decode(encoding, 'ignore'))
 
-        @property
-        def encoding(self) -> str:
-            """ Get parsed encoding value
-            :return str:
-            """
-            return self.__html_encoding
 
-    # Try to get encoding from headers, use 1-byte encoding by default
-    http_encoding = _get_http_encoding(headers, 'iso-8859-1')
-    str_content = content.decode(http_encoding, 'ignore')
+class _ContentDecoder:
+    """ Incremental decoder for content-encoding specified """
 
-    # Try to get encoding from html-doc and if it differs use it for strict decoding
-    html_parser = _HTMLParser(convert_charrefs=False)
-    html_parser.feed(str_content)
-    if html_parser.encoding and html_parser.encoding != http_encoding:
-        str_content = content.decode(html_parser.encoding)
+    def __init__(self, content_encoding: str):
+        """ Create decompressor
 
-    return PyQuery(str_content)
+        :param str content_encoding: Content-Encoding header value
+        """
+        self._encoding = (content_encoding or '').strip().lower()
+        if self._encoding in ('gzip', 'x-gzip'):
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self._encoding == 'deflate':
+            self._decompressor = zlib.decompressobj()
+        else:
+            self._decompressor = None
+        self._started = False
+
+    def decode(self, chunk: bytes) -> bytes:
+        """ Decode next body chunk
+
+        :param bytes chunk:
+        :return bytes:
+        """
+        if self._decompressor is None:
+            return chunk
+
+        try:
+            return self._decompressor.decompress(chunk)
+        except zlib.error:
+            if self._started or self._encoding != 'deflate':
+                raise
+            # Some servers send raw deflate stream with no zlib header
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressor.decompress(chunk)
+        finally:
+            self._started = True
+
+    def flush(self) -> bytes:
+        """ Get the rest of decoded data
+
+        :return bytes:
+        """
+        return self._decompressor.flush() if self._decompressor is not None else b''
 
 
 def _get_parser(content_type: str) -> callable:
@@ -156,32 +273,318 @@ def _get_parser(content_type: str) -> callable:
     }.get(content_type, lambda c, *_: c)
 
 
+def _get_freshness_lifetime(headers: dict, now: float):
+    """ Get time response may be used with no revalidation
+
+    :param dict headers: Response headers
+    :param float now: Current timestamp
+    :return int: Lifetime, None if response must not be stored
+    """
+    directives = {}
+    for directive in _get_header(headers, 'Cache-Control', '').split(','):
+        name, _, value = directive.partition('=')
+        directives[name.strip().lower()] = value.strip().strip('"')
+
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0
+
+    try:
+        if 'max-age' in directives:
+            return max(int(directives['max-age']), 0)
+
+        expires = _get_header(headers, 'Expires')
+        if expires:
+            date = _get_header(headers, 'Date')
+            date_ts = parsedate_to_datetime(date).timestamp() if date else now
+            return max(int(parsedate_to_datetime(expires).timestamp() - date_ts), 0)
+
+    except (ValueError, TypeError):
+        pass  # Invalid date = already expired
+
+    return 0
+
+
+class ResponseCache:
+    """ Size bounded memory + disk HTTP responses cache
+
+    Least recently used responses are evicted first, disk
+    storage is optional and is used on memory cache miss
+    """
+
+    def __init__(self, max_size=_DEFAULT_CACHE_SIZE, directory=None, max_disk_size=_DEFAULT_CACHE_DISK_SIZE):
+        """ Create an empty cache
+
+        :param int max_size: Max memory cache size (bytes)
+        :param str directory: Directory to store responses on disk or None to keep them in memory only
+        :param int max_disk_size: Max disk cache size (bytes)
+        """
+        self._max_size = max_size
+        self._size = 0
+        self._entries = OrderedDict()
+
+        self._directory = directory
+        self._max_disk_size = max_disk_size
+        self._disk_size = None
+
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(entry: CachedResponse) -> int:
+        """ Get approximate entry size
+
+        :param CachedResponse entry:
+        :return int:
+        """
+        return len(entry.body) + sum(len(header) + len(value) for header, value in entry.headers.items())
+
+    def _disk_path(self, key: str) -> str:
+        """ Get path to a file to store response by key
+
+        :param str key:
+        :return str:
+        """
+        return os.path.join(self._directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def _remember(self, key: str, entry: CachedResponse):
+        """ Put entry into memory cache evicting the least recently used ones (lock must be acquired)
+
+        :param str key:
+        :param CachedResponse entry:
+        :return None:
+        """
+        if key in self._entries:
+            self._size -= self._entry_size(self._entries.pop(key))
+
+        entry_size = self._entry_size(entry)
+        if entry_size > self._max_size:
+            return
+
+        self._entries[key] = entry
+        self._size += entry_size
+        while self._size > self._max_size:
+            self._size -= self._entry_size(self._entries.popitem(last=False)[1])
+
+    def _load(self, key: str) -> CachedResponse:
+        """ Load entry from disk
+
+        :param str key:
+        :return CachedResponse:
+        """
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as entry_file:
+                stored_key, entry = pickle.load(entry_file)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            return None
+
+        return CachedResponse(*entry) if stored_key == key else None
+
+    def _store(self, key: str, entry: CachedResponse):
+        """ Save entry on disk evicting the least recently used ones
+
+        :param str key:
+        :param CachedResponse entry:
+        :return None:
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+        with open(tmp_path, 'wb') as entry_file:
+            pickle.dump((key, tuple(entry)), entry_file)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += os.path.getsize(path)
+            if self._disk_size is None or self._disk_size > self._max_disk_size:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        """ Remove the least recently used files until disk cache fits it's size (lock must be acquired)
+
+        :return None:
+        """
+        files = []
+        for name in os.listdir(self._directory):
+            if not name.endswith('.tmp'):
+                stat = os.stat(os.path.join(self._directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+
+        self._disk_size = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if self._disk_size <= self._max_disk_size:
+                break
+            os.unlink(os.path.join(self._directory, name))
+            self._disk_size -= size
+
+    def get(self, key: str) -> CachedResponse:
+        """ Get cached response (fresh or not)
+
+        :param str key: Response key (URL)
+        :return CachedResponse: Cached response or None if nothing is cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self._directory is None:
+            return None
+
+        entry = self._load(key)
+        if entry is not None:
+            with self._lock:
+                self._remember(key, entry)
+
+        return entry
+
+    def put(self, key: str, headers: dict, body: bytes, ttl=None):
+        """ Cache response if it is allowed by response headers
+
+        Responses with no freshness info are cached too if they may
+        be revalidated (have ETag or Last-Modified header)
+
+        :param str key: Response key (URL)
+        :param dict headers: Response headers
+        :param bytes body: Decoded response body
+        :param int ttl: Freshness lifetime to use instead of the one specified by server
+        :return None:
+        """
+        now = time.time()
+        lifetime = _get_freshness_lifetime(headers, now)
+        if lifetime is None:
+            return
+        if ttl is not None:
+            lifetime = ttl
+        if not lifetime and not (_get_header(headers, 'ETag') or _get_header(headers, 'Last-Modified')):
+            return
+
+        entry = CachedResponse(headers, body, now + lifetime)
+        with self._lock:
+            self._remember(key, entry)
+
+        if self._directory is not None:
+            self._store(key, entry)
+
+
 class WebClient:
     """ Simple high-level HTTP-client for browsing """
 
-    def __init__(self, host, port=None, https=False):
+    def __init__(self, host, port=None, https=False, cache=None):
         """ Init client, create initial headers set
 
         :param str host: Remote server host
         :param int port: int Remote server port
         :param bool https: Use HTTPS instead of HTTP
+        :param ResponseCache cache: Responses cache to use with get()
         """
         self._headers = {'Accept': 'text/html,application/xhtml+xml,application/xml,text/plain,application/json',
                          'Connection': 'keep-alive', 'Host': host, 'User-Agent': _DEFAULT_USER_AGENT}
         self._connection = (HTTPSConnection if https else HTTPConnection)(host, port)
+        self._response = None
 
-    def get_raw(self, uri: str, query=None) -> HTTPResponse:
+        self.cache = cache
+        self._cache_key_prefix = '%s://%s%s' % ('https' if https else 'http', host, ':%d' % port if port else '')
+        self.cache_ttl = None
+
+        self._request_time = metrics.histogram('http_request_seconds', 'HTTP request time till response headers',
+                                               {'host': host})
+
+    def get_raw(self, uri: str, query=None, headers=None) -> HTTPResponse:
         """ Get directly HTTPResponse object with no parsing
 
+        Request is sent once again over a new connection
+        if a kept alive one has been closed by remote host
+
         :param str uri: Request uri
         :param dict query: Query params
+        :param dict headers: Additional request headers
         :return HTTPResponse:
         """
         if query is not None:
             uri = '?'.join([uri, urlencode(query)])
 
-        self._connection.request('GET', uri, headers=self._headers)
-        return self._connection.getresponse()
+        request_headers = dict(self._headers, **headers) if headers else self._headers
+
+        reused = getattr(self._connection, 'sock', None) is not None
+        with self._request_time.time():
+            try:
+                self._connection.request('GET', uri, headers=request_headers)
+                self._response = self._connection.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                self._connection.close()
+                self._connection.request('GET', uri, headers=request_headers)
+                self._response = self._connection.getresponse()
+
+        return self._response
+
+    def _get_encoded(self, uri: str, query=None) -> HTTPResponse:
+        """ Request content allowing compressed transfer
+
+        :param str uri: Request uri
+        :param dict query: Query params
+        :return HTTPResponse:
+        """
+        return self.get_raw(uri, query, {'Accept-Encoding': _ACCEPT_ENCODING})
+
+    def _iter_body(self, response: HTTPResponse, chunk_size=_STREAM_CHUNK_SIZE):
+        """ Read decoded response body chunk by chunk
+
+        Connection is closed if body is not read completely
+        as it can not be used for the next request anymore
+
+        :param HTTPResponse response:
+        :param int chunk_size: Max raw chunk size
+        :return generator:
+        """
+        decoder = _ContentDecoder(response.getheader('Content-Encoding'))
+        completed = False
+        try:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                chunk = decoder.decode(chunk)
+                if chunk:
+                    yield chunk
+
+            tail = decoder.flush()
+            if tail:
+                yield tail
+            completed = True
+
+        finally:
+            if not completed:
+                self.close()
+
+    def get_stream(self, uri: str, query=None, output=None, chunk_size=_STREAM_CHUNK_SIZE):
+        """ Get content by uri with no buffering
+
+        Content is decoded if it is compressed on transfer and
+        is either yielded by chunks or written to the output file
+
+        :param str uri: Request uri
+        :param dict query: Query params
+        :param output: Binary file-like object to write content to
+        :param int chunk_size: Max raw chunk size
+        :return generator|int: Content chunks generator or bytes written if output is specified
+        """
+        body = self._iter_body(self._get_encoded(uri, query), chunk_size)
+        if output is None:
+            return body
+
+        size = 0
+        for chunk in body:
+            output.write(chunk)
+            size += len(chunk)
+
+        return size
 
     def get(self, uri: str, query=None, content_type=None):
         """ Get content by uri
@@ -191,17 +594,53 @@ class WebClient:
         :param str content_type: Expected content-type
         :returns: Depends on content type expected
         """
-        response = self.get_raw(uri, query)
+        if self.cache is not None:
+            headers, content = self._get_cached(uri if query is None else '?'.join([uri, urlencode(query)]))
+        else:
+            response = self._get_encoded(uri, query)
+            decoder = _ContentDecoder(response.getheader('Content-Encoding'))
+            content = decoder.decode(response.read()) + decoder.flush()
+            headers = dict(response.getheaders())
 
-        content = response.read()
-        headers = dict(response.getheaders())
-        content_type = content_type or response.getheader('Content-Type').split(';')[0].strip()
+        content_type = content_type or _get_header(headers, 'Content-Type', '').split(';')[0].strip()
 
         if content_type:
             content = _get_parser(content_type)(content, headers)
 
         return content
 
+    def _get_cached(self, uri: str) -> tuple:
+        """ Get content from cache if it is fresh or revalidate it
+
+        :param str uri: Request uri with query
+        :return tuple: Response headers dict and decoded content bytes
+        """
+        key = self._cache_key_prefix + uri
+        cached = self.cache.get(key)
+        if cached is not None and cached.expires_at > time.time():
+            return cached.headers, cached.body
+
+        request_headers = {'Accept-Encoding': _ACCEPT_ENCODING}
+        if cached is not None:
+            for validator, condition in (('ETag', 'If-None-Match'), ('Last-Modified', 'If-Modified-Since')):
+                if _get_header(cached.headers, validator):
+                    request_headers[condition] = _get_header(cached.headers, validator)
+
+        response = self.get_raw(uri, headers=request_headers)
+        decoder = _ContentDecoder(response.getheader('Content-Encoding'))
+        content = decoder.decode(response.read()) + decoder.flush()
+        headers = dict(response.getheaders())
+
+        if response.status == 304 and cached is not None:
+            headers = dict(cached.headers, **{header: response.getheader(header)
+                                              for header in _REVALIDATION_HEADERS if response.getheader(header)})
+            content = cached.body
+
+        if response.status in (200, 304):
+            self.cache.put(key, headers, content, self.cache_ttl)
+
+        return headers, content
+
     def user_agent(self, user_agent: str):
         """  Set new user agent string
 
@@ -210,6 +649,14 @@ class WebClient:
         """
         self._headers['User-Agent'] = user_agent
 
+    @property
+    def reusable(self) -> bool:
+        """ Check if the last response is completely read so connection may be used again
+
+        :return bool:
+        """
+        return self._response is None or self._response.isclosed()
+
     def connect(self):
         """ Establish connection
 
@@ -240,3 +687,172 @@ class WebClient:
         """
         self.close()
         return False
+
+
+class HTTPService(Service):
+    """ Keep-alive web clients pool service
+
+    Keeps idle web clients by host so plugins requesting
+    the same hosts often reuse already established connections.
+    Clients leased beyond the pool size are closed after use
+    """
+
+    def __init__(self, application):
+        """ Create an empty pool
+
+        :param Application application:
+        """
+        super().__init__(application)
+
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+        self._cache = None
+
+    def _config_value(self, key: str, default: int) -> int:
+        """ Get numeric config value
+
+        :param str key: Config key
+        :param int default: Default value
+        :return int:
+        """
+        try:
+            return int(self.config.get(key, default))
+        except:
+            return default
+
+    @property
+    def pool_size(self) -> int:
+        """ Max idle clients count kept for each host
+
+        :return int:
+        """
+        return self._config_value('pool_size', _DEFAULT_POOL_SIZE)
+
+    @property
+    def idle_timeout(self) -> int:
+        """ Max time an idle client is kept (sec.)
+
+        :return int:
+        """
+        return self._config_value('idle_timeout', _DEFAULT_IDLE_TIMEOUT)
+
+    @property
+    def cache(self) -> ResponseCache:
+        """ Get responses cache shared by all the clients
+
+        :return ResponseCache: Cache or None if cache is disabled
+        """
+        with self._lock:
+            if self._cache is None:
+                cache_size = self._config_value('cache_size', _DEFAULT_CACHE_SIZE)
+                if not cache_size:
+                    return None
+
+                try:
+                    cache_dir = self.config.get('cache_dir')
+                except:
+                    cache_dir = None
+
+                disk_size = self._config_value('cache_disk_size', _DEFAULT_CACHE_DISK_SIZE)
+                self._cache = ResponseCache(cache_size, cache_dir, disk_size)
+
+            return self._cache
+
+    def _evict(self, now: float) -> list:
+        """ Remove expired idle clients from the pool (lock must be acquired)
+
+        :param float now: Current timestamp
+        :return list: Removed clients
+        """
+        expired_before = now - self.idle_timeout
+        evicted = []
+        for key, idle_clients in list(self._idle.items()):
+            evicted.extend(client for client, released_at in idle_clients if released_at < expired_before)
+            idle_clients[:] = [(client, released_at)
+                               for client, released_at in idle_clients if released_at >= expired_before]
+            if not idle_clients:
+                del self._idle[key]
+
+        return evicted
+
+    def _lease(self, key: tuple) -> WebClient:
+        """ Get an idle client or create a new one
+
+        :param tuple key: (host, port, https)
+        :return WebClient:
+        """
+        with self._lock:
+            evicted = self._evict(time.time())
+            client = self._idle[key].pop()[0] if self._idle.get(key) else None
+
+        for expired_client in evicted:
+            expired_client.close()
+
+        if client is None:
+            host, port, https = key
+            client = WebClient(host, port, https)
+            self.log.debug('Created a new web client for %s:%s', host, port or ('443' if https else '80'))
+
+        return client
+
+    def _release(self, key: tuple, client: WebClient):
+        """ Put client back to the pool or close it if pool is full
+
+        :param tuple key: (host, port, https)
+        :param WebClient client:
+        :return None:
+        """
+        if client.reusable:
+            with self._lock:
+                if len(self._idle[key]) < self.pool_size:
+                    self._idle[key].append((client, time.time()))
+                    return
+
+        client.close()
+
+    @contextmanager
+    def client(self, host: str, port=None, https=False, cache_ttl=None, cache=False) -> WebClient:
+        """ Lease a web client for the host
+
+        Client is returned back to the pool on exit
+        or closed on error as it's state is unknown.
+        Responses are cached only if cache is requested
+
+        :param str host: Remote server host
+        :param int port: Remote server port
+        :param bool https: Use HTTPS instead of HTTP
+        :param int cache_ttl: Cache responses for this time instead of the one allowed by server (implies cache)
+        :param bool cache: Cache responses for the time allowed by server
+        :return WebClient:
+        """
+        key = host, port, https
+        client = self._lease(key)
+        client.cache = self.cache if cache or cache_ttl is not None else None
+        client.cache_ttl = cache_ttl
+        try:
+            yield client
+        except:
+            client.close()
+            raise
+        else:
+            self._release(key, client)
+
+    def close(self):
+        """ Close all idle clients
+
+        :return None:
+        """
+        with self._lock:
+            idle_clients = [client for clients in self._idle.values() for client, _ in clients]
+            self._idle.clear()
+
+        for client in idle_clients:
+            client.close()
+
+    @classmethod
+    def name(cls) -> str:
+        """ Get service unique name
+
+        :return str:
+        """
+        return 'http'
@@ -31,6 +31,19 @@ def init_storage(registry):
     model.Storage().create()
 
 
+def _get_import_checkpoint(outp):
+    """ Get import checkpoint reporting progress to a ctl client and aborting import on cancellation
+
+    :param outp: Ctl output
+    :return callable:
+    """
+    def _checkpoint(processed: int):
+        outp.progress('Processed %d cartoons', processed)
+        outp.raise_if_cancelled()
+
+    return _checkpoint
+
+
 @plugin.control('import-file', 'Update cartoons database from xml file specified')
 def import_file(inp, outp, **_):
     """ Update cartoons database from xml file specified
@@ -43,8 +56,8 @@ def import_file(inp, outp, **_):
     data_source = model.XmlDataSource(inp.args.get('xml'))
 
     outp.say('Importing cartoons from file "%s"', data_source.file)
-    cartoons_total = model.import_data(data_source)
-    outp.say('Imported %d cartoons', cartoons_total)
+    stats = model.import_data(data_source, _get_import_checkpoint(outp))
+    outp.say('Imported %d cartoons (%d new or modified, %d removed)', *stats)
 
 
 @plugin.control('recreate', 'Create a new empty cartoons db')
@@ -67,19 +80,19 @@ def update(**kwargs):
     :param dict kwargs: Entry point dependent
     :return None:
     """
-    log = kwargs.get('outp') or kwargs.get('registry').log
+    outp = kwargs.get('outp')
+    log = outp or kwargs.get('registry').log
     current_time = int(time.time())
 
     data_source = model.WebXMLDataSource()
     interval_checker = model.SyncIntervalChecker(data_source.file)
 
     if interval_checker.is_outdated(current_time):
-        recreate(outp=log)
         log.info('Updating cartoons DB from web')
         data_source.download()
-        cartoons_total = model.import_data(data_source)
+        stats = model.import_data(data_source, _get_import_checkpoint(outp) if outp else None)
         interval_checker.modified_at = current_time
-        log.info('Imported %d cartoons', cartoons_total)
+        log.info('Synchronized %d cartoons (%d new or modified, %d removed)', *stats)
 
     else:
         log.info('Only %d seconds passed after the last successful cartoons sync',
@@ -88,7 +101,7 @@ def update(**kwargs):
 
 @plugin.chat_command('cartoon')
 def cartoon_command_handler(inp, outp, registry):
-    """ Yield a random cartoon
+    """ Yield a random cartoon or a cartoon found by title words if specified
 
     :param inp:
     :param outp:
@@ -99,7 +112,15 @@ def cartoon_command_handler(inp, outp, registry):
     if not template:
         raise SectionRetrievingError('`message` config param is required for AniDB plugin')
 
-    cartoon = model.Storage().random_cartoon
-    msg_params = {'user': inp.sender.resource, 'title': cartoon.primary_title, 'url': cartoon.url}
+    title = ' '.join(inp.text.split(' ')[1:]).strip()
+    msg_params = {'user': inp.sender.resource, 'keywords': title}
+
+    cartoon = model.Storage().find_cartoon(title) if title else model.Storage().random_cartoon
+    if cartoon is None:
+        template = registry.config.get('message_not_found')
+        if not template:
+            return
+    else:
+        msg_params.update({'title': cartoon.primary_title, 'url': cartoon.url})
 
     outp.say(template.format(**msg_params))
@@ -18,29 +18,36 @@ Attributes
 ==========
     RemoteCartoon      -- Remote cartoon structure
     RemoteCartoonTitle -- Remote cartoon title structure
+    CartoonRecord      -- Converted cartoon plain structure (for bulk inserts)
+    SyncStats          -- Cartoons sync result
 
 Functions
 =========
-    import_data -- Update cartoons database from data source specified
+    import_data -- Synchronize cartoons database with data source specified
 """
 
 import os
 import re
+import gzip
 import time
+import hashlib
 import struct
 import locale
 import random
+import shutil
+import threading
 from collections import namedtuple
 
 from lxml import etree
-from sqlalchemy import Table, Column, Integer, String, UniqueConstraint, ForeignKey, desc
+from sqlalchemy import Table, Column, Integer, String, UniqueConstraint, ForeignKey, desc, select, bindparam
 from sqlalchemy.orm import relationship
 
-from dewyatochka.core.data.database import SQLIteStorage, StoreableObject, ObjectMeta, readable_query, writable_query
+from dewyatochka.core.data.database import SQLIteStorage, StoreableObject, ObjectMeta, FullTextIndex, \
+    readable_query, writable_query
 from dewyatochka.core.utils.http import WebClient
 
 
-__all__ = ['Storage', 'Cartoon', 'CartoonTitle', 'RemoteCartoon', 'RemoteCartoonTitle',
+__all__ = ['Storage', 'Cartoon', 'CartoonTitle', 'RemoteCartoon', 'RemoteCartoonTitle', 'CartoonRecord', 'SyncStats',
            'CartoonConverter', 'SyncIntervalChecker', 'XmlDataSource', 'WebXMLDataSource',
            'import_data', 'CartoonMeta', 'CartoonTitleMeta']
 
@@ -49,6 +56,12 @@ __all__ = ['Storage', 'Cartoon', 'CartoonTitle', 'RemoteCartoon', 'RemoteCartoon
 RemoteCartoon = namedtuple('AniDBCartoon', ['id', 'titles'])
 RemoteCartoonTitle = namedtuple('AniDBCartoonTitle', ['title', 'type', 'lang'])
 
+# Local plain data structure
+CartoonRecord = namedtuple('CartoonRecord', ['aid', 'primary_title', 'titles', 'digest'])
+
+# Sync result (cartoons total, new or modified cartoons, removed cartoons)
+SyncStats = namedtuple('SyncStats', ['total', 'changed', 'removed'])
+
 
 class Storage(SQLIteStorage):
     """ Cartoons storage """
@@ -76,6 +89,185 @@ class Storage(SQLIteStorage):
         if commit:
             self.db_session.commit()
 
+    @writable_query
+    def add_cartoons(self, cartoons, commit=True):
+        """ Add a batch of cartoons with bulk inserts bypassing ORM session
+
+        :param list cartoons: CartoonRecord list
+        :param bool commit: Commit changes to db or not
+        :return None:
+        """
+        cartoons_rows = [{'aid': c.aid, 'primary_title': c.primary_title, 'digest': c.digest} for c in cartoons]
+
+        if cartoons_rows:
+            self.db_session.execute(self._cartoons_table.insert(), cartoons_rows)
+        self.__insert_titles(cartoons)
+
+        if commit:
+            self.db_session.commit()
+
+    @writable_query
+    def update_cartoons(self, cartoons, commit=True):
+        """ Replace already stored cartoons data in place
+
+        :param list cartoons: CartoonRecord list
+        :param bool commit: Commit changes to db or not
+        :return None:
+        """
+        if not cartoons:
+            return
+
+        cartoons_table = self._cartoons_table
+        self.db_session.execute(
+            cartoons_table.update()
+            .where(cartoons_table.c.aid == bindparam('b_aid'))
+            .values(primary_title=bindparam('b_primary_title'), digest=bindparam('b_digest')),
+            [{'b_aid': c.aid, 'b_primary_title': c.primary_title, 'b_digest': c.digest} for c in cartoons]
+        )
+        self.__delete_titles(c.aid for c in cartoons)
+        self.__insert_titles(cartoons)
+
+        if commit:
+            self.db_session.commit()
+
+    @writable_query
+    def remove_cartoons(self, aids, commit=True):
+        """ Remove cartoons by AniDB ids
+
+        :param set aids: AniDB ids
+        :param bool commit: Commit changes to db or not
+        :return None:
+        """
+        aids_rows = [{'b_aid': aid} for aid in aids]
+        if not aids_rows:
+            return
+
+        self.__delete_titles(aids)
+        cartoons_table = self._cartoons_table
+        self.db_session.execute(cartoons_table.delete().where(cartoons_table.c.aid == bindparam('b_aid')), aids_rows)
+
+        if commit:
+            self.db_session.commit()
+
+    def __insert_titles(self, cartoons):
+        """ Insert all titles of cartoons specified
+
+        :param list cartoons: CartoonRecord list
+        :return None:
+        """
+        titles_rows = [{'cartoon_aid': c.aid, 'title': t} for c in cartoons for t in c.titles]
+        if titles_rows:
+            self.db_session.execute(self._titles_table.insert(), titles_rows)
+
+    def __delete_titles(self, aids):
+        """ Delete all titles of cartoons specified
+
+        :param iterable aids: AniDB ids
+        :return None:
+        """
+        aids_rows = [{'b_aid': aid} for aid in aids]
+        if aids_rows:
+            titles_table = self._titles_table
+            self.db_session.execute(titles_table.delete().where(titles_table.c.cartoon_aid == bindparam('b_aid')),
+                                    aids_rows)
+
+    @writable_query
+    def rollback(self):
+        """ Discard not committed changes
+
+        :return None:
+        """
+        self.db_session.rollback()
+        self.__last_cartoon = None
+
+    @writable_query
+    def commit(self):
+        """ Commit changes
+
+        :return None:
+        """
+        super().commit()
+        self.__last_cartoon = None
+
+    @writable_query
+    def create(self):
+        """ Create engine, upgrade schema created by previous versions if needed
+
+        :return None:
+        """
+        super().create()
+
+        columns = {column[1] for column in self.db_session.execute('PRAGMA table_info(cartoons)')}
+        if 'digest' not in columns:
+            self.db_session.execute('ALTER TABLE cartoons ADD COLUMN digest VARCHAR(32)')
+        self.db_session.execute('CREATE INDEX IF NOT EXISTS ix_titles_cartoon_aid ON titles (cartoon_aid)')
+        FullTextIndex.of(self._titles_table).create(self.db_session)
+        self.db_session.commit()
+
+    @readable_query
+    def copy(self, path: str):
+        """ Copy db file with the data committed
+
+        :param str path: Target file path
+        :return None:
+        """
+        shutil.copyfile(self.path, path)
+
+    @writable_query
+    def replace(self, path: str):
+        """ Replace db file with another one, connection is re-opened on the next query
+
+        :param str path: New db file path
+        :return None:
+        """
+        self.close()
+        os.replace(path, self.path)
+        self.__last_cartoon = None
+
+    @writable_query
+    def suspend_titles_index(self):
+        """ Stop titles full text index maintenance before bulk load
+
+        :return None:
+        """
+        FullTextIndex.of(self._titles_table).suspend(self.db_session)
+
+    @writable_query
+    def rebuild_titles_index(self):
+        """ Rebuild titles full text index from scratch
+
+        :return None:
+        """
+        FullTextIndex.of(self._titles_table).rebuild(self.db_session)
+
+    @property
+    @readable_query
+    def cartoons_digests(self) -> dict:
+        """ Get stored cartoons digests by AniDB ids
+
+        :return dict:
+        """
+        cartoons_table = self._cartoons_table
+        rows = self.db_session.execute(select([cartoons_table.c.aid, cartoons_table.c.digest]))
+
+        return {aid: digest for aid, digest in rows}
+
+    @property
+    def _cartoons_table(self) -> Table:
+        """ Get cartoons table
+
+        :return Table:
+        """
+        return self.__class__.metadata.tables['cartoons']
+
+    @property
+    def _titles_table(self) -> Table:
+        """ Get titles table
+
+        :return Table:
+        """
+        return self.__class__.metadata.tables['titles']
+
     @property
     @readable_query
     def last_cartoon(self):
@@ -97,12 +289,30 @@ class Storage(SQLIteStorage):
 
         :return Cartoon:
         """
+        # Ids sequence may have gaps after synchronization
         return self.db_session \
             .query(Cartoon) \
-            .filter(Cartoon.id == random.randint(1, self.last_cartoon.id)) \
+            .filter(Cartoon.id >= random.randint(1, self.last_cartoon.id)) \
             .order_by(Cartoon.id) \
             .first()
 
+    @readable_query
+    def find_cartoon(self, title: str):
+        """ Get a cartoon with the title matching the words specified best
+
+        :param str title: Title words (or words beginnings)
+        :return Cartoon:
+        """
+        titles_ids = FullTextIndex.of(self._titles_table).search(self.db_session, FullTextIndex.escape_query(title), 1)
+        if not titles_ids:
+            return None
+
+        return self.db_session \
+            .query(Cartoon) \
+            .join(CartoonTitle, CartoonTitle.cartoon_aid == Cartoon.aid) \
+            .filter(CartoonTitle.id == titles_ids[0]) \
+            .first()
+
 
 class CartoonTitleMeta(ObjectMeta):
     """ Cartoon title metadata """
@@ -114,10 +324,13 @@ class CartoonTitleMeta(ObjectMeta):
         :param type cls: Obj class
         :return Table:
         """
-        return Table('titles', Storage.metadata,
-                     Column('id', Integer, primary_key=True),
-                     Column('cartoon_aid', Integer, ForeignKey('cartoons.aid')),
-                     Column('title', String(255)))
+        table = Table('titles', Storage.metadata,
+                      Column('id', Integer, primary_key=True),
+                      Column('cartoon_aid', Integer, ForeignKey('cartoons.aid'), index=True),
+                      Column('title', String(255)))
+        FullTextIndex(table, 'title')
+
+        return table
 
 
 class CartoonTitle(StoreableObject, metaclass=CartoonTitleMeta):
@@ -148,6 +361,7 @@ class CartoonMeta(ObjectMeta):
                      Column('id', Integer, primary_key=True),
                      Column('aid', Integer),
                      Column('primary_title', String(255)),
+                     Column('digest', String(32)),
                      UniqueConstraint('aid'))
 
     @property
@@ -166,15 +380,16 @@ class Cartoon(StoreableObject, metaclass=CartoonMeta):
     __URL = 'http://anidb.net/perl-bin/animedb.pl?show=anime&aid=%d'
 
     # noinspection PyShadowingBuiltins
-    def __init__(self, id=None, aid=None, primary_title=None, titles=None):
+    def __init__(self, id=None, aid=None, primary_title=None, titles=None, digest=None):
         """ Init object
 
         :param int id:
         :param int aid:
         :param str title:
         :param list titles:
+        :param str digest: Content hash
         """
-        super().__init__(id=id, aid=aid, primary_title=primary_title, titles=titles or [])
+        super().__init__(id=id, aid=aid, primary_title=primary_title, titles=titles or [], digest=digest)
 
     @property
     def url(self) -> str:
@@ -208,20 +423,38 @@ class CartoonConverter:
         _TITLE_TYPE_OFFICIAL
     )
 
+    def __init__(self):
+        """ Detect user's language once """
+        try:
+            self._lang = locale.getlocale()[0].split('_')[0]
+        except (IndexError, AttributeError):
+            self._lang = ''
+
     def convert(self, cartoon: RemoteCartoon) -> Cartoon:
         """ Convert data
 
         :param RemoteCartoon cartoon: Remote cartoon
         :return Cartoon:
         """
+        record = self.convert_record(cartoon)
+
+        return Cartoon(
+            aid=record.aid,
+            primary_title=record.primary_title,
+            titles=[CartoonTitle(cartoon_aid=record.aid, title=t) for t in record.titles],
+            digest=record.digest
+        )
+
+    def convert_record(self, cartoon: RemoteCartoon) -> CartoonRecord:
+        """ Convert data to a plain structure with no ORM overhead
+
+        :param RemoteCartoon cartoon: Remote cartoon
+        :return CartoonRecord:
+        """
         if not len(cartoon.titles):
             raise ValueError('Cartoon must have at least one title')
 
-        try:
-            lang = locale.getlocale()[0].split('_')[0]
-        except IndexError:
-            lang = ''
-
+        lang = self._lang
         main_title = ''
         other_titles = set()
         title_index = 0
@@ -242,11 +475,9 @@ class CartoonConverter:
             other_titles.add(title)
             title_index -= 1
 
-        return Cartoon(
-            aid=cartoon.id,
-            primary_title=main_title,
-            titles=[CartoonTitle(cartoon_aid=cartoon.id, title=t) for t in other_titles]
-        )
+        digest = hashlib.md5('\0'.join([main_title or ''] + sorted(t or '' for t in other_titles)).encode())
+
+        return CartoonRecord(cartoon.id, main_title, tuple(other_titles), digest.hexdigest())
 
 
 class SyncIntervalChecker:
@@ -321,9 +552,12 @@ class XmlDataSource:
     _XML_ATTR_ID = 'aid'
     _XML_ATTR_TYPE = 'type'
     _XML_ATTR_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
-    _XML_XPATH_CARTOONS = '/anime'
+    _XML_TAG_CARTOON = 'anime'
     _XML_XPATH_TITLES = 'title'
 
+    # Gzip file signature
+    _GZIP_MAGIC = b'\x1f\x8b'
+
     # Default file name
     _DB_SYNC_XML_FILE_NAME = 'animetitles.xml.gz'
 
@@ -342,20 +576,37 @@ class XmlDataSource:
         """
         return self._file
 
+    def _open(self):
+        """ Open source file, unpack it on the fly if it is gzipped
+
+        :return file:
+        """
+        xml_file = open(self._file, 'rb')
+        if xml_file.peek(len(self._GZIP_MAGIC))[:len(self._GZIP_MAGIC)] == self._GZIP_MAGIC:
+            return gzip.GzipFile(fileobj=xml_file, mode='rb')
+
+        return xml_file
+
     @property
-    def cartoons(self) -> list:
-        """ Get cartoons list
+    def cartoons(self):
+        """ Iterate over cartoons
 
-        :return list:
+        Document is parsed incrementally and every processed element is
+        dropped immediately so memory usage does not depend on file size
+
+        :return generator:
         """
-        result = []
-        for anime_el in etree.parse(self._file).findall(self._XML_XPATH_CARTOONS):
-            aid = int(anime_el.attrib[self._XML_ATTR_ID])
-            titles = [RemoteCartoonTitle(e.text, e.attrib[self._XML_ATTR_TYPE], e.attrib[self._XML_ATTR_LANG])
-                      for e in anime_el.findall(self._XML_XPATH_TITLES)]
-            result.append(RemoteCartoon(aid, titles))
+        with self._open() as xml_file:
+            for _, anime_el in etree.iterparse(xml_file, tag=self._XML_TAG_CARTOON):
+                aid = int(anime_el.attrib[self._XML_ATTR_ID])
+                titles = [RemoteCartoonTitle(e.text, e.attrib[self._XML_ATTR_TYPE], e.attrib[self._XML_ATTR_LANG])
+                          for e in anime_el.iterfind(self._XML_XPATH_TITLES)]
+
+                anime_el.clear()
+                while anime_el.getprevious() is not None:
+                    del anime_el.getparent()[0]
 
-        return result
+                yield RemoteCartoon(aid, titles)
 
 
 class WebXMLDataSource(XmlDataSource):
@@ -368,29 +619,119 @@ class WebXMLDataSource(XmlDataSource):
     def download(self):
         """ Download external file
 
+        File is streamed to a temporary file which replaces
+        the previous one only if download is completed
+
         :return None:
         """
-        with WebClient(self._ANI_DB_REMOTE_HOST) as web_client:
-            xml_data = web_client.get(self._ANI_DB_REMOTE_URL)
+        part_file = self._file + '.part'
+        try:
+            with WebClient(self._ANI_DB_REMOTE_HOST) as web_client, open(part_file, 'wb') as xml_file:
+                web_client.get_stream(self._ANI_DB_REMOTE_URL, output=xml_file)
+            os.replace(part_file, self._file)
 
-        with open(self._file, 'wb') as xml_file:
-            xml_file.write(xml_data)
+        except:
+            if os.path.isfile(part_file):
+                os.unlink(part_file)
+            raise
 
 
-def import_data(source: XmlDataSource) -> int:
-    """ Update cartoons database from data source specified
+# Changed cartoons count to be written at once on sync
+_SYNC_CHUNK_SIZE = 1000
 
+# Copy of db file being synchronized
+_SYNC_FILE_EXT = '.sync'
+
+# Lock to prevent simultaneous synchronization
+_sync_lock = threading.Lock()
+
+
+def import_data(source: XmlDataSource, checkpoint=None) -> SyncStats:
+    """ Synchronize cartoons database with data source specified
+
+    Only new or modified cartoons (compared by content digest) are written
+    and cartoons missing in source are removed. Changes are written to a copy
+    of db file through a separate connection and the copy replaces db file
+    once committed, so readers keep seeing the previous data set until sync
+    is completed. Titles index is rebuilt once after the initial load into
+    an empty db instead of being updated title by title
+
+    :param XmlDataSource source: Cartoon source
+    :param callable checkpoint: Called with processed records count between chunks, may raise to abort import
+    :return SyncStats:
+    """
+    with _sync_lock:
+        cartoons_storage = Storage()  # Singleton
+        sync_storage = Storage.detached()
+        sync_path = cartoons_storage.path + _SYNC_FILE_EXT
+
+        try:
+            cartoons_storage.copy(sync_path)
+            sync_storage.path = sync_path
+            stats = _sync(sync_storage, source, checkpoint)
+            sync_storage.close()
+            cartoons_storage.replace(sync_path)
+
+        except:
+            sync_storage.close()
+            if os.path.isfile(sync_path):
+                os.unlink(sync_path)
+            raise
+
+    return stats
+
+
+def _sync(cartoons_storage: Storage, source: XmlDataSource, checkpoint=None) -> SyncStats:
+    """ Write cartoons changes to the storage and commit them at once
+
+    :param Storage cartoons_storage: Storage to write to
     :param XmlDataSource source: Cartoon source
-    :return int:
+    :param callable checkpoint: Called with processed records count between chunks, may raise to abort import
+    :return SyncStats:
     """
-    cartoons_storage = Storage()  # Singleton
     cartoons_converter = CartoonConverter()
 
-    cartoons_total = 0
-    for cartoon in source.cartoons:
-        cartoons_storage.add_cartoon(cartoons_converter.convert(cartoon), commit=False)
-        cartoons_total += 1
+    stored_digests = cartoons_storage.cartoons_digests
+    source_aids = set()
+    new_chunk, modified_chunk = [], []
+    changed_total = 0
+    bulk_load = not stored_digests
+
+    def _flush(min_size=0):
+        if len(new_chunk) + len(modified_chunk) >= min_size:
+            cartoons_storage.add_cartoons(new_chunk, commit=False)
+            cartoons_storage.update_cartoons(modified_chunk, commit=False)
+            new_chunk.clear()
+            modified_chunk.clear()
 
+    if bulk_load:
+        cartoons_storage.suspend_titles_index()
+
+    for cartoon in source.cartoons:
+        record = cartoons_converter.convert_record(cartoon)
+        if record.aid in source_aids:
+            continue  # Duplicated aid, keep the first one
+        source_aids.add(record.aid)
+
+        if checkpoint is not None and len(source_aids) % _SYNC_CHUNK_SIZE == 0:
+            checkpoint(len(source_aids))
+
+        if record.aid not in stored_digests:
+            new_chunk.append(record)
+        elif stored_digests[record.aid] != record.digest:
+            modified_chunk.append(record)
+        else:
+            continue
+
+        changed_total += 1
+        _flush(_SYNC_CHUNK_SIZE)
+
+    _flush()
+    removed_aids = stored_digests.keys() - source_aids
+    cartoons_storage.remove_cartoons(removed_aids, commit=False)
+
+    if bulk_load:
+        cartoons_storage.rebuild_titles_index()
     cartoons_storage.commit()
 
-    return cartoons_total
+    return SyncStats(len(source_aids), changed_total, len(removed_aids))
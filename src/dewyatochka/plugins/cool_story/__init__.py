@@ -11,8 +11,10 @@ Modules
     model -- Plugin logic impl
 """
 
+import queue
 import random
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from dewyatochka.core import plugin
 from dewyatochka.core.plugin.exceptions import PluginError
@@ -28,6 +30,12 @@ __all__ = ['model', 'parser']
 # Indexation lock to avoid concurrent processes run
 __indexation_running = threading.Event()
 
+# Pages count to fetch ahead by each parser by default
+_DEFAULT_PREFETCH_PAGES = 3
+
+# Stories count to report indexation progress and check for cancellation after
+_PROGRESS_INTERVAL = 100
+
 
 @plugin.bootstrap
 def init_storage(registry):
@@ -68,11 +76,55 @@ def cool_joke_command_handler(outp, **_):
     outp.say(post.text)
 
 
-@plugin.schedule('0 */12 * * *')
-@plugin.control('update', 'Check for updates')
+@plugin.chat_command('story')
+def story_by_keywords_command_handler(inp, outp, registry):
+    """ Say a cool story containing the keywords specified
+
+    :param inp:
+    :param outp:
+    :param registry:
+    :return None:
+    """
+    keywords = ' '.join(inp.text.split(' ')[1:])
+
+    try:
+        post = model.Storage().get_random_post_by_keywords(keywords)
+        outp.say(post.text)
+    except (ValueError, RuntimeError):
+        message_format = registry.config.get('message_not_found')
+        if message_format:
+            outp.say(message_format.format(user=inp.sender.resource, keywords=keywords))
+
+
+def _fetch_new_stories(parser_, last_id: int, stories: queue.Queue, stop: threading.Event):
+    """ Fetch stories newer than the last indexed one from a single source
+
+    Stories are put into the queue in order they are yielded by the parser,
+    parser name is put at the end as a completion mark
+
+    :param AbstractParser parser_: Source parser
+    :param int last_id: Last indexed story ID
+    :param queue.Queue stories: Output queue
+    :param threading.Event stop: Event to abort fetching
+    :return None:
+    """
+    try:
+        for story in parser_:
+            if story.id <= last_id or stop.is_set():
+                break
+            stories.put(story)
+    finally:
+        stories.put(parser_.name)
+
+
+@plugin.schedule('0 */12 * * *', services=['http'])
+@plugin.control('update', 'Check for updates', services=['http'])
 def index(**kwargs):
     """ Live stories incremental indexer
 
+    All the sources are fetched concurrently, stories are stored
+    in the current thread as they are coming from parsers
+
     :param kwargs:
     :return None:
     """
@@ -82,28 +134,57 @@ def index(**kwargs):
     try:
         __indexation_running.set()
 
-        log = kwargs.get('outp') or kwargs.get('registry').log
+        registry = kwargs.get('registry')
+        outp = kwargs.get('outp')
+        log = outp or registry.log
         log.info('Checking stories services for updates')
 
-        for parser_cls in parsers:
-            parser_ = parser_cls()
-            log.debug('Initialized %s parser', parser_.name)
-
-            last_id = model.Storage().get_last_indexed_post(parser_.name).ext_id or 0
-            log.debug('Story last ID : %s => %d', parser_.name, last_id)
-
-            new_stories = 0
-            for story in parser_:
-                if story.id <= last_id:
-                    log.debug('Story #%d from %s is already indexed, completed', story.id, story.source)
-                    break
-                model.Storage().add_post(story.source, story.id, story.title, story.text, story.tags)
-                new_stories += 1
-
-            if new_stories:
-                log.info('Indexed %d new stories from %s', new_stories, parser_.name)
+        prefetch = int(registry.config.get('prefetch_pages', _DEFAULT_PREFETCH_PAGES))
+        cache_ttl = int(registry.config['cache_ttl']) if registry.config.get('cache_ttl') else None
+        stories = queue.Queue()
+        stop = threading.Event()
+        new_stories = {}
+
+        with ThreadPoolExecutor(len(parsers)) as pool:
+            fetching = {}
+            for parser_cls in parsers:
+                parser_ = parser_cls(prefetch, registry.http, cache_ttl)
+                last_id = model.Storage().get_last_indexed_post(parser_.name).ext_id or 0
+                log.debug('Story last ID : %s => %d', parser_.name, last_id)
+
+                new_stories[parser_.name] = 0
+                fetching[parser_.name] = pool.submit(_fetch_new_stories, parser_, last_id, stories, stop)
+
+            try:
+                completed = 0
+                while completed < len(fetching):
+                    story = stories.get()
+                    if isinstance(story, str):
+                        completed += 1  # Source is completed
+                        continue
+
+                    model.Storage().add_post(story.source, story.id, story.title, story.text, story.tags)
+                    new_stories[story.source] += 1
+
+                    indexed = sum(new_stories.values())
+                    if outp is not None and indexed % _PROGRESS_INTERVAL == 0:
+                        outp.progress('Indexed %d new stories', indexed)
+                        outp.raise_if_cancelled()
+            except:
+                stop.set()
+                raise
+
+        for source, future in fetching.items():
+            if future.exception() is not None:
+                log.error('Failed to index stories from %s: %s', source, future.exception())
+            elif new_stories[source]:
+                log.info('Indexed %d new stories from %s', new_stories[source], source)
             else:
-                log.info('Stories source %s is already up to date', parser_.name)
+                log.info('Stories source %s is already up to date', source)
+
+        failed = [future for future in fetching.values() if future.exception() is not None]
+        if failed:
+            raise PluginError('Failed to index %d stories source(s)' % len(failed))
 
         log.info('Completed checking for updates')
 
@@ -123,13 +204,14 @@ def recreate(outp, **_):
     outp.say('Cool stories storage successfully recreated at %s', model.Storage().path)
 
 
-@plugin.control('reindex', 'Populate stories table from scratch')
-def reindex(outp, **_):
+@plugin.control('reindex', 'Populate stories table from scratch', services=['http'])
+def reindex(outp, registry, **_):
     """ Populate stories table from scratch
 
     :param outp:
+    :param registry:
     :param _:
     :return None:
     """
     recreate(outp)
-    index(outp=outp)
+    index(outp=outp, registry=registry)
@@ -15,7 +15,7 @@ Classes
 
 import random
 
-from sqlalchemy import Column, Table, Integer, String, UniqueConstraint, Index, Text, ForeignKey, desc
+from sqlalchemy import Column, Table, Integer, String, UniqueConstraint, Index, Text, ForeignKey, desc, select
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.exc import NoResultFound
 
@@ -35,6 +35,17 @@ class Storage(SQLIteStorage):
         super().__init__()
         self.__tags_cache_warmed = False
 
+    @writable_query
+    def create(self):
+        """ Create engine, add full text index to a db created by previous versions if needed
+
+        :return None:
+        """
+        super().create()
+
+        FullTextIndex.of(self.__class__.metadata.tables['posts']).create(self.db_session)
+        self.db_session.commit()
+
     @readable_query
     def __get_entity_by_title(self, entity_cls, title: str):
         """ Get cacheable entity instance by title
@@ -127,7 +138,25 @@ class Storage(SQLIteStorage):
         :param str tag_title: Tag title
         :return Post:
         """
-        return self.get_random_post_by(Post.tags.contains(self.get_tag_by_title(tag_title)))
+        posts_tags = self.__class__.metadata.tables['posts_tags']
+        tag_posts_ids = select([posts_tags.c.post_id]).where(posts_tags.c.tag_id == self.get_tag_by_title(tag_title).id)
+
+        return self.get_random_post_by(Post.id.in_(tag_posts_ids))
+
+    @readable_query
+    def get_random_post_by_keywords(self, keywords: str, top=10):
+        """ Get random post among the most relevant ones to the keywords
+
+        :param str keywords: Words to search posts by
+        :param int top: Max count of the most relevant posts to choose from
+        :return Post:
+        """
+        posts_index = FullTextIndex.of(self.__class__.metadata.tables['posts'])
+        posts_ids = posts_index.search(self.db_session, FullTextIndex.escape_query(keywords), top)
+        if not posts_ids:
+            raise RuntimeError('No posts found')
+
+        return self.db_session.query(Post).filter(Post.id == random.choice(posts_ids)).first()
 
     @readable_query
     def get_last_indexed_post(self, source):
@@ -233,13 +262,16 @@ class PostMeta(ObjectMeta):
         :param cls:
         :return Table:
         """
-        return Table('posts', Storage.metadata,
-                     Column('id', Integer, primary_key=True),
-                     Column('source_id', Integer, ForeignKey('sources.id')),
-                     Column('ext_id', Integer),
-                     Column('title', String(255)),
-                     Column('text', Text),
-                     Index('ix_ext_id', 'source_id', 'ext_id', unique=True))
+        table = Table('posts', Storage.metadata,
+                      Column('id', Integer, primary_key=True),
+                      Column('source_id', Integer, ForeignKey('sources.id')),
+                      Column('ext_id', Integer),
+                      Column('title', String(255)),
+                      Column('text', Text),
+                      Index('ix_ext_id', 'source_id', 'ext_id', unique=True))
+        FullTextIndex(table, 'title', 'text')
+
+        return table
 
     @staticmethod
     def get_tags_assoc_table() -> Table:
@@ -16,8 +16,9 @@ Attributes
 """
 
 import re
+import threading
 from collections import namedtuple
-from functools import reduce
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABCMeta, abstractmethod, abstractproperty
 
 from lxml.html import HtmlElement, tostring
@@ -31,42 +32,125 @@ __all__ = ['AbstractParser', 'RawPost', 'parse_multiline_html']
 # Raw post immutable structure (id: int, title: str, text: str, tags: frozenset)
 RawPost = namedtuple('RawPost', ('id', 'source', 'title', 'text', 'tags'))
 
-# Regexp to extract text from raw post html code
-__post_new_line_regexp = re.compile(r'<br\s*/?>', re.I)
-__post_sanitize_regexp = re.compile(r'<.*?>')
+# Regexps to extract text from serialized paragraph html code
+_NEW_LINE_REGEXP = re.compile(r'<br\s*/?>', re.I)
+_TAG_REGEXP = re.compile(r'<.*?>')
+
+# Elements with text serialized as is, with no escaping
+_RAW_TEXT_TAGS = frozenset(['script', 'style'])
+
+# Max pages fetched from the same host concurrently by all the parsers
+_HOST_CONNECTIONS_LIMIT = 2
+
+# Per-host fetching semaphores
+_hosts_semaphores = {}
+_hosts_semaphores_lock = threading.Lock()
+
+
+def _get_host_semaphore(host: str) -> threading.BoundedSemaphore:
+    """ Get a semaphore limiting concurrent connections to the host
+
+    :param str host: Remote host
+    :return threading.BoundedSemaphore:
+    """
+    with _hosts_semaphores_lock:
+        if host not in _hosts_semaphores:
+            _hosts_semaphores[host] = threading.BoundedSemaphore(_HOST_CONNECTIONS_LIMIT)
+        return _hosts_semaphores[host]
+
+
+def _escape_text(text: str) -> str:
+    """ Escape text node as it is done by html serializer
+
+    :param str text:
+    :return str:
+    """
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _collect_lines(element: HtmlElement, lines: list) -> bool:
+    """ Append element text chunks to the lines list (each line is a list of chunks)
+
+    Elements the text of which would be extracted from serialized html
+    in some other way (comments, raw text elements, <br> with attributes,
+    multi-line attributes) are not walked through
+
+    :param HtmlElement element: Html element
+    :param list lines: Lines collected, element text is appended to the last one
+    :return bool: False if element is not walked through
+    """
+    tag = element.tag
+    if not isinstance(tag, str) or tag in _RAW_TEXT_TAGS:
+        return False
+    if element.attrib and (tag == 'br' or any('\n' in value or '\r' in value for value in element.attrib.values())):
+        return False
+
+    if tag == 'br':
+        lines.append([])
+    else:
+        lines[-1].append(element.text or '')
+        for child in element:
+            if not _collect_lines(child, lines):
+                return False
+
+    lines[-1].append(element.tail or '')
+
+    return True
+
+
+def _split_serialized(paragraph: HtmlElement) -> list:
+    """ Split paragraph into lines by serializing it and stripping the tags
+
+    :param HtmlElement paragraph: Html element
+    :return list:
+    """
+    return [_TAG_REGEXP.sub('', line) for line in _NEW_LINE_REGEXP.split(tostring(paragraph, encoding='unicode'))]
 
 
 def parse_multiline_html(paragraphs) -> str:
     """ Join html paragraphs collection into one multi line string
 
+    Each paragraph and each <br> starts a new line, tags are dropped
+    and text is left html-escaped, empty lines are skipped. Paragraphs
+    are walked through as element trees, the ones not walkable the same
+    way are serialized and stripped of tags instead
+
     :param iterable paragraphs: Paragraphs HTML nodes list
     :return:
     """
-    return '\n'.join(
-        filter(
-            None,
-            map(
-                lambda line: __post_sanitize_regexp.sub(r'', line).strip(),
-                reduce(
-                    lambda msg_lines, lines: msg_lines + lines,
-                    [__post_new_line_regexp.split(tostring(line, encoding='unicode'))
-                     for line in paragraphs]
-                )
-            )
-        )
-    )
+    lines = []
+    for paragraph in paragraphs:
+        paragraph_lines = [[]]
+        if _collect_lines(paragraph, paragraph_lines):
+            lines.extend(_escape_text(''.join(line)) for line in paragraph_lines)
+        else:
+            lines.extend(_split_serialized(paragraph))
+
+    return '\n'.join(filter(None, (line.strip() for line in lines)))
 
 
 class AbstractParser(metaclass=ABCMeta):
     """ Parser implementation
 
     Each parser is an iterable object that yields posts
-    beginning from the last and ending on the first post
+    beginning from the last and ending on the first post.
+    Pages may be fetched ahead in background while the
+    current page posts are processed, posts order is kept
     """
 
-    def __init__(self):
-        """ Init parser object, define mandatory attributes """
-        self.__client = None
+    def __init__(self, prefetch=0, http=None, cache_ttl=None):
+        """ Init parser object, define mandatory attributes
+
+        :param int prefetch: Count of pages to fetch ahead concurrently, 0 to fetch pages one by one
+        :param HTTPService http: Pooled (and caching) web clients provider, own clients are used if not specified
+        :param int cache_ttl: Time to cache pages fetched with pooled clients
+        """
+        self.__prefetch = prefetch
+        self.__http = http
+        self.__cache_ttl = cache_ttl
+        self.__local = threading.local()
+        self.__clients = []
+        self.__clients_lock = threading.Lock()
 
     @abstractmethod
     def _parse_post(self, html_element: HtmlElement) -> RawPost:
@@ -110,7 +194,7 @@ class AbstractParser(metaclass=ABCMeta):
         :param str page: Page url
         :return list:
         """
-        return self.parse_page_html(self._client.get(page))
+        return self.parse_page_html(self._fetch_page(page))
 
     @property
     def _web_host(self) -> str:
@@ -130,15 +214,41 @@ class AbstractParser(metaclass=ABCMeta):
 
     @property
     def _client(self) -> WebClient:
-        """ Get web client instance
+        """ Get web client instance (an own one for each thread)
 
         :return WebClient:
         """
-        if self.__client is None:
+        client = getattr(self.__local, 'client', None)
+        if client is None:
             # noinspection PyTypeChecker
-            self.__client = WebClient(self._web_host)
+            client = self.__local.client = WebClient(self._web_host)
+            with self.__clients_lock:
+                self.__clients.append(client)
+
+        return client
 
-        return self.__client
+    def _fetch_page(self, page: str) -> PyQuery:
+        """ Fetch page html respecting remote host connections limit
+
+        :param str page: Page url
+        :return PyQuery:
+        """
+        with _get_host_semaphore(self._web_host):
+            if self.__http is None:
+                return self._client.get(page)
+
+            with self.__http.client(self._web_host, cache_ttl=self.__cache_ttl, cache=True) as client:
+                return client.get(page)
+
+    def close(self):
+        """ Close all the connections opened
+
+        :return None:
+        """
+        with self.__clients_lock:
+            while self.__clients:
+                self.__clients.pop().close()
+        self.__local = threading.local()
 
     def __iter__(self, start_page='') -> RawPost:
         """ Yields all the posts found beginning from the page specified
@@ -146,18 +256,37 @@ class AbstractParser(metaclass=ABCMeta):
         :param str start_page: Page url (e.g. "/20131117") or empty to start from beginning
         :return RawPost:
         """
-        posts = []
-        pages_links = [start_page or '/']
-        while True:
+        pool = ThreadPoolExecutor(self.__prefetch) if self.__prefetch else None
+        fetching = {}
+
+        def _prefetch(pages):
+            """ Fetch the next pages in background, forget the pages not needed anymore """
+            window = pages[:self.__prefetch]
+            for page in set(fetching) - set(window):
+                fetching.pop(page).cancel()
+            for page in window:
+                if page not in fetching:
+                    fetching[page] = pool.submit(self._fetch_page, page)
+
+        try:
+            pages_links = [start_page or '/']
             while pages_links:
+                if pool is not None:
+                    _prefetch(pages_links)
+
                 current_page = pages_links.pop(0)
-                html_doc = self._client.get(current_page)
+                html_doc = fetching.pop(current_page).result() if pool is not None else self._fetch_page(current_page)
                 posts = self.parse_page_html(html_doc)
                 if posts:
                     pages_links = self._parse_pages_collection(html_doc)
-                    break
+                    if pool is not None:
+                        _prefetch(pages_links)
+
+                yield from posts
 
-            if not posts:
-                raise StopIteration()
-            while posts:
-                yield posts.pop(0)
+        finally:
+            for page_future in fetching.values():
+                page_future.cancel()
+            if pool is not None:
+                pool.shutdown()
+            self.close()
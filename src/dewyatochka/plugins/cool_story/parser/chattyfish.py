@@ -15,6 +15,7 @@ Attributes
 
 from abc import ABCMeta, abstractproperty
 
+from lxml import etree
 from lxml.html import HtmlElement
 from pyquery import PyQuery
 
@@ -31,6 +32,12 @@ ITHAPPENS_SOURCE_NAME = 'ithappens.me'
 class _BaseParser(AbstractParser, metaclass=ABCMeta):
     """ Common ChattyFish logic (all projects use the same markup) """
 
+    # Post parts selectors (div.id span, h2 a, div.tags a, div.text p)
+    _STORY_ID_XPATH = etree.XPath('.//div[contains(concat(" ", normalize-space(@class), " "), " id ")]//span')
+    _STORY_TITLE_XPATH = etree.XPath('.//h2//a')
+    _STORY_TAGS_XPATH = etree.XPath('.//div[contains(concat(" ", normalize-space(@class), " "), " tags ")]//a')
+    _STORY_TEXT_XPATH = etree.XPath('.//div[contains(concat(" ", normalize-space(@class), " "), " text ")]//p')
+
     @abstractproperty
     def name(self) -> str:
         """ Get unique name
@@ -70,12 +77,10 @@ class _BaseParser(AbstractParser, metaclass=ABCMeta):
         :param HTMLElement html_element:
         :return RawPost:
         """
-        post_pyq_el = PyQuery(html_element)
-
-        story_id = int(post_pyq_el('div.id span')[0].text)
-        story_title = post_pyq_el('h2 a')[0].text
-        tags = frozenset(tag.text.strip() for tag in post_pyq_el('div.tags a'))
-        story_text = parse_multiline_html(post_pyq_el('div.text p'))
+        story_id = int(self._STORY_ID_XPATH(html_element)[0].text)
+        story_title = self._STORY_TITLE_XPATH(html_element)[0].text
+        tags = frozenset(tag.text.strip() for tag in self._STORY_TAGS_XPATH(html_element))
+        story_text = parse_multiline_html(self._STORY_TEXT_XPATH(html_element))
 
         return RawPost(story_id, self.name, story_title, story_text, tags)
 
@@ -14,6 +14,7 @@ Attributes
 import html
 from html.parser import HTMLParser
 
+from lxml import etree
 from lxml.html import HtmlElement
 from pyquery import PyQuery
 
@@ -29,9 +30,18 @@ NYA_SH_SOURCE_NAME = 'nya.sh'
 class Parser(AbstractParser):
     """ nya.sh parser """
 
-    def __init__(self):
-        """ Init parser object, create html parser for entities decoding """
-        super().__init__()
+    # Post parts selectors (div.sm a b, div.content)
+    _STORY_ID_XPATH = etree.XPath('.//div[contains(concat(" ", normalize-space(@class), " "), " sm ")]//a//b')
+    _STORY_TEXT_XPATH = etree.XPath('.//div[contains(concat(" ", normalize-space(@class), " "), " content ")]')
+
+    def __init__(self, prefetch=0, http=None, cache_ttl=None):
+        """ Init parser object, create html parser for entities decoding
+
+        :param int prefetch: Count of pages to fetch ahead concurrently, 0 to fetch pages one by one
+        :param HTTPService http: Pooled (and caching) web clients provider, own clients are used if not specified
+        :param int cache_ttl: Time to cache pages fetched with pooled clients
+        """
+        super().__init__(prefetch, http, cache_ttl)
         self.__html_parser = HTMLParser()
 
     @property
@@ -74,9 +84,7 @@ class Parser(AbstractParser):
         :param HTMLElement html_element:
         :return RawPost:
         """
-        post_pyq_el = PyQuery(html_element)
-
-        story_id = int(post_pyq_el('div.sm a b')[0].text.lstrip('#'))
-        story_text = html.unescape(parse_multiline_html(post_pyq_el('div.content')))
+        story_id = int(self._STORY_ID_XPATH(html_element)[0].text.lstrip('#'))
+        story_text = html.unescape(parse_multiline_html(self._STORY_TEXT_XPATH(html_element)))
 
         return RawPost(story_id, self.name, '', story_text, frozenset())
@@ -2,7 +2,10 @@
 
 """ e-hentai galleries adapter (simple search by keywords) """
 
+import time
 import random
+import threading
+from collections import OrderedDict
 
 from dewyatochka.core.plugin import chat_command
 
@@ -25,8 +28,132 @@ _HENTAI_SEARCH_PARAMS = {'f_doujinshi': '1',
                          'f_misc':      '0',
                          'f_srdd':      '5'}
 
+# Time to reuse parsed search results for the same keywords by default
+_DEFAULT_RESULTS_CACHE_TTL = 600
 
-@chat_command('hentai')
+# Max count of searches to keep results of by default
+_DEFAULT_RESULTS_CACHE_SIZE = 128
+
+
+class _SearchFlight:
+    """ Search being performed, waited for by identical searches """
+
+    def __init__(self):
+        """ Create unfinished flight """
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _SearchResultsCache:
+    """ TTL + LRU bounded galleries lists cache with concurrent identical searches coalesced """
+
+    def __init__(self, size: int, ttl: int):
+        """ Create empty cache
+
+        :param int size: Max searches count to keep results of
+        :param int ttl: Time to keep results for
+        """
+        self._size = size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(keywords: str) -> str:
+        """ Get cache key for search keywords
+
+        :param str keywords:
+        :return str:
+        """
+        return ' '.join(keywords.lower().split())
+
+    def get(self, keywords: str, search: callable) -> list:
+        """ Get cached galleries or search for them, only one search is performed for the same keywords at once
+
+        :param str keywords: Normalized keywords
+        :param callable search: Keywords -> galleries list
+        :return list:
+        """
+        with self._lock:
+            entry = self._entries.get(keywords)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(keywords)
+                return entry[1]
+
+            flight = self._flights.get(keywords)
+            leader = flight is None
+            if leader:
+                flight = self._flights[keywords] = _SearchFlight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = search(keywords)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[keywords]
+                if flight.error is None:
+                    self._entries[keywords] = (time.time() + self._ttl, flight.result)
+                    self._entries.move_to_end(keywords)
+                    while len(self._entries) > self._size:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+
+        return flight.result
+
+
+# Parsed search results cache, created on first search
+_results_cache = None
+
+# Lock for the results cache creation
+_results_cache_lock = threading.Lock()
+
+
+def _get_results_cache(registry) -> _SearchResultsCache:
+    """ Get search results cache, create on first use
+
+    :param registry: Plugin registry (config is used)
+    :return _SearchResultsCache:
+    """
+    global _results_cache
+
+    with _results_cache_lock:
+        if _results_cache is None:
+            _results_cache = _SearchResultsCache(
+                int(registry.config.get('results_cache_size', _DEFAULT_RESULTS_CACHE_SIZE)),
+                int(registry.config.get('results_cache_ttl', _DEFAULT_RESULTS_CACHE_TTL))
+            )
+
+        return _results_cache
+
+
+def _search_galleries(keywords: str, registry) -> list:
+    """ Fetch galleries found by keywords
+
+    :param str keywords:
+    :param registry: Plugin registry (config and http service are used)
+    :return list: (href, title) tuples
+    """
+    hentai_params = _HENTAI_SEARCH_PARAMS.copy()
+    hentai_params['f_search'] = keywords
+
+    cache_ttl = registry.config.get('cache_ttl')
+    with registry.http.client(_HENTAI_DOMAIN, cache_ttl=int(cache_ttl) if cache_ttl else None) as web_client:
+        html_doc = web_client.get('/', hentai_params)
+
+    return [(el.attrib['href'], el.text) for el in html_doc('a[href^="http://%s/g/"]' % _HENTAI_DOMAIN)]
+
+
+@chat_command('hentai', services=['http'])
 def hentai_command_handler(inp, outp, registry):
     """ Handle hentai command
 
@@ -35,18 +162,15 @@ def hentai_command_handler(inp, outp, registry):
     :param registry:
     :return None:
     """
-    from dewyatochka.core.utils.http import WebClient
-
     search_keywords = ' '.join(inp.text.split(' ')[1:])
     message_args = {'user': inp.sender.resource, 'keywords': search_keywords}
-    hentai_params = _HENTAI_SEARCH_PARAMS.copy()
-    hentai_params['f_search'] = search_keywords
-
-    html_doc = WebClient(_HENTAI_DOMAIN).get('/', hentai_params)
-    galleries = [(el.attrib['href'], el.text) for el in html_doc('a[href^="http://%s/g/"]' % _HENTAI_DOMAIN)]
+    galleries = _get_results_cache(registry).get(
+        _SearchResultsCache.normalize(search_keywords),
+        lambda keywords: _search_galleries(keywords, registry)
+    )
 
     if galleries:
-        gallery_link, gallery_title = galleries[random.randint(0, len(galleries))]
+        gallery_link, gallery_title = random.choice(galleries)
         message_format = registry.config.get('message_found')
         message_args.update({'title': gallery_title, 'url': gallery_link})
     else:
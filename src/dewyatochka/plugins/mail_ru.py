@@ -2,10 +2,13 @@
 
 """ Ask a question from mail.ru """
 
+import os
 import time
 import random
+import hashlib
+import tempfile
 import threading
-from collections import defaultdict
+from collections import deque, OrderedDict
 
 from dewyatochka.core import plugin
 from dewyatochka.core.plugin.builtins import get_activity_info
@@ -13,12 +16,6 @@ from dewyatochka.core.plugin.builtins import get_activity_info
 __all__ = []
 
 
-# Cached questions lists by categories
-_mail_ru_questions_cache = defaultdict(lambda: [])
-
-# Lock for _get_question function
-_get_question_lock = threading.Lock()
-
 # otvet.mail.ru API domain
 _QUESTIONS_DOMAIN = 'otvet.mail.ru'
 
@@ -34,41 +31,318 @@ _DEFAULT_CATEGORY = 'adult'
 # Max silence allowed by default
 _DEFAULT_SILENCE_INTERVAL = 10800  # 3 hours
 
+# Pool is refilled in background when questions count drops below
+_DEFAULT_POOL_LOW_WATERMARK = 20
+
+# Pool is refilled up to
+_DEFAULT_POOL_HIGH_WATERMARK = 100
+
+# Asked questions count to remember to avoid repeats
+_DEFAULT_SEEN_LIMIT = 5000
+
+# Default path to a file to keep asked questions in
+_DEFAULT_SEEN_PATH = '/var/lib/dewyatochka/mail_ru_seen.txt'
+
+# Max interval between pools state checks by refiller daemon
+_REFILL_CHECK_INTERVAL = 300
+
+# Min interval between refills of a pool the API has no new questions for
+_REFILL_MIN_INTERVAL = 10
+
+
+class _SeenQuestions:
+    """ Bounded set of asked questions keys persisted to a file
+
+    Shared by all the pools, so keys are added and saved under a lock
+    """
+
+    def __init__(self, limit: int, path=None):
+        """ Create empty set
+
+        :param int limit: Max keys count, the oldest are forgotten first
+        :param str path: File to persist keys to
+        """
+        self._limit = limit
+        self._path = path
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question: str) -> str:
+        """ Get question key to remember
+
+        :param str question:
+        :return str:
+        """
+        return hashlib.sha1(question.encode()).hexdigest()[:16]
+
+    def __contains__(self, key: str) -> bool:
+        """ Check if question key is remembered
+
+        :param str key:
+        :return bool:
+        """
+        return key in self._keys
+
+    def __len__(self) -> int:
+        """ Get remembered keys count
+
+        :return int:
+        """
+        return len(self._keys)
+
+    def add(self, key: str):
+        """ Remember a question key
+
+        :param str key:
+        :return None:
+        """
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self._limit:
+                self._keys.popitem(last=False)
+
+    def load(self):
+        """ Load keys from file if exists
+
+        :return None:
+        """
+        if not self._path or not os.path.isfile(self._path):
+            return
+
+        with open(self._path) as seen_file:
+            for line in seen_file:
+                if line.strip():
+                    self.add(line.strip())
+
+    def save(self):
+        """ Store keys to file atomically
+
+        :return None:
+        """
+        if not self._path:
+            return
+
+        with self._lock:
+            keys = list(self._keys)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self._path) or None, prefix='.mail_ru_seen.')
+        try:
+            with open(fd, 'w') as seen_file:
+                seen_file.writelines(key + '\n' for key in keys)
+            os.replace(tmp_path, self._path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+class _QuestionPool:
+    """ Shuffled questions queue of a category
+
+    Questions are popped with no locks held, refilling
+    is serialized and is expected to be done in background
+    """
+
+    def __init__(self, category: str, seen: _SeenQuestions, low_watermark: int, high_watermark: int,
+                 refill_requested: threading.Event):
+        """ Create empty pool
+
+        :param str category: Category label
+        :param _SeenQuestions seen: Asked questions to skip
+        :param int low_watermark: Refill is requested when questions count drops below
+        :param int high_watermark: Questions count to refill up to
+        :param threading.Event refill_requested: Event to set when refill is needed
+        """
+        self.category = category
+        self._seen = seen
+        self._low_watermark = low_watermark
+        self._high_watermark = high_watermark
+        self._refill_requested = refill_requested
+
+        self._questions = deque()
+        self._queued = set()
+        self._asked = deque()
+        self._refill_lock = threading.Lock()
+
+    def pop(self) -> str:
+        """ Take a question from the pool
+
+        :return str: Question text or None if pool is empty
+        """
+        try:
+            key, question = self._questions.popleft()
+        except IndexError:
+            self._refill_requested.set()
+            return None
+
+        self._queued.discard(key)
+        self._asked.append(key)
+        if len(self._questions) < self._low_watermark:
+            self._refill_requested.set()
+
+        return question
+
+    @property
+    def needs_refill(self) -> bool:
+        """ Check if questions count is below low watermark
+
+        :return bool:
+        """
+        return len(self._questions) < self._low_watermark
+
+    def refill(self, fetch: callable) -> int:
+        """ Fetch new questions until high watermark is reached or no new questions are found
+
+        :param callable fetch: Category label -> questions texts list
+        :return int: Count of questions added
+        """
+        with self._refill_lock:
+            while self._asked:
+                self._seen.add(self._asked.popleft())
+
+            added = 0
+            while len(self._questions) < self._high_watermark:
+                new_questions = []
+                for question in fetch(self.category):
+                    key = self._seen.key(question)
+                    if key not in self._seen and key not in self._queued:
+                        self._queued.add(key)
+                        new_questions.append((key, question))
 
-def _get_question(category: str, log) -> str:
+                if not new_questions:
+                    break
+
+                random.shuffle(new_questions)
+                self._questions.extend(new_questions)
+                added += len(new_questions)
+
+            return added
+
+
+# Question pools by categories
+_question_pools = {}
+
+# Asked questions shared by all the pools
+_seen_questions = None
+
+# Lock for pools creation
+_question_pools_lock = threading.Lock()
+
+# Set by pools running low on questions
+_refill_requested = threading.Event()
+
+
+def _get_pool(category: str, registry) -> _QuestionPool:
+    """ Get question pool by category, create on first use
+
+    :param str category: Category label
+    :param registry: Plugin registry (config and logger are used)
+    :return _QuestionPool:
+    """
+    global _seen_questions
+
+    pool = _question_pools.get(category)
+    if pool is not None:
+        return pool
+
+    with _question_pools_lock:
+        if _seen_questions is None:
+            seen = _SeenQuestions(int(registry.config.get('seen_limit', _DEFAULT_SEEN_LIMIT)),
+                                  registry.config.get('seen_path', _DEFAULT_SEEN_PATH))
+            try:
+                seen.load()
+            except (OSError, ValueError) as e:
+                registry.log.warning('Failed to load asked questions: %s', e)
+            _seen_questions = seen
+
+        if category not in _question_pools:
+            _question_pools[category] = _QuestionPool(
+                category,
+                _seen_questions,
+                int(registry.config.get('pool_low_watermark', _DEFAULT_POOL_LOW_WATERMARK)),
+                int(registry.config.get('pool_high_watermark', _DEFAULT_POOL_HIGH_WATERMARK)),
+                _refill_requested
+            )
+
+        return _question_pools[category]
+
+
+def _fetch_questions(category: str, registry) -> list:
+    """ Fetch latest questions texts of a category
+
+    :param str category: Category label
+    :param registry: Plugin registry (http service and logger are used)
+    :return list:
+    """
+    with registry.http.client(_QUESTIONS_DOMAIN, https=True) as web_client:
+        response = web_client.get(_QUESTIONS_REQUEST_URI, {'n': _QUESTIONS_PER_QUERY, 'cat': category})
+
+    questions = [question['qtext'] for question in response.get('qst', [])]
+    if not questions:
+        registry.log.warning('Failed to load new questions, server response: %s', response)
+
+    return questions
+
+
+def _refill_pool(pool: _QuestionPool, registry):
+    """ Refill a pool and store asked questions
+
+    :param _QuestionPool pool:
+    :param registry: Plugin registry (http service and logger are used)
+    :return None:
+    """
+    added = pool.refill(lambda category: _fetch_questions(category, registry))
+    registry.log.info('Loaded %d new questions for category "%s"', added, pool.category)
+
+    try:
+        _seen_questions.save()
+    except OSError as e:
+        registry.log.warning('Failed to store asked questions: %s', e)
+
+
+def _get_question(category: str, registry) -> str:
     """ Get question by category
 
     :param str category: Category label
-    :param logging.Logger log: Logger instance
+    :param registry: Plugin registry (http service and logger are used)
     :return str:
     """
-    from dewyatochka.core.utils.http import WebClient
+    pool = _get_pool(category, registry)
+    question = pool.pop()
+    if question is None:
+        registry.log.info('No questions left, loading new')
+        _refill_pool(pool, registry)
+        question = pool.pop()
 
-    try:
-        _get_question_lock.acquire()
-        category_questions = _mail_ru_questions_cache[category]
-        if not category_questions:
-            log.info('No questions left, loading new')
-
-            response = WebClient(_QUESTIONS_DOMAIN, https=True) \
-                .get(_QUESTIONS_REQUEST_URI, {'n': _QUESTIONS_PER_QUERY, 'cat': category}) \
-                .get('qst', [])
-            questions = [question['qtext'] for question in response]
-
-            if questions:
-                category_questions.extend(questions)
-                log.info('Loaded %d new questions for category "%s"', len(questions), category)
-            else:
-                log.warning('Failed to load new questions, server response: %s', response)
-                return None
-
-        return category_questions.pop(random.randint(0, len(category_questions) - 1))
-    finally:
-        _get_question_lock.release()
-
-
-@plugin.chat_accost
-@plugin.chat_command('talk')
+    return question
+
+
+@plugin.daemon(services=['http'])
+def question_pool_refiller(registry):
+    """ Keep question pools filled in background
+
+    :param registry:
+    :return None:
+    """
+    _get_pool(registry.config.get('category', _DEFAULT_CATEGORY), registry)
+
+    while True:
+        _refill_requested.clear()
+        for pool in list(_question_pools.values()):
+            if pool.needs_refill:
+                try:
+                    _refill_pool(pool, registry)
+                except Exception as e:
+                    registry.log.error('Failed to refill questions pool "%s": %s', pool.category, e)
+
+        if any(pool.needs_refill for pool in _question_pools.values()):
+            time.sleep(_REFILL_MIN_INTERVAL)  # No new questions yet, do not flood the API
+        _refill_requested.wait(_REFILL_CHECK_INTERVAL)
+
+
+@plugin.chat_accost(services=['http'])
+@plugin.chat_command('talk', services=['http'])
 def talk_command_handler(outp, registry, **_):
     """ Echo to the conference a question
 
@@ -78,10 +352,10 @@ def talk_command_handler(outp, registry, **_):
     :return None:
     """
     category = registry.config.get('category', _DEFAULT_CATEGORY)
-    outp.say(_get_question(category, registry.log))
+    outp.say(_get_question(category, registry))
 
 
-@plugin.schedule('@minutely', services=['bot'])
+@plugin.schedule('@minutely', services=['bot', 'http'])
 def occasional_question(registry):
     """ Ask a question if conference is too silent
 
@@ -98,6 +372,6 @@ def occasional_question(registry):
 
         if last_message_ts and last_message_ts + silence_interval < time.time():
             log.info('Conference %s is too silent (last msg.: %d), waking up', conference, last_message_ts)
-            registry.bot.send(_get_question(category, log), conference)
+            registry.bot.send(_get_question(category, registry), conference)
         else:
             log.debug('Conference %s postponed (last msg.: %d)', conference, last_message_ts)
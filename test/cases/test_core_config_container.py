@@ -32,6 +32,21 @@ class TestConfigContainer(unittest.TestCase):
 
         self.assertEqual(list(container), list(_TestSource.sections.keys()))
 
+    def test_reload(self):
+        """ Test re-reading data from the same source """
+        data_source = Mock()
+        data_source.read.side_effect = [{'foo': {'bar': '1'}}, {'foo': {'bar': '2'}}]
+
+        container = ConfigContainer(VoidApplication())
+        self.assertRaises(RuntimeError, container.reload)
+
+        container.load(data_source)
+        section = container.section('foo')
+        self.assertIs(container.reload(), container)
+
+        self.assertEqual(container.section('foo'), {'bar': '2'})
+        self.assertEqual(section, {'bar': '1'})
+
     def test_registration(self):
         """ Test service registration """
         app = VoidApplication()
@@ -9,6 +9,8 @@ import threading
 import unittest
 from unittest.mock import Mock, MagicMock, call, patch
 
+from sqlalchemy import Table, Column, Integer, String, create_engine
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql.schema import MetaData
 
 from dewyatochka.core.data.database import *
@@ -98,6 +100,19 @@ class TestThreadSafeSingleton(unittest.TestCase):
 
         self.assertEqual(obj1, obj2)
 
+    def test_detached(self):
+        """ Check if detached instances are separate ones """
+        class _Singleton(metaclass=ThreadSafeSingleton):
+            pass
+
+        obj = _Singleton()
+        detached = _Singleton.detached()
+
+        self.assertIsInstance(detached, _Singleton)
+        self.assertIsNot(detached, obj)
+        self.assertIsNot(_Singleton.detached(), detached)
+        self.assertIs(_Singleton(), obj)
+
 
 class TestObjectMeta(unittest.TestCase):
     """ Tests suite for dewyatochka.core.data.database.ObjectMeta """
@@ -314,3 +329,75 @@ class TestSQLIteStorage(unittest.TestCase):
         self.assertEqual(_Storage.close.call_count, 4)
         self.assertEqual(abstract_create_mock.call_count, 2)
         unlink_mock.assert_has_calls([call('/existing.sqlite')])
+
+
+class TestFullTextIndex(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.data.database.FullTextIndex """
+
+    def setUp(self):
+        """ Create a table with an index in memory """
+        self._table = Table('items', MetaData(),
+                            Column('id', Integer, primary_key=True),
+                            Column('title', String(255)),
+                            Column('note', String(255)))
+        self._index = FullTextIndex(self._table, 'title', 'note')
+
+        engine = create_engine('sqlite://')
+        self._table.create(bind=engine)
+        self._session = sessionmaker(bind=engine)()
+
+    def _insert(self, *rows):
+        """ Insert rows into the source table """
+        self._session.execute(self._table.insert(), [{'id': id_, 'title': title, 'note': note}
+                                                     for id_, title, note in rows])
+
+    def test_of(self):
+        """ Test getting an index bound to the table """
+        self.assertIs(FullTextIndex.of(self._table), self._index)
+        self.assertEqual(self._index.name, 'items_fts')
+
+    def test_search(self):
+        """ Test index is kept in sync with the source table """
+        self._insert((1, 'Cowboy Bebop', 'space'), (2, 'Space Dandy', 'space space'), (3, 'Trigun', 'desert'))
+
+        self.assertEqual(self._index.search(self._session, 'space'), [2, 1])
+        self.assertEqual(self._index.search(self._session, 'space', 1), [2])
+        self.assertEqual(self._index.search(self._session, 'bebop'), [1])
+
+        self._session.execute(self._table.update().where(self._table.c.id == 3).values(title='Trigun Badlands'))
+        self._session.execute(self._table.delete().where(self._table.c.id == 1))
+
+        self.assertEqual(self._index.search(self._session, 'space'), [2])
+        self.assertEqual(self._index.search(self._session, 'badlands'), [3])
+        self.assertEqual(self._index.search(self._session, 'bebop'), [])
+
+    def test_create(self):
+        """ Test index creation for a table with data """
+        self._session.execute('DROP TABLE items_fts')
+        self._index.suspend(self._session)
+        self._insert((1, 'Cowboy Bebop', 'space'))
+
+        self._index.create(self._session)
+        self._index.create(self._session)
+        self._insert((2, 'Space Dandy', 'space'))
+
+        self.assertEqual(sorted(self._index.search(self._session, 'space')), [1, 2])
+
+    def test_suspend(self):
+        """ Test index maintenance suspension """
+        self._index.suspend(self._session)
+        self._insert((1, 'Cowboy Bebop', 'space'))
+        self._index.rebuild(self._session)
+        self._insert((2, 'Space Dandy', 'space'))
+
+        self.assertEqual(sorted(self._index.search(self._session, 'space')), [1, 2])
+
+    def test_escape_query(self):
+        """ Test user input conversion to a query """
+        self._insert((1, 'Cowboy "Bebop" OR', 'space'), (2, 'Space Dandy', 'space'))
+
+        self.assertEqual(FullTextIndex.escape_query('foo "bar" OR'), '"foo"* """bar"""* "OR"*')
+        self.assertEqual(FullTextIndex.escape_query(' foo ', prefix=False), '"foo"')
+        self.assertEqual(self._index.search(self._session, FullTextIndex.escape_query('SPA dan')), [2])
+        self.assertEqual(self._index.search(self._session, FullTextIndex.escape_query('"bebop" OR')), [1])
+        self.assertRaises(ValueError, FullTextIndex.escape_query, ' ')
@@ -8,7 +8,8 @@ import unittest
 from unittest.mock import patch
 
 from dewyatochka.core.log.factory import *
-from dewyatochka.core.log.output import STDOUTHandler, FileHandler, NullHandler
+from dewyatochka.core.log.output import STDOUTHandler, FileHandler, NullHandler, AsyncHandler
+from dewyatochka.core.log.output import RotatingFileHandler, JSONFormatter
 from dewyatochka.core.log.service import LoggingService
 from dewyatochka.core.config.container import CommonConfig
 from dewyatochka.core.config.source import virtual
@@ -45,6 +46,30 @@ class TestDaemonLoggerFactory(unittest.TestCase):
         self.assertIsInstance(logger, LoggingService)
         self.assertEqual(logging.getLogger().handlers[0].baseFilename, '/default.log')
 
+        # Written in background
+        application.registry.config.load(virtual.Predefined({'log': {'file': '/default.log', 'async': 'yes'}}))
+        get_daemon_logger(application)
+        self.assertIsInstance(logging.getLogger().handlers[0], AsyncHandler)
+        self.assertIsInstance(logging.getLogger().handlers[0].target, FileHandler)
+        self.assertEqual(logging.getLogger().handlers[0].baseFilename, '/default.log')
+
+        # Structured & rotated
+        application.registry.config.load(virtual.Predefined({'log': {
+            'file': '/default.log', 'format': 'json', 'rotate_size': '10M', 'backup_count': '3', 'compress': 'yes',
+        }}))
+        get_daemon_logger(application)
+        handler = logging.getLogger().handlers[0]
+        self.assertIsInstance(handler, RotatingFileHandler)
+        self.assertIsInstance(handler.formatter, JSONFormatter)
+        self.assertEqual(handler.maxBytes, 10 << 20)
+        self.assertEqual(handler.backupCount, 3)
+        self.assertEqual(handler.namer('/default.log.1'), '/default.log.1.gz')
+
+        application.registry.config.load(virtual.Predefined({'log': {'file': '/default.log', 'rotate_when': 'd'}}))
+        get_daemon_logger(application)
+        self.assertEqual(logging.getLogger().handlers[0].when, 'D')
+        self.assertNotIsInstance(logging.getLogger().handlers[0].formatter, JSONFormatter)
+
         # Default file
         application.registry.config.load(virtual.Empty())
         get_daemon_logger(application)
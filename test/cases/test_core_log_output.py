@@ -2,20 +2,30 @@
 
 """ Tests suite for dewyatochka.core.log.output """
 
+import io
+import os
 import sys
+import gzip
+import json
 import struct
 import logging
+import tempfile
+import threading
+import time
 
 import unittest
 from unittest.mock import patch, Mock, call
 
 from dewyatochka.core.log.output import *
-from dewyatochka.core.log.service import LEVEL_PROGRESS, LEVEL_NAME_PROGRESS
+from dewyatochka.core.log.service import LEVEL_PROGRESS, LEVEL_NAME_PROGRESS, log_context
 
 
 # Log format stub
 _LOG_FORMAT = '%(levelname)s: %(message)s'
 
+# INFO records count to log on each handler benchmark run
+_BENCHMARK_RECORDS = 50000
+
 
 class TestHandler(unittest.TestCase):
     """ Tests suite for dewyatochka.core.log.output.Handler """
@@ -75,6 +85,122 @@ class TestHandler(unittest.TestCase):
             call('\n'),
         ])
 
+    def test_handle_batch(self):
+        """ Test records batch handling """
+        class _Handler(Handler):
+            def _create_handler(self):
+                return logging.StreamHandler(stream=stream)
+
+        stream = io.StringIO()
+        stream.write = Mock(wraps=stream.write)
+
+        handler = _Handler(_LOG_FORMAT)
+        handler.handle_batch([logging.makeLogRecord(params) for params in [
+            {'levelno': logging.INFO, 'levelname': 'INFO', 'msg': 'info #%d', 'args': (1,)},
+            {'levelno': logging.INFO, 'levelname': 'INFO', 'msg': 'info #2'},
+            {'levelno': LEVEL_PROGRESS, 'levelname': LEVEL_NAME_PROGRESS, 'msg': 'progress #1'},
+            {'levelno': logging.INFO, 'levelname': 'INFO', 'msg': 'info #3'},
+            {'levelno': logging.INFO, 'levelname': 'INFO', 'msg': 'info #4'},
+        ]])
+
+        self.assertEqual(stream.getvalue(), 'INFO: info #1\nINFO: info #2\nPROGRESS: progress #1\r\n'
+                                            'INFO: info #3\nINFO: info #4\n')
+        self.assertEqual(stream.write.call_count, 5)
+
+
+class TestAsyncHandler(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.log.output.AsyncHandler """
+
+    def _create_handler(self, queue_size=AsyncHandler.DEFAULT_QUEUE_SIZE) -> AsyncHandler:
+        """ Create handler writing to a mock
+
+        :param int queue_size:
+        :return AsyncHandler:
+        """
+        handler = AsyncHandler(Mock(), queue_size)
+        self.addCleanup(handler.close)
+
+        return handler
+
+    def test_handle(self):
+        """ Test records writing in background """
+        args = ['foo']
+        handler = self._create_handler()
+        handler.handle(logging.makeLogRecord({'levelno': logging.INFO, 'msg': 'info #%s', 'args': (args,)}))
+        handler.handle(logging.makeLogRecord({'levelno': logging.INFO, 'msg': 'info #2'}))
+        args.append('bar')
+        handler.flush()
+
+        records = [record for call_ in handler.target.handle_batch.call_args_list for record in call_[0][0]]
+        self.assertEqual([record.getMessage() for record in records], ["info #['foo']", 'info #2'])
+        self.assertEqual(handler.dropped, 0)
+        self.assertIs(handler.level, handler.target.level)
+
+        handler.close()
+        self.assertFalse(handler._writer.is_alive())
+
+    def test_malformed_record(self):
+        """ Test malformed record is reported by the target handler, not raised to the caller """
+        handler = self._create_handler()
+        record = logging.makeLogRecord({'levelno': logging.INFO, 'msg': 'bad %d', 'args': ('str',)})
+        handler.handle(record)
+        handler.flush()
+
+        handler.target.handler.handleError.assert_called_once_with(record)
+        handler.target.handle_batch.assert_not_called()
+
+    def test_overflow(self):
+        """ Test records dropping on queue overflow """
+        written, resume = threading.Event(), threading.Event()
+        handler = self._create_handler(queue_size=2)
+        handler.target.handle_batch.side_effect = lambda _: written.set() or resume.wait()
+
+        handler.handle(logging.makeLogRecord({'msg': 'blocking'}))
+        written.wait()
+        for i in range(5):
+            handler.handle(logging.makeLogRecord({'msg': 'info #%d' % i}))
+        self.assertEqual(handler.dropped, 3)
+
+        resume.set()
+        handler.flush()
+
+        records = [call_[0][0] for call_ in handler.target.handle_batch.call_args_list]
+        self.assertEqual([[record.msg for record in batch] for batch in records],
+                         [['blocking'], ['info #0', 'info #1']])
+        handler.target.handle.assert_called_once()
+        self.assertEqual(handler.target.handle.call_args[0][0].getMessage(), '3 log records dropped on queue overflow')
+
+    @unittest.skipUnless(os.environ.get('BENCHMARK'), 'Set BENCHMARK env var to run benchmarks')
+    def test_benchmark(self):
+        """ Compare per-message cost of INFO logging to a file with sync and queued handlers """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        def _get_cost(handler: Handler, file_path: str) -> float:
+            records = [logging.makeLogRecord({'levelname': 'INFO', 'levelno': logging.INFO,
+                                              'msg': 'info #%d from %s', 'args': (i, 'benchmark')})
+                       for i in range(_BENCHMARK_RECORDS)]
+            try:
+                started_at = time.perf_counter()
+                for record in records:
+                    handler.handle(record)
+                elapsed = time.perf_counter() - started_at
+                handler.flush()
+            finally:
+                handler.close()
+
+            with open(file_path) as log_file:
+                self.assertEqual(sum(1 for _ in log_file), _BENCHMARK_RECORDS)
+
+            return elapsed / _BENCHMARK_RECORDS
+
+        sync_path, async_path = os.path.join(directory.name, 'sync.log'), os.path.join(directory.name, 'async.log')
+        sync_cost = _get_cost(FileHandler(_LOG_FORMAT, sync_path), sync_path)
+        async_cost = _get_cost(AsyncHandler(FileHandler(_LOG_FORMAT, async_path), _BENCHMARK_RECORDS), async_path)
+
+        print('sync: %.2fus/message, queued: %.2fus/message' % (sync_cost * 10 ** 6, async_cost * 10 ** 6))
+        self.assertLess(async_cost, sync_cost)
+
 
 class TestSTDOUTHandler(unittest.TestCase):
     """ Tests suite for dewyatochka.core.log.output.STDOUTHandler """
@@ -97,6 +223,91 @@ class TestFileHandler(unittest.TestCase):
         self.assertIsNone(handler.stream)
 
 
+class TestRotatingFileHandler(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.log.output.RotatingFileHandler """
+
+    def test_create_handler(self):
+        """ Test inner handler instantiation """
+        handler = RotatingFileHandler(_LOG_FORMAT, '/file.log', max_size=1024).handler
+        self.assertIsInstance(handler, logging.handlers.RotatingFileHandler)
+        self.assertEqual(handler.maxBytes, 1024)
+        self.assertEqual(handler.backupCount, RotatingFileHandler.DEFAULT_BACKUP_COUNT)
+        self.assertIsNone(handler.namer)
+
+        handler = RotatingFileHandler(_LOG_FORMAT, '/file.log', when='midnight', backup_count=2, compress=True).handler
+        self.assertIsInstance(handler, logging.handlers.TimedRotatingFileHandler)
+        self.assertEqual(handler.backupCount, 2)
+        self.assertEqual(handler.namer('/file.log.1'), '/file.log.1.gz')
+
+        self.assertRaises(ValueError, RotatingFileHandler, _LOG_FORMAT, '/file.log')
+        self.assertRaises(ValueError, RotatingFileHandler, _LOG_FORMAT, '/file.log', max_size=1024, backup_count=0)
+
+    def test_rotation(self):
+        """ Test files rotation and compression """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        file_path = os.path.join(directory.name, 'file.log')
+
+        handler = RotatingFileHandler(_LOG_FORMAT, file_path, max_size=100, backup_count=2, compress=True)
+        self.addCleanup(handler.close)
+        records = [logging.makeLogRecord({'levelname': 'INFO', 'msg': 'info #%d' % i}) for i in range(30)]
+        for record in records[:10]:
+            handler.handle(record)
+        handler.handle_batch(records[10:])
+        handler.wait_compression()
+
+        # Size is checked for each record handled one by one and once for a batch
+        self.assertEqual(sorted(os.listdir(directory.name)), ['file.log.1.gz', 'file.log.2.gz'])
+        with gzip.open(file_path + '.2.gz', 'rt') as file:
+            self.assertEqual(file.read(), ''.join('INFO: info #%d\n' % i for i in range(7)))
+        with gzip.open(file_path + '.1.gz', 'rt') as file:
+            self.assertEqual(file.read(), ''.join('INFO: info #%d\n' % i for i in range(7, 30)))
+
+    def test_compression_error(self):
+        """ Test compression failure reporting """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        file_path = os.path.join(directory.name, 'file.log')
+
+        handler = RotatingFileHandler(_LOG_FORMAT, file_path, max_size=10, compress=True)
+        self.addCleanup(handler.close)
+        with self.assertLogs('dewyatochka.core.log.output', logging.ERROR) as logs:
+            with patch('gzip.open', side_effect=OSError('No space left on device')):
+                handler.handle(logging.makeLogRecord({'levelname': 'INFO', 'msg': 'rotated record'}))
+                handler.wait_compression()
+            handler.handle(logging.makeLogRecord({'levelname': 'INFO', 'msg': 'next record'}))
+
+        self.assertEqual(logs.output, ['ERROR:dewyatochka.core.log.output:'
+                                       'Failed to compress rotated log file: No space left on device'])
+
+
+class TestJSONFormatter(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.log.output.JSONFormatter """
+
+    def test_format(self):
+        """ Test records formatting """
+        formatter = NullHandler(FORMAT_JSON).formatter
+        self.assertIsInstance(formatter, JSONFormatter)
+
+        logger = logging.getLogger('test_json_formatter')
+        with log_context(plugin='foo', conference='bar@conference.example.com'):
+            record = logger.makeRecord(logger.name, logging.INFO, __file__, 1, 'info "%s"', ('ы',), None,
+                                       extra={'latency': 0.25})
+        data = json.loads(formatter.format(record))
+        self.assertRegex(data.pop('time'), r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}[+-]\d{4}$')
+        self.assertEqual(data, {'level': 'INFO', 'logger': 'test_json_formatter', 'thread': 'MainThread',
+                                'message': 'info "ы"', 'plugin': 'foo', 'conference': 'bar@conference.example.com',
+                                'latency': 0.25})
+
+        try:
+            raise RuntimeError('Failure')
+        except RuntimeError:
+            record = logger.makeRecord(logger.name, logging.ERROR, __file__, 1, 'error', (), sys.exc_info())
+        data = json.loads(formatter.format(record))
+        self.assertNotIn('plugin', data)
+        self.assertIn('RuntimeError: Failure', data['exception'])
+
+
 class TestNullHandler(unittest.TestCase):
     """ Tests suite for dewyatochka.core.log.output.NullHandler """
 
@@ -86,6 +86,8 @@ class TestLoggingService(unittest.TestCase):
 
         wrapper2 = service('foo')
         self.assertEqual(wrapper2.name, 'foo')
+        self.assertIs(service('foo'), wrapper2)
+        self.assertIs(LoggerWrapper.get('foo'), wrapper2)
 
     @patch.object(logging.Logger, 'critical')
     @patch.object(logging.Logger, 'exception')
@@ -0,0 +1,138 @@
+# -*- coding=utf-8
+
+""" Tests suite for dewyatochka.core.metrics.exporter """
+
+import os
+import random
+import threading
+import socket
+import unittest
+from unittest.mock import Mock
+
+from dewyatochka.core.metrics.exporter import *
+from dewyatochka.core.metrics.registry import MetricsRegistry
+
+
+# Test socket path
+_SOCKET_PATH_TPL = os.path.realpath(os.path.dirname(__file__) + '/../files/control/test_metrics_%d.sock')
+
+
+def _get_registry() -> MetricsRegistry:
+    """ Get registry with some metrics
+
+    :return MetricsRegistry:
+    """
+    registry = MetricsRegistry()
+    registry.counter('foo_total', 'Foo counter', {'bar': 'a"b'}).inc(3)
+    registry.gauge('baz', callback=lambda: 1.5)
+    histogram = registry.histogram('qux_seconds', 'Qux time', buckets=(.1, 1))
+    for value in (.05, .5, 5):
+        histogram.observe(value)
+
+    return registry
+
+
+def _scrape(address, request=b'GET /metrics HTTP/1.0\r\n\r\n') -> bytes:
+    """ Request metrics
+
+    :param str|tuple address:
+    :param bytes request:
+    :return bytes:
+    """
+    with socket.socket(socket.AF_UNIX if isinstance(address, str) else socket.AF_INET) as connection:
+        connection.connect(address)
+        connection.sendall(request)
+        return connection.makefile('rb').read()
+
+
+class TestRender(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.metrics.exporter.render """
+
+    def test_render(self):
+        """ Test text format """
+        self.assertEqual(render(_get_registry()).decode().splitlines(), [
+            '# TYPE baz gauge',
+            'baz 1.5',
+            '# HELP foo_total Foo counter',
+            '# TYPE foo_total counter',
+            'foo_total{bar="a\\"b"} 3',
+            '# HELP qux_seconds Qux time',
+            '# TYPE qux_seconds histogram',
+            'qux_seconds_bucket{le="0.1"} 1',
+            'qux_seconds_bucket{le="1.0"} 2',
+            'qux_seconds_bucket{le="+Inf"} 3',
+            'qux_seconds_sum 5.55',
+            'qux_seconds_count 3',
+        ])
+
+    def test_collection_failure(self):
+        """ Test failed metrics are skipped """
+        registry = MetricsRegistry()
+        registry.gauge('foo', callback=Mock(side_effect=RuntimeError('Failure')))
+        registry.counter('bar').inc()
+        log = Mock()
+
+        self.assertEqual(render(registry, log), b'# TYPE bar counter\nbar 1\n')
+        log.warning.assert_called_once()
+
+
+class TestExporter(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.metrics.exporter.Exporter """
+
+    def _serve(self, exporter: Exporter) -> threading.Thread:
+        """ Start serving in a separate thread
+
+        :param Exporter exporter:
+        :return threading.Thread:
+        """
+        exporter.open()
+        thread = threading.Thread(target=exporter.serve, args=(60,))
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(exporter.close)
+
+        return thread
+
+    def test_serve_unix(self):
+        """ Test scrape over UNIX socket """
+        path = _SOCKET_PATH_TPL % random.randint(1, 9000)
+        registry = _get_registry()
+        exporter = Exporter(path, registry)
+        thread = self._serve(exporter)
+
+        response = _scrape(path)
+        head, body = response.split(b'\r\n\r\n', 1)
+        self.assertTrue(head.startswith(b'HTTP/1.0 200 OK\r\n'))
+        self.assertIn(b'Content-Type: ' + CONTENT_TYPE.encode(), head)
+        self.assertEqual(body, render(registry))
+
+        self.assertTrue(_scrape(path, b'GET /foo HTTP/1.0\r\n\r\n').startswith(b'HTTP/1.0 404 Not Found\r\n'))
+        self.assertTrue(_scrape(path, b'POST /metrics HTTP/1.0\r\n\r\n').startswith(b'HTTP/1.0 405 '))
+
+        exporter.close()
+        thread.join(5)
+        self.assertFalse(os.path.exists(path))
+
+    def test_serve_tcp(self):
+        """ Test scrape over TCP and snapshot refresh """
+        registry = MetricsRegistry()
+        counter = registry.counter('foo_total')
+        exporter = Exporter('127.0.0.1:0', registry)
+        self._serve(exporter)
+
+        response = _scrape(exporter.address)
+        self.assertTrue(response.endswith(b'\r\n\r\n# TYPE foo_total counter\nfoo_total 0\n'))
+
+        counter.inc()
+        self.assertEqual(_scrape(exporter.address), response)
+
+        exporter.refresh()
+        self.assertTrue(_scrape(exporter.address).endswith(b'\nfoo_total 1\n'))
+
+    def test_close_not_served(self):
+        """ Test close without serving """
+        exporter = Exporter('127.0.0.1:0')
+        exporter.open()
+        exporter.close()
+        exporter.close()
+        exporter.serve()
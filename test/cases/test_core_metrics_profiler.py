@@ -0,0 +1,97 @@
+# -*- coding=utf-8
+
+""" Tests suite for dewyatochka.core.metrics.profiler """
+
+import time
+import threading
+import unittest
+
+from dewyatochka.core.metrics.profiler import *
+
+
+def _busy_loop(stop: threading.Event):
+    """ Do something until stopped
+
+    :param threading.Event stop:
+    :return None:
+    """
+    while not stop.wait(.001):
+        pass
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.metrics.profiler.SamplingProfiler """
+
+    def _start_thread(self, name: str) -> threading.Event:
+        """ Start a thread to be sampled
+
+        :param str name: Thread name
+        :return threading.Event: Stop event
+        """
+        stop = threading.Event()
+        thread = threading.Thread(name=name, target=_busy_loop, args=(stop,))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+
+        return stop
+
+    def test_sample(self):
+        """ Test stacks aggregation """
+        self._start_thread('message[foo][7f0123456789]')
+        self._start_thread('message[foo][7f0123abcdef]')
+
+        profiler_ = SamplingProfiler()
+        for _ in range(3):
+            profiler_.sample()
+
+        self.assertEqual(profiler_.samples, 3)
+        lines = [line for line in profiler_.dump() if line.startswith('message[foo];')]
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines), 6)
+        for line in lines:
+            self.assertIn(';_busy_loop (test_core_metrics_profiler.py);', line)
+
+        profiler_.reset()
+        self.assertEqual(profiler_.samples, 0)
+        self.assertEqual(profiler_.dump(), [])
+
+    def test_max_stacks(self):
+        """ Test stacks count limit """
+        self._start_thread('foo')
+        self._start_thread('bar')
+
+        profiler_ = SamplingProfiler()
+        profiler_.start(max_stacks=1, rate=1)
+        profiler_.stop()
+        profiler_.reset()
+        for _ in range(5):
+            profiler_.sample()
+
+        stacks = profiler_.dump()
+        self.assertEqual(len([line for line in stacks if ';[truncated] ' not in line]), 1)
+        self.assertTrue(any(';[truncated] ' in line for line in stacks))
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in stacks), 10)
+
+    def test_start_stop(self):
+        """ Test background sampling """
+        self._start_thread('foo')
+
+        profiler_ = SamplingProfiler()
+        profiler_.start(rate=200)
+        self.assertTrue(profiler_.running)
+        self.assertRaises(RuntimeError, profiler_.start)
+        time.sleep(.1)
+        profiler_.stop()
+
+        self.assertFalse(profiler_.running)
+        self.assertRaises(RuntimeError, profiler_.stop)
+        self.assertGreater(profiler_.samples, 0)
+        self.assertTrue(any(line.startswith('foo;') for line in profiler_.dump()))
+        self.assertFalse(any(line.startswith('profiler[Sampler]') for line in profiler_.dump()))
+
+        self.assertRaises(ValueError, profiler_.start, 0)
+
+    def test_default(self):
+        """ Test default profiler is not running """
+        self.assertIsInstance(profiler, SamplingProfiler)
+        self.assertFalse(profiler.running)
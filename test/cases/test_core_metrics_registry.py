@@ -0,0 +1,137 @@
+# -*- coding=utf-8
+
+""" Tests suite for dewyatochka.core.metrics.registry """
+
+import threading
+import unittest
+
+from dewyatochka.core.metrics.registry import *
+
+
+class TestCounter(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.metrics.registry.Counter """
+
+    def test_inc(self):
+        """ Test values from different threads are summed """
+        metric = Counter('foo')
+
+        def _inc():
+            for _ in range(1000):
+                metric.inc()
+
+        threads = [threading.Thread(target=_inc) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        metric.inc(5)
+        self.assertEqual(metric.value, 4005)
+        self.assertEqual(metric.value, 4005)
+
+    def test_finished_threads(self):
+        """ Test cells of finished threads are merged with no collection """
+        metric = Counter('foo')
+        for _ in range(2000):
+            thread = threading.Thread(target=metric.inc)
+            thread.start()
+            thread.join()
+
+        self.assertLessEqual(len(metric._cells), Counter._PRUNE_THRESHOLD)
+        self.assertEqual(metric.value, 2000)
+
+    def test_str(self):
+        """ Test metric name with labels """
+        self.assertEqual(str(Counter('foo')), 'foo')
+        self.assertEqual(str(Counter('foo', labels={'b': 2, 'a': 1})), 'foo{a="1",b="2"}')
+
+
+class TestGauge(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.metrics.registry.Gauge """
+
+    def test_value(self):
+        """ Test value set directly and computed """
+        metric = Gauge('foo')
+        self.assertEqual(metric.value, 0)
+        metric.set(42)
+        self.assertEqual(metric.value, 42)
+
+        self.assertEqual(Gauge('foo', callback=lambda: 13).value, 13)
+
+    def test_rebind(self):
+        """ Test the latest callback registered is used """
+        registry = MetricsRegistry()
+        registry.gauge('foo', callback=lambda: 1)
+        self.assertEqual(registry.gauge('foo', callback=lambda: 2).value, 2)
+        self.assertEqual(registry.gauge('foo').value, 2)
+
+
+class TestHistogram(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.metrics.registry.Histogram """
+
+    def test_observe(self):
+        """ Test values distribution by buckets """
+        metric = Histogram('foo', buckets=(1, 5, 10))
+        for value in (0.5, 1, 3, 7, 20):
+            metric.observe(value)
+
+        snapshot = metric.value
+        self.assertEqual(snapshot.buckets, (1, 5, 10))
+        self.assertEqual(snapshot.counts, [2, 1, 1, 1])
+        self.assertEqual(snapshot.sum, 31.5)
+        self.assertEqual(snapshot.count, 5)
+
+    def test_time(self):
+        """ Test time measurement """
+        metric = Histogram('foo')
+        with metric.time():
+            pass
+
+        self.assertRaises(RuntimeError, self._fail_timed, metric)
+        self.assertEqual(metric.value.count, 2)
+        self.assertEqual(metric.value.counts[0], 2)
+
+    @staticmethod
+    def _fail_timed(metric: Histogram):
+        """ Fail inside of time measurement block
+
+        :param Histogram metric:
+        :return None:
+        """
+        with metric.time():
+            raise RuntimeError()
+
+    def test_quantile(self):
+        """ Test quantile estimation """
+        metric = Histogram('foo', buckets=(1, 5, 10))
+        self.assertIsNone(Histogram.quantile(metric.value, .5))
+
+        for value in [0.5] * 50 + [3] * 45 + [7] * 4 + [20]:
+            metric.observe(value)
+
+        self.assertEqual(Histogram.quantile(metric.value, .5), 1)
+        self.assertEqual(Histogram.quantile(metric.value, .95), 5)
+        self.assertEqual(Histogram.quantile(metric.value, .99), 10)
+        self.assertEqual(Histogram.quantile(metric.value, 1), float('inf'))
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.metrics.registry.MetricsRegistry """
+
+    def test_get(self):
+        """ Test metrics registration """
+        registry = MetricsRegistry()
+
+        counter_ = registry.counter('foo', labels={'a': 1})
+        self.assertIs(registry.counter('foo', labels={'a': 1}), counter_)
+        self.assertIsNot(registry.counter('foo', labels={'a': 2}), counter_)
+        self.assertRaises(TypeError, registry.histogram, 'foo', labels={'a': 1})
+
+        gauge_ = registry.gauge('bar')
+        histogram_ = registry.histogram('baz')
+        self.assertEqual(registry.metrics, [gauge_, histogram_, counter_, registry.counter('foo', labels={'a': 2})])
+
+    def test_default_registry(self):
+        """ Test shortcuts use the default registry """
+        self.assertIs(counter('test_metrics_registry_total'),
+                      default_registry.counter('test_metrics_registry_total'))
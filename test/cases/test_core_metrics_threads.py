@@ -0,0 +1,85 @@
+# -*- coding=utf-8
+
+""" Tests suite for dewyatochka.core.metrics.threads """
+
+import threading
+import unittest
+from unittest.mock import Mock
+
+from dewyatochka.core.metrics.threads import *
+
+
+class _ThreadsTestCase(unittest.TestCase):
+    """ Threads tests base """
+
+    def _start_threads(self, *names: str):
+        """ Start threads idle until test end
+
+        :param tuple names: Threads names
+        :return None:
+        """
+        stop = threading.Event()
+        for name in names:
+            thread = threading.Thread(name=name, target=stop.wait)
+            thread.start()
+            self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+
+
+class TestFunctions(_ThreadsTestCase):
+    """ Tests suite for dewyatochka.core.metrics.threads functions """
+
+    def test_get_group_name(self):
+        """ Test per-thread ids stripping """
+        self.assertEqual(get_group_name('message[foo][7f0123456789]'), 'message[foo]')
+        self.assertEqual(get_group_name('Thread-12'), 'Thread')
+        self.assertEqual(get_group_name('Thread-12 (_run)'), 'Thread')
+        self.assertEqual(get_group_name('scheduler[Main]'), 'scheduler[Main]')
+
+    def test_census(self):
+        """ Test threads grouping """
+        self._start_threads('test_census[7f0123456789]', 'test_census[7f0123abcdef]', 'test_census_single')
+
+        groups = {group.name: group for group in census()}
+        self.assertEqual(groups['test_census'].count, 2)
+        self.assertEqual(groups['test_census_single'].count, 1)
+        self.assertLessEqual(groups['test_census'].newest_age, groups['test_census'].oldest_age)
+        self.assertLess(groups['test_census'].oldest_age, 60)
+        self.assertGreater(groups['MainThread'].oldest_age, 0)
+        self.assertEqual(sum(group.count for group in groups.values()), threading.active_count())
+
+        counts = [group.count for group in census()]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_dump_stacks(self):
+        """ Test stacks dump """
+        self._start_threads('test_dump_stacks')
+
+        stacks = {stack.name: stack for stack in dump_stacks()}
+        self.assertIn('in wait', stacks['test_dump_stacks'].stack)
+        self.assertFalse(stacks['test_dump_stacks'].daemon)
+        self.assertIn('test_dump_stacks', stacks['MainThread'].stack)
+
+
+class TestThreadsWatchdog(_ThreadsTestCase):
+    """ Tests suite for dewyatochka.core.metrics.threads.ThreadsWatchdog """
+
+    def test_check(self):
+        """ Test threads limit reporting """
+        log = Mock()
+        watchdog = ThreadsWatchdog(threading.active_count(), log)
+        self.assertFalse(watchdog.check())
+
+        self._start_threads('test_watchdog[7f0123456789]')
+        self.assertTrue(watchdog.check())
+        log.warning.assert_called_once()
+        self.assertIn('test_watchdog: 1', log.warning.call_args[0][-1])
+
+        # Reported once until doubled
+        self._start_threads('test_watchdog[7f0123abcdef]')
+        self.assertTrue(watchdog.check())
+        log.warning.assert_called_once()
+
+        watchdog = ThreadsWatchdog(threading.active_count() + 1, log)
+        self.assertFalse(watchdog.check())
+        log.info.assert_not_called()
@@ -0,0 +1,71 @@
+# -*- coding=utf-8
+
+""" Tests suite for dewyatochka.core.metrics.tracing """
+
+import time
+import unittest
+from unittest.mock import Mock
+
+from dewyatochka.core.metrics.tracing import *
+
+
+class TestTracer(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.metrics.tracing.Tracer """
+
+    def test_trace(self):
+        """ Test invocations recording """
+        tracer_ = Tracer()
+        tracer_.enable(size=2)
+        self.addCleanup(tracer_.disable)
+        self.assertTrue(tracer_.enabled)
+
+        with tracer_.trace('foo', 'message', 'abc'):
+            sum(range(10000))
+        with self.assertRaises(RuntimeError):
+            with tracer_.trace('bar', 'ctl'):
+                raise RuntimeError('Failure')
+        with tracer_.trace('baz', 'ctl'):
+            pass
+
+        traces = tracer_.traces
+        self.assertEqual([(trace.plugin, trace.type, trace.subject) for trace in traces],
+                         [('bar', 'ctl', None), ('baz', 'ctl', None)])
+        self.assertEqual(traces[0].error, "RuntimeError('Failure')")
+        self.assertIsNone(traces[1].error)
+        self.assertGreaterEqual(traces[1].wall_time, 0)
+        self.assertGreaterEqual(traces[1].cpu_time, 0)
+
+        tracer_.disable()
+        self.assertFalse(tracer_.enabled)
+        self.assertEqual(len(tracer_.traces), 2)
+
+    def test_slow(self):
+        """ Test slow invocations reporting """
+        log = Mock()
+        tracer_ = Tracer()
+        tracer_.enable(thresholds={'message': .1, 'ctl': 0}, log=log)
+        self.addCleanup(tracer_.disable)
+
+        def _slow_plugin():
+            with tracer_.trace('foo', 'message'):
+                time.sleep(.3)
+
+        _slow_plugin()
+        with tracer_.trace('bar', 'message'):
+            pass
+        with tracer_.trace('baz', 'ctl'):
+            time.sleep(.1)
+
+        trace = tracer_.traces[0]
+        self.assertIn('_slow_plugin', trace.stack)
+        self.assertIn('time.sleep(.3)', trace.stack)
+        self.assertIsNone(tracer_.traces[1].stack)
+
+        log.warning.assert_called_once()
+        self.assertEqual(log.warning.call_args[0][1:4], ('message', 'foo', None))
+        self.assertEqual(log.warning.call_args[0][-1], trace.stack)
+
+    def test_default(self):
+        """ Test tracing is disabled by default """
+        self.assertIsInstance(tracer, Tracer)
+        self.assertFalse(tracer.enabled)
@@ -191,6 +191,35 @@ class TestXMPPConnectionManager(unittest.TestCase):
         self.assertRaises(C2SConnectionError, next, cm_bad.input_stream)
         self.assertGreater(cm_bad.client.connect.call_count, 1)
 
+    def test_reconnects_counter(self):
+        """ Test only connection attempts following the first one are counted as reconnections """
+        stream_message = TextMessage(JID.from_string('sender@server/s'), JID.from_string('receiver@server/s'), text='')
+        client = Mock()
+        client.read.side_effect = [C2SConnectionError, stream_message, C2SConnectionError, stream_message]
+        cm = XMPPConnectionManager(_Application.create(), Mock(), client)
+        reconnects = cm._reconnects_counter.value
+
+        next(cm.input_stream)
+        self.assertEqual(cm._reconnects_counter.value - reconnects, 0)
+        next(cm.input_stream)
+        self.assertEqual(cm._reconnects_counter.value - reconnects, 1)
+
+        client = Mock()
+        cm = XMPPConnectionManager(_Application.create(), Mock(), client)
+        reconnects = cm._reconnects_counter.value
+
+        cm.connect()
+        self.assertEqual(cm._reconnects_counter.value - reconnects, 0)
+
+        client = Mock()
+        client.connect.side_effect = [C2SConnectionError, None]
+        cm = XMPPConnectionManager(_Application.create(), Mock(), client)
+        reconnects = cm._reconnects_counter.value
+
+        cm.connect()
+        self.assertEqual(client.connect.call_count, 2)
+        self.assertEqual(cm._reconnects_counter.value - reconnects, 1)
+
     def test_disconnect(self):
         """ Test disconnection """
         app = _Application.create()
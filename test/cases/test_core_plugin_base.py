@@ -2,10 +2,12 @@
 
 """ Tests suite for dewyatochka.core.plugin.base """
 
+import logging
 import unittest
-from unittest.mock import Mock
+from unittest.mock import ANY, Mock
 
 from dewyatochka.core.plugin.base import *
+from dewyatochka.core.metrics.tracing import tracer
 from dewyatochka.core.plugin.exceptions import PluginRegistrationError
 from dewyatochka.core.application import VoidApplication, Registry
 from dewyatochka.core.application import Service as BaseService
@@ -13,6 +15,14 @@ from dewyatochka.core.config.container import ExtensionsConfig
 from dewyatochka.core.config.source.virtual import Predefined
 
 
+def _create_record() -> logging.LogRecord:
+    """ Create log record the way loggers do
+
+    :return logging.LogRecord:
+    """
+    return logging.getLogRecordFactory()('foo', logging.INFO, __file__, 0, 'message', (), None)
+
+
 class _PluginService(Service):
     """ Non-abstract service for test purposes """
 
@@ -53,7 +63,33 @@ class TestEnvironment(unittest.TestCase):
         invokable.side_effect = plugin_exc
         self.assertRaises(Exception, lambda: environment())
         environment(logger=logger)
-        logger.error.assert_called_once_with('Plugin %s failed: %s', environment, plugin_exc)
+        logger.error.assert_called_once_with('Plugin %s failed: %s', environment, plugin_exc, extra={'latency': ANY})
+
+    def test_log_context(self):
+        """ Test plugin name is attached to records logged by plugin """
+        def _invokable(**_):
+            records.append(_create_record())
+        records = []
+
+        environment = Environment(_invokable, Registry())
+        environment()
+        self.assertEqual(records[0].plugin, environment.name)
+        self.assertFalse(hasattr(_create_record(), 'plugin'))
+
+    def test_trace(self):
+        """ Test invocations are traced when tracing is enabled """
+        def _invokable(**_):
+            pass
+
+        environment = Environment(_invokable, Registry())
+        environment.type = 'foo'
+
+        tracer.enable()
+        self.addCleanup(tracer.disable)
+        environment()
+
+        trace = tracer.traces[-1]
+        self.assertEqual((trace.plugin, trace.type, trace.subject), (environment.name, 'foo', None))
 
 
 class TestWrapper(unittest.TestCase):
@@ -119,14 +155,9 @@ class TestService(unittest.TestCase):
         entries = [PluginEntry(lambda **_: None, {}), PluginEntry(lambda **_: None, {}),
                    PluginEntry(lambda **_: None, {}), PluginEntry(lambda **_: None, {'services': ['foo']})]
 
-        loader1 = Mock()
-        loader1.load.return_value = entries[:2]
-        loader2 = Mock()
-        loader2.load.return_value = entries[2:]
-
         loader_service = Mock()
         loader_service.name.return_value = 'plugins_loader'
-        loader_service.loaders = [loader1, loader2]
+        loader_service.get_entries.return_value = tuple(entries)
 
         application = VoidApplication()
         application.depend(_PluginService)
@@ -137,6 +168,15 @@ class TestService(unittest.TestCase):
         plugin_service = application.registry.get_service(_PluginService)
         plugin_service.load()
         self.assertEqual(len(plugin_service.plugins), 3)
+        loader_service.get_entries.assert_called_once_with(*plugin_service.accepts)
+
+        # New generation is not used until swapped in
+        plugins = plugin_service.plugins
+        generation = plugin_service.build()
+        self.assertIs(plugin_service.plugins, plugins)
+        self.assertEqual(len(generation.plugins), 3)
+        plugin_service.swap(generation)
+        self.assertIs(plugin_service.plugins, generation.plugins)
 
     def test_plugins_not_loaded(self):
         """ Test failing to get plugins if load() method has not been invoked """
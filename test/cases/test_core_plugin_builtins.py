@@ -4,9 +4,10 @@
 
 import importlib
 import time
+import threading
 
 import unittest
-from unittest.mock import call, Mock
+from unittest.mock import call, patch, Mock
 
 from dewyatochka.core.plugin import builtins
 
@@ -21,6 +22,7 @@ from dewyatochka.core.plugin.subsystem.control import service as ctl_subsystem
 from dewyatochka.core.plugin.subsystem.control import network as ctl_network
 from dewyatochka.core.plugin.subsystem.message import py_entry as message_py_entry
 from dewyatochka.core.plugin.subsystem.message import service as message_subsystem
+from dewyatochka.core.plugin.subsystem.helper import service as helper_subsystem
 
 
 class _Participant(Participant):
@@ -160,6 +162,7 @@ class TestBuiltins(unittest.TestCase):
         application.depend(ExtensionsConfig)
         application.depend(LoaderService)
         application.depend(message_subsystem.Service)
+        application.depend(helper_subsystem.Service)
         application.depend(ctl_subsystem.Service)
 
         application.registry.config.load(Predefined({
@@ -168,6 +171,7 @@ class TestBuiltins(unittest.TestCase):
                 'help_message': '{user} :: {version} :: {commands}',
             },
         }))
+        application.registry.extensions_config.load(Predefined({}))
 
         return application
 
@@ -239,17 +243,126 @@ class TestBuiltins(unittest.TestCase):
 
         connection.send.assert_has_calls([
             call(b'{"text": "Accessible commands:"}\x00'),
+            call(b'{"text": "    attach                         : '
+                 b'Show a background job output until it is finished (job=<ID>)"}\x00'),
+            call(b'{"text": "    cancel                         : Cancel a background job (job=<ID>)"}\x00'),
+            call(b'{"text": "    jobs                           : '
+                 b'List background jobs (commands started with --detach)"}\x00'),
             call(b'{"text": "    list                           : List all the commands available"}\x00'),
+            call(b'{"text": "    profile_dump                   : '
+                 b'Dump stacks sampled in collapsed format for flamegraphs (file=<path>, reset=1)"}\x00'),
+            call(b'{"text": "    profile_start                  : '
+                 b'Start sampling profiler (rate=<samples per sec.>, max_stacks=<N>)"}\x00'),
+            call(b'{"text": "    profile_stop                   : '
+                 b'Stop sampling profiler"}\x00'),
+            call(b'{"text": "    reload                         : '
+                 b'Re-read extensions config and reload plugin modules changed"}\x00'),
+            call(b'{"text": "    stats                          : '
+                 b'Show runtime metrics (name=<prefix> to filter)"}\x00'),
             call(b'{"text": "    test_core_plugin_builtins.test : Test command"}\x00'),
+            call(b'{"text": "    threads                        : '
+                 b'Show alive threads grouped by kind with ages (name=<prefix>, stacks=1)"}\x00'),
+            call(b'{"text": "    traces                         : '
+                 b'Show the last plugins invocations traces (plugin=<prefix>, limit=<N>, stack=1)"}\x00'),
             call(b'{"text": "    version                        : Show version"}\x00')
         ])
         service.application.registry.log().info.assert_has_calls([
             call('Accessible commands:'),
+            call('    attach                         : Show a background job output until it is finished (job=<ID>)'),
+            call('    cancel                         : Cancel a background job (job=<ID>)'),
+            call('    jobs                           : List background jobs (commands started with --detach)'),
             call('    list                           : List all the commands available'),
+            call('    profile_dump                   : '
+                 'Dump stacks sampled in collapsed format for flamegraphs (file=<path>, reset=1)'),
+            call('    profile_start                  : '
+                 'Start sampling profiler (rate=<samples per sec.>, max_stacks=<N>)'),
+            call('    profile_stop                   : '
+                 'Stop sampling profiler'),
+            call('    reload                         : '
+                 'Re-read extensions config and reload plugin modules changed'),
+            call('    stats                          : Show runtime metrics (name=<prefix> to filter)'),
             call('    test_core_plugin_builtins.test : Test command'),
+            call('    threads                        : '
+                 'Show alive threads grouped by kind with ages (name=<prefix>, stacks=1)'),
+            call('    traces                         : '
+                 'Show the last plugins invocations traces (plugin=<prefix>, limit=<N>, stack=1)'),
             call('    version                        : Show version')
         ])
 
+    def test_stats(self):
+        """ Test runtime metrics output """
+        builtins.metrics.counter('test_builtins_stats_total', labels={'foo': 'bar'}).inc(3)
+        histogram = builtins.metrics.histogram('test_builtins_stats_seconds')
+        for value in (0.002, 0.02, 0.02, 3):
+            histogram.observe(value)
+
+        connection = Mock()
+        service = self._get_plugins_svc(ctl_subsystem.Service)
+        service.get_command('stats')(command=ctl_network.Message(name='stats', args={'name': 'test_builtins_stats'}),
+                                     source=connection)
+
+        connection.send.assert_has_calls([
+            call(b'{"text": "test_builtins_stats_seconds = count=4 avg=0.7605 p50<=0.025 p95<=5 p99<=5"}\x00'),
+            call(b'{"text": "test_builtins_stats_total{foo=\\"bar\\"} = 3"}\x00'),
+        ])
+
+        connection = Mock()
+        service.get_command('stats')(command=ctl_network.Message(name='stats', args={'name': 'unknown'}),
+                                     source=connection)
+        connection.send.assert_called_once_with(b'{"text": "No metrics collected"}\x00')
+
+    def test_threads(self):
+        """ Test threads census output """
+        stop = threading.Event()
+        for thread_id in ('7f0123456789', '7f0123abcdef'):
+            thread = threading.Thread(name='test_builtins_threads[%s]' % thread_id, target=stop.wait)
+            thread.start()
+            self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+
+        connection = Mock()
+        service = self._get_plugins_svc(ctl_subsystem.Service)
+        service.get_command('threads')(
+            command=ctl_network.Message(name='threads', args={'name': 'test_builtins_threads', 'stacks': '1'}),
+            source=connection
+        )
+
+        sent = [args[0] for args, _ in connection.send.call_args_list]
+        self.assertEqual(len(sent), 4)
+        self.assertEqual(sent[0], b'{"text": "2 threads in 1 groups"}\x00')
+        self.assertRegex(sent[1], rb'^\{"text": "test_builtins_threads +2  age 0:0\d \.\. 0:0\d"\}\x00$')
+        self.assertIn(b'test_builtins_threads[7f0123456789] (', sent[2])
+        self.assertIn(b'test_builtins_threads[7f0123abcdef] (', sent[3])
+        self.assertIn(b'in wait', sent[3])
+
+    def test_reload(self):
+        """ Test plugins reloading """
+        connection = Mock()
+        service = self._get_plugins_svc(ctl_subsystem.Service)
+        message_service = service.application.registry.message_plugin_provider
+        message_service.load()
+        message_plugins = message_service.plugins
+        reload_command = service.get_command('reload')
+
+        reload_command(command=ctl_network.Message(name='reload', args={}), source=connection)
+
+        connection.send.assert_has_calls([
+            call(b'{"text": "Plugin modules reloaded: none"}\x00'),
+            call(('{"text": "Plugins loaded: %d message, 0 helper, %d ctl"}\x00'
+                  % (len(message_plugins), len(service.plugins))).encode()),
+        ])
+        self.assertIsNot(service.get_command('reload'), reload_command)
+        self.assertIsNot(message_service.plugins, message_plugins)
+        self.assertEqual(list(map(str, message_service.plugins)), list(map(str, message_plugins)))
+
+        connection.reset_mock()
+        with patch.object(LoaderService, 'get_pinned', return_value=['dewyatochka.plugins.anidb']):
+            service.get_command('reload')(command=ctl_network.Message(name='reload', args={}), source=connection)
+        self.assertEqual(connection.send.call_args_list[1], call(
+            b'{"text": "Plugin modules not reloaded (bootstrap / daemon plugins, restart required): '
+            b'dewyatochka.plugins.anidb"}\x00'
+        ))
+
     def test_activity_info(self):
         """ Test chat activity info registration """
         importlib.reload(builtins)  # Statistics reset
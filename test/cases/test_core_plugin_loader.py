@@ -3,8 +3,10 @@
 """ Tests suite for dewyatochka.core.plugin.loader """
 
 import unittest
+from unittest.mock import Mock
 
 from dewyatochka.core.plugin.loader import *
+from dewyatochka.core.plugin.base import PluginEntry
 from dewyatochka.core.application import VoidApplication
 
 
@@ -22,3 +24,20 @@ class TestLoaderService(unittest.TestCase):
         application.depend(LoaderService)
 
         self.assertIsInstance(application.registry.plugins_loader, LoaderService)
+
+    def test_get_commands(self):
+        """ Test command entries query """
+        entries = (PluginEntry(Mock(), {'command': 'foo'}), PluginEntry(Mock(), {}),
+                   PluginEntry(Mock(), {'command': 'bar'}), PluginEntry(Mock(), {'command': 'foo'}))
+        loader1 = Mock()
+        loader1.get_entries.return_value = entries[:2]
+        loader2 = Mock()
+        loader2.get_entries.return_value = entries[2:]
+
+        service = LoaderService(VoidApplication())
+        service.__class__ = type('_LoaderService', (LoaderService,), {'loaders': [loader1, loader2]})
+
+        self.assertEqual(service.get_entries('command'), entries)
+        loader1.get_entries.assert_called_once_with(service, 'command')
+        self.assertEqual(service.get_commands('command'), {'foo': entries[0], 'bar': entries[2]})
+        self.assertEqual(service.get_commands('command', 'name'), {})
@@ -2,11 +2,13 @@
 
 """ Tests suite for dewyatochka.core.plugin.loader.internal """
 
+import json
 import importlib
+import tempfile
 from os import path
 
 import unittest
-from unittest.mock import patch, Mock, call
+from unittest.mock import patch, Mock, call, ANY
 
 from dewyatochka.core.plugin.loader import internal
 
@@ -30,10 +32,41 @@ class TestEntryPoint(unittest.TestCase):
         self.assertEqual(internal._entry_points['foo'][0].plugin, _fn)
         self.assertEqual(internal._entry_points['foo'][0].params, {'type': 'foo', 'bar': 'baz'})
 
+    def test_get_entry(self):
+        """ Test entry point lookup by params """
+        def _fn():
+            pass
+
+        internal.entry_point('get_entry', command='foo', services=None)(_fn)
+        self.assertIs(internal.get_entry('get_entry', command='foo').plugin, _fn)
+        self.assertIsNone(internal.get_entry('get_entry', command='bar'))
+        self.assertIsNone(internal.get_entry('get_entry_unknown', command='foo'))
+
 
 class TestLoader(unittest.TestCase):
     """ Covers dewyatochka.core.plugin.loader.internal.Loader """
 
+    def test_get_entries(self):
+        """ Test entries query by type """
+        internal.Loader.lock_state()
+        service = Mock()
+        service.accepts = ['get_entries_b', 'get_entries_a']
+
+        fn1, fn2, fn3 = Mock(__module__='foo'), Mock(__module__='foo'), Mock(__module__='foo')
+        internal.entry_point('get_entries_a')(fn1)
+        internal.entry_point('get_entries_b')(fn2)
+
+        loader = internal.Loader()
+        entries = loader.get_entries(service, 'get_entries_a', 'get_entries_b')
+        self.assertEqual([entry.plugin for entry in entries], [fn1, fn2])
+        self.assertIs(loader.get_entries(service, 'get_entries_b', 'get_entries_a'), entries)
+        self.assertEqual([entry.plugin for entry in loader.load(service)], [fn1, fn2])
+        self.assertEqual(loader.get_entries(service, 'get_entries_c'), ())
+
+        # Cache is dropped on registration
+        internal.entry_point('get_entries_a')(fn3)
+        self.assertEqual([entry.plugin for entry in loader.get_entries(service, 'get_entries_a')], [fn1, fn3])
+
     @patch('importlib.import_module')
     @patch('dewyatochka.plugins')
     @patch('dewyatochka.core.plugin.builtins.register_entry_points')
@@ -88,3 +121,260 @@ class TestLoader(unittest.TestCase):
         importlib_mock.side_effect = Exception
         internal.Loader().load(plugins_service)
         self.assertEqual(application.registry.log().error.call_count, 2)
+
+    @patch('importlib.import_module')
+    @patch('dewyatochka.plugins')
+    @patch('dewyatochka.core.plugin.builtins.register_entry_points')
+    def test_lazy_load(self, _, plugins_pkg_mock, importlib_mock):
+        """ Test plugins registration from index with postponed import """
+        class _PluginService(Service):
+            accepts = ['foo']
+
+        def _importlib_stub(name):
+            if name == 'dewyatochka.plugins.module':
+                def _plugin(**kwargs):
+                    return kwargs
+                _plugin.__module__ = name
+                internal.entry_point('foo', services=['bar'], command='baz')(_plugin)
+        importlib_mock.side_effect = _importlib_stub
+
+        plugins_pkg_mock.__file__ = path.realpath(path.sep.join(
+            (path.dirname(__file__), '..', 'files', 'plugin', 'fake_package', '__init__.py')
+        ))
+        plugins_pkg_mock.__name__ = 'dewyatochka.plugins'
+
+        application = VoidApplication()
+        application.depend(Mock(), 'extensions_config')
+        application.depend(Mock(), 'log')
+        application.depend(_PluginService)
+        plugins_service = application.registry.get_service(_PluginService)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        index_path = path.join(directory.name, 'plugins.json')
+
+        # Index is built on the first start
+        importlib.reload(internal)
+        entries = internal.Loader(index_path).load(plugins_service)
+        self.assertEqual(importlib_mock.call_count, 2)
+        self.assertEqual([entry.params for entry in entries], [{'type': 'foo', 'services': ['bar'], 'command': 'baz'}])
+        with open(index_path) as index_file:
+            index = json.load(index_file)['modules']
+        self.assertEqual(index['dewyatochka.plugins.module']['entries'],
+                         [['_plugin', {'type': 'foo', 'services': ['bar'], 'command': 'baz'}]])
+        self.assertEqual(index['dewyatochka.plugins.package']['entries'], [])
+
+        # Modules are imported on the first plugin call then
+        importlib.reload(internal)
+        importlib_mock.reset_mock()
+        entries = internal.Loader(index_path).load(plugins_service)
+        importlib_mock.assert_not_called()
+        self.assertEqual([entry.params for entry in entries], [{'type': 'foo', 'services': ['bar'], 'command': 'baz'}])
+        self.assertEqual((entries[0].plugin.__module__, entries[0].plugin.__name__),
+                         ('dewyatochka.plugins.module', '_plugin'))
+
+        self.assertEqual(entries[0].plugin(foo='bar'), {'foo': 'bar'})
+        self.assertEqual(entries[0].plugin(), {})
+        importlib_mock.assert_called_once_with('dewyatochka.plugins.module')
+        self.assertEqual(len(internal.Loader(index_path).load(plugins_service)), 1)
+
+        # Stale index
+        importlib.reload(internal)
+        importlib_mock.side_effect = None
+        plugin = internal.Loader(index_path).load(plugins_service)[0].plugin
+        self.assertRaises(internal.PluginRegistrationError, plugin)
+
+        # Profiling ignores index
+        importlib.reload(internal)
+        importlib_mock.reset_mock()
+        internal.Loader(index_path, profile_imports=True).load(plugins_service)
+        self.assertEqual(importlib_mock.call_count, 2)
+        self.assertEqual(application.registry.log().info.call_args_list[0][0][0], 'Plugin modules imported in %.3fs')
+
+    @patch('importlib.import_module')
+    @patch('dewyatochka.plugins')
+    @patch('dewyatochka.core.plugin.builtins.register_entry_points')
+    def test_lazy_load_commands(self, _, plugins_pkg_mock, importlib_mock):
+        """ Test module with chat and ctl commands import on the first call of a plugin registered from index """
+        from dewyatochka.core.plugin.subsystem.message.py_entry import chat_command
+        from dewyatochka.core.plugin.subsystem.control.py_entry import control
+
+        class _PluginService(Service):
+            accepts = ['chat_command', 'ctl']
+
+        def _importlib_stub(name):
+            if name == 'dewyatochka.plugins.module':
+                def _chat_plugin(**_):
+                    return 'chat'
+
+                def _ctl_plugin(**_):
+                    return 'ctl'
+                _chat_plugin.__module__ = _ctl_plugin.__module__ = name
+                chat_command('foo')(_chat_plugin)
+                control('bar', 'Bar command')(_ctl_plugin)
+        importlib_mock.side_effect = _importlib_stub
+
+        plugins_pkg_mock.__file__ = path.realpath(path.sep.join(
+            (path.dirname(__file__), '..', 'files', 'plugin', 'fake_package', '__init__.py')
+        ))
+        plugins_pkg_mock.__name__ = 'dewyatochka.plugins'
+
+        application = VoidApplication()
+        application.depend(Mock(), 'extensions_config')
+        application.depend(Mock(), 'log')
+        application.depend(_PluginService)
+        plugins_service = application.registry.get_service(_PluginService)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        index_path = path.join(directory.name, 'plugins.json')
+
+        importlib.reload(internal)
+        internal.Loader(index_path).load(plugins_service)
+
+        importlib.reload(internal)
+        importlib_mock.reset_mock()
+        entries = internal.Loader(index_path).load(plugins_service)
+        importlib_mock.assert_not_called()
+
+        self.assertEqual([entry.plugin() for entry in entries], ['chat', 'ctl'])
+        importlib_mock.assert_called_with('dewyatochka.plugins.module')
+        self.assertEqual(internal.get_entry('ctl', name='module.bar').plugin(), 'ctl')
+        self.assertRaises(internal.PluginRegistrationError, chat_command, 'foo')
+
+    @patch('importlib.import_module')
+    @patch('dewyatochka.plugins')
+    @patch('dewyatochka.core.plugin.builtins.register_entry_points')
+    def test_reload(self, _, plugins_pkg_mock, importlib_mock):
+        """ Test changed plugin modules re-import """
+        class _PluginService(Service):
+            accepts = ['foo']
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name in ('__init__', 'module', 'other'):
+            with open(path.join(directory.name, name + '.py'), 'w') as module_file:
+                module_file.write('# v1')
+
+        def _importlib_stub(name):
+            with open(path.join(directory.name, name.split('.')[-1] + '.py')) as module_file:
+                version = module_file.read()
+            if 'error' in version:
+                raise ImportError(version)
+
+            def _plugin(**_):
+                pass
+            _plugin.__module__ = name
+            internal.entry_point('foo', version=version)(_plugin)
+        importlib_mock.side_effect = _importlib_stub
+
+        plugins_pkg_mock.__file__ = path.join(directory.name, '__init__.py')
+        plugins_pkg_mock.__name__ = 'dewyatochka.plugins'
+
+        application = VoidApplication()
+        application.depend(Mock(), 'extensions_config')
+        application.depend(Mock(), 'log')
+        application.depend(_PluginService)
+        plugins_service = application.registry.get_service(_PluginService)
+
+        importlib.reload(internal)
+        loader = internal.Loader()
+        self.assertEqual(loader.reload(plugins_service), [])
+        entries = loader.get_entries(plugins_service, 'foo')
+        self.assertEqual(sorted(entry.plugin.__module__ for entry in entries),
+                         ['dewyatochka.plugins.module', 'dewyatochka.plugins.other'])
+
+        # Nothing changed
+        self.assertEqual(loader.reload(plugins_service), [])
+        self.assertEqual(loader.get_entries(plugins_service, 'foo'), entries)
+
+        # Module changed
+        with open(path.join(directory.name, 'module.py'), 'w') as module_file:
+            module_file.write('# v2 ')
+        self.assertEqual(loader.reload(plugins_service), ['dewyatochka.plugins.module'])
+        versions = {entry.plugin.__module__: entry.params['version']
+                    for entry in loader.get_entries(plugins_service, 'foo')}
+        self.assertEqual(versions, {'dewyatochka.plugins.module': '# v2 ', 'dewyatochka.plugins.other': '# v1'})
+        self.assertEqual(len(loader.get_entries(plugins_service, 'foo')), 2)
+
+        # Previous version is kept on import error
+        with open(path.join(directory.name, 'module.py'), 'w') as module_file:
+            module_file.write('# error')
+        self.assertEqual(loader.reload(plugins_service), [])
+        self.assertEqual({entry.plugin.__module__: entry.params['version']
+                          for entry in loader.get_entries(plugins_service, 'foo')}, versions)
+        application.registry.log().error.assert_called_once_with('Failed to reload module %s: %s',
+                                                                 'dewyatochka.plugins.module', ANY)
+
+        # Disabled module is dropped
+        def _section_stub(name, **_):
+            if name == 'other':
+                raise SectionRetrievingError()
+        application.registry.extensions_config.section.side_effect = _section_stub
+        self.assertEqual(loader.reload(plugins_service), ['dewyatochka.plugins.other'])
+        self.assertEqual([entry.plugin.__module__ for entry in loader.get_entries(plugins_service, 'foo')],
+                         ['dewyatochka.plugins.module'])
+
+    @patch('importlib.import_module')
+    @patch('dewyatochka.plugins')
+    @patch('dewyatochka.core.plugin.builtins.register_entry_points')
+    def test_reload_pinned(self, _, plugins_pkg_mock, importlib_mock):
+        """ Test modules with bootstrap / daemon plugins are not re-imported """
+        class _PluginService(Service):
+            accepts = ['bootstrap', 'foo']
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, plugin_type in (('__init__', ''), ('module', 'foo'), ('storage', 'bootstrap')):
+            with open(path.join(directory.name, name + '.py'), 'w') as module_file:
+                module_file.write(plugin_type)
+
+        def _importlib_stub(name):
+            with open(path.join(directory.name, name.split('.')[-1] + '.py')) as module_file:
+                plugin_type = module_file.read().split()[0]
+
+            def _plugin(**_):
+                pass
+            _plugin.__module__ = name
+            internal.entry_point(plugin_type)(_plugin)
+        importlib_mock.side_effect = _importlib_stub
+
+        plugins_pkg_mock.__file__ = path.join(directory.name, '__init__.py')
+        plugins_pkg_mock.__name__ = 'dewyatochka.plugins'
+
+        application = VoidApplication()
+        application.depend(Mock(), 'extensions_config')
+        application.depend(Mock(), 'log')
+        application.depend(_PluginService)
+        plugins_service = application.registry.get_service(_PluginService)
+
+        importlib.reload(internal)
+        loader = internal.Loader()
+        entries = loader.get_entries(plugins_service, 'bootstrap', 'foo')
+        self.assertEqual(importlib_mock.call_count, 2)
+
+        # Module with a bootstrap plugin changed
+        with open(path.join(directory.name, 'storage.py'), 'w') as module_file:
+            module_file.write('bootstrap v2')
+        self.assertEqual(loader.reload(plugins_service), [])
+        self.assertEqual(loader.get_pinned(plugins_service), ['dewyatochka.plugins.storage'])
+        self.assertEqual(importlib_mock.call_count, 2)
+        self.assertEqual(loader.get_entries(plugins_service, 'bootstrap', 'foo'), entries)
+        application.registry.log().warning.assert_called_once_with(
+            'Plugins from %s are run on start, restart is required to reload them', 'dewyatochka.plugins.storage'
+        )
+
+        # Module got a bootstrap plugin on change, previous version is kept
+        with open(path.join(directory.name, 'module.py'), 'w') as module_file:
+            module_file.write('bootstrap')
+        self.assertEqual(loader.reload(plugins_service), [])
+        self.assertEqual(sorted(loader.get_pinned(plugins_service)),
+                         ['dewyatochka.plugins.module', 'dewyatochka.plugins.storage'])
+        self.assertEqual(importlib_mock.call_count, 3)
+        self.assertEqual(loader.get_entries(plugins_service, 'bootstrap', 'foo'), entries)
+
+        # Restored on the next reload once not pinned any more
+        with open(path.join(directory.name, 'module.py'), 'w') as module_file:
+            module_file.write('foo v2')
+        self.assertEqual(loader.reload(plugins_service), ['dewyatochka.plugins.module'])
+        self.assertEqual(loader.get_pinned(plugins_service), ['dewyatochka.plugins.storage'])
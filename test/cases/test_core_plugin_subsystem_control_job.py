@@ -0,0 +1,154 @@
+# -*- coding=utf-8
+
+""" Tests suite for dewyatochka.core.plugin.subsystem.control.job """
+
+import socket
+import threading
+import unittest
+from unittest.mock import Mock, call, patch
+
+from dewyatochka.core.plugin.subsystem.control.job import *
+from dewyatochka.core.plugin.subsystem.control.service import Service, Wrapper, Output
+from dewyatochka.core.plugin.subsystem.control.network import Message
+from dewyatochka.core.application import VoidApplication
+from dewyatochka.core.plugin.base import PluginEntry
+
+
+def _wrap(plugin: callable):
+    """ Wrap a plugin into ctl environment
+
+    :param callable plugin:
+    :return Environment:
+    """
+    application = VoidApplication()
+    application.depend(Mock(), 'extensions_config')
+    application.depend(Mock(), 'log')
+
+    return Wrapper(Service(application)).wrap(PluginEntry(plugin, {}))
+
+
+class TestCancelToken(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.plugin.subsystem.control.job.CancelToken """
+
+    def test_cancel(self):
+        """ Test cancellation flag """
+        token = CancelToken()
+        self.assertFalse(token.cancelled)
+        token.raise_if_cancelled()
+
+        token.cancel()
+        self.assertTrue(token.cancelled)
+        self.assertRaises(JobCancelledError, token.raise_if_cancelled)
+
+
+class TestJobManager(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.plugin.subsystem.control.job.JobManager """
+
+    def test_output(self):
+        """ Test job output is replayed and streamed to clients attached """
+        proceed = threading.Event()
+
+        def _plugin(outp, **_):
+            outp.say('started')
+            proceed.wait(5)
+            outp.progress('%d%%', 50)
+            outp.say('completed')
+
+        jobs = JobManager()
+        job = jobs.start(Message(name='foo'), _wrap(_plugin))
+        self.assertEqual(job.id, 1)
+        self.assertIs(jobs.get(1), job)
+
+        connection = Mock()
+        attached = threading.Thread(target=job.attach, args=(Output(connection, Mock()),))
+        attached.start()
+        proceed.set()
+        attached.join(5)
+
+        self.assertTrue(job.finished)
+        self.assertEqual(job.status, JOB_STATUS_DONE)
+        connection.sendall.assert_has_calls([
+            call(b'{"text": "started"}\x00'),
+            call(b'{"progress": "50%"}\x00'),
+            call(b'{"text": "completed"}\x00'),
+        ])
+        self.assertTrue(job.attach(Output(Mock(), Mock()), 1))
+        self.assertTrue(str(job).startswith('#1 foo: done'))
+
+    def test_cancel(self):
+        """ Test cooperative job cancellation """
+        started = threading.Event()
+
+        def _plugin(outp, **_):
+            started.set()
+            while True:
+                outp.raise_if_cancelled()
+                started.wait(0.01)
+
+        jobs = JobManager()
+        job = jobs.start(Message(name='foo'), _wrap(_plugin))
+        started.wait(5)
+        jobs.cancel_all()
+
+        self.assertTrue(job.attach(Output(Mock(), Mock()), 5))
+        self.assertEqual(job.status, JOB_STATUS_CANCELLED)
+
+    @patch.object(Job, '_ATTACH_POLL_INTERVAL', 0.05)
+    def test_client_disconnected(self):
+        """ Test attached client is released on disconnection while job keeps running """
+        proceed = threading.Event()
+        blocked = threading.Event()
+
+        def _plugin(outp, **_):
+            outp.say('started')
+            proceed.wait(5)
+            outp.say('completed')
+
+        jobs = JobManager()
+        job = jobs.start(Message(name='foo'), _wrap(_plugin))
+        self.addCleanup(proceed.set)
+
+        server_side, client_side = socket.socketpair()
+        self.addCleanup(server_side.close)
+        attached = threading.Thread(target=job.attach, args=(Output(server_side, Mock()),))
+        attached.start()
+        self.assertEqual(client_side.recv(1024), b'{"text": "started"}\x00')
+
+        # A client stuck on sending blocks neither the job nor the others
+        slow_client = Mock()
+        slow_client.forward.side_effect = lambda _: blocked.wait(5)
+        self.addCleanup(blocked.set)
+        threading.Thread(target=job.attach, args=(slow_client,), daemon=True).start()
+        client_side.close()
+        attached.join(5)
+
+        self.assertFalse(attached.is_alive())
+        self.assertFalse(job.finished)
+
+        proceed.set()
+        self.assertTrue(job.attach(Output(Mock(), Mock()), 5))
+        self.assertEqual(job.status, JOB_STATUS_DONE)
+
+    def test_failure(self):
+        """ Test failed job status """
+        def _plugin(**_):
+            raise RuntimeError('Failure')
+
+        logger = Mock()
+        jobs = JobManager()
+        job = jobs.start(Message(name='foo'), _wrap(_plugin), logger)
+
+        self.assertTrue(job.attach(Output(Mock(), Mock()), 5))
+        self.assertEqual(job.status, JOB_STATUS_FAILED)
+        self.assertEqual(logger.error.call_args[0][:3], ('Job #%d (%s) failed: %s', 1, 'foo'))
+        self.assertRaises(RuntimeError, jobs.get, 2)
+
+    def test_finished_jobs_limit(self):
+        """ Test only a few finished jobs are remembered """
+        jobs = JobManager()
+        environment = _wrap(lambda **_: None)
+        for _ in range(30):
+            jobs.start(Message(name='foo'), environment).attach(Output(Mock(), Mock()), 5)
+
+        self.assertEqual(len(jobs.jobs), 21)
+        self.assertEqual(jobs.jobs[-1].id, 30)
@@ -3,7 +3,9 @@
 """ Tests suite for dewyatochka.core.plugin.subsystem.control.network """
 
 import os
+import time
 import random
+import threading
 import subprocess
 import socket as socket_
 
@@ -90,6 +92,76 @@ class TestStreamReader(unittest.TestCase):
         _do_test(4)
         _do_test(17)
 
+    def test_read_large_stream(self):
+        """ Test multi-MB streams are read in linear time """
+        messages = [{'text': 'Message #%d' % i} for i in range(100000)]
+        large_message = {'text': 'x' * 4 * 2 ** 20}
+        writer, reader_socket = socket_.socketpair()
+
+        def _write():
+            for message in messages:
+                writer.sendall(Message(**message).encode())
+            writer.sendall(Message(**large_message).encode())
+            writer.sendall(Message(**large_message).encode(length_prefixed=True))
+            writer.sendall(StreamReader.MSG_END)
+            writer.close()
+
+        writer_thread = threading.Thread(target=_write)
+        writer_thread.start()
+
+        reader = StreamReader(reader_socket)
+        started_at = time.monotonic()
+        for message in messages:
+            self.assertEqual(reader.read_message().data, message)
+        self.assertEqual(reader.read_message().data, large_message)
+        self.assertEqual(reader.read_message().data, large_message)
+        self.assertIsNone(reader.read_message())
+        self.assertLess(time.monotonic() - started_at, 10)
+
+        writer_thread.join()
+        reader_socket.close()
+
+
+class TestFrameDecoder(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.plugin.subsystem.control.network.FrameDecoder """
+
+    def _decode(self, stream: bytes, chunk_size: int) -> list:
+        """ Feed stream by chunks and collect frames decoded
+
+        :param bytes stream:
+        :param int chunk_size:
+        :return list:
+        """
+        decoder = FrameDecoder()
+        frames = []
+        for pos in range(0, len(stream), chunk_size):
+            decoder.feed(stream[pos:pos + chunk_size])
+            frame = decoder.next_frame()
+            while frame is not None:
+                frames.append(frame)
+                frame = decoder.next_frame()
+
+        self.assertTrue(decoder.ended)
+        return frames
+
+    def test_frames(self):
+        """ Test mixed delimited and length-prefixed frames decoding """
+        stream = Message(foo='bar').encode() \
+            + Message(foo='\0\x01').encode(length_prefixed=True) \
+            + Message(bar='baz').encode() \
+            + StreamReader.MSG_END \
+            + Message(ignored=True).encode()
+        expected = [b'{"foo": "bar"}', b'{"foo": "\\u0000\\u0001"}', b'{"bar": "baz"}']
+
+        for chunk_size in (1, 2, 5, 16, len(stream)):
+            self.assertEqual(self._decode(stream, chunk_size), expected)
+
+    def test_encode(self):
+        """ Test length-prefixed encoding """
+        self.assertEqual(Message(foo='bar').encode(length_prefixed=True), b'\x02\0\0\0\x0e{"foo": "bar"}')
+        self.assertEqual(Message.from_bytes(self._decode(Message(foo='bar').encode(True) + b'\x01\0', 1)[0]).data,
+                         {'foo': 'bar'})
+
 
 class TestSocketListener(unittest.TestCase):
     """ Tests suite for dewyatochka.core.plugin.subsystem.control.network.SocketListener """
@@ -141,60 +213,131 @@ class TestSocketListener(unittest.TestCase):
         os.unlink(self.socket_path)
         listener.close()  # Should be ignored
 
+    def _start_serving(self, listener: SocketListener, handler: callable, workers=2) -> threading.Thread:
+        """ Serve commands in a background thread
+
+        :param SocketListener listener:
+        :param callable handler:
+        :param int workers:
+        :return threading.Thread:
+        """
+        thread = threading.Thread(target=listener.serve, args=(handler, workers), daemon=True)
+        thread.start()
+        return thread
+
+    def _send_raw(self, data: bytes) -> bytes:
+        """ Send raw data to the listener and get the whole response
+
+        :param bytes data:
+        :return bytes:
+        """
+        connection = socket_.socket(socket_.AF_UNIX)
+        connection.connect(self.socket_path)
+        connection.sendall(data)
+        connection.shutdown(socket_.SHUT_WR)
+
+        response = b''
+        chunk = connection.recv(4096)
+        while chunk:
+            response += chunk
+            chunk = connection.recv(4096)
+        connection.close()
+
+        return response
+
     def test_commands(self):
-        """ Test commands input stream """
-        class _ListenerMock(SocketListener):
-            """ Listener with socket mocked """
-
-            # Socket mock
-            client_connection_mock = Mock()
-            socket_mock = _socket = Mock()
-
-            @classmethod
-            def set_messages(cls, *data: bytes):
-                """ Set fake data to be sent by a client
-
-                :param bytes data: Fake data
-                :return None:
-                """
-                cls.socket_mock.reset_mock()
-                cls.client_connection_mock.reset_mock()
-
-                cls.client_connection_mock.recv.side_effect = data
-                cls.socket_mock.accept.side_effect = [(cls.client_connection_mock, None)]
-
-        # On valid message
-        valid_command = b'{"name": "foo", "payload": "bar"}\0\x01\0'
-        _ListenerMock.set_messages(valid_command)
-        with _ListenerMock() as listener:
-            commands = [c[0] for c in listener.commands]
-        self.assertEqual(len(commands), 1)
-        self.assertDictEqual(commands[0].data, {'name': 'foo', 'payload': 'bar'})
-        _ListenerMock.client_connection_mock.send.assert_called_once_with(b'\x01\0')
-        _ListenerMock.client_connection_mock.shutdown.assert_called_once_with(socket_.SHUT_RDWR)
-        _ListenerMock.client_connection_mock.close.assert_called_once_with()
-
-        # On unnamed message
-        _ListenerMock.set_messages(b'{"payload": "bar"}\0\x01\0', valid_command)
-        with _ListenerMock() as listener:
-            self.assertRaises(StopIteration, next, listener.commands)
-            _ListenerMock.client_connection_mock.send.assert_called_once_with(b'Message format unrecognized')
-
-        # On client communication timeout
-        _ListenerMock.set_messages(socket_.timeout)
-        with _ListenerMock() as listener:
-            self.assertRaises(StopIteration, next, listener.commands)
-
-        # On broken connection
-        _ListenerMock.set_messages(valid_command)
-        _ListenerMock.client_connection_mock.send.side_effect = BrokenPipeError
-        with _ListenerMock() as listener:
-            commands = [c[0] for c in listener.commands]
-        # Should yield one command with no errors
-        self.assertEqual(len(commands), 1)
+        """ Test commands handling """
+        commands = []
+
+        def _handler(command, connection):
+            commands.append(command.data)
+            connection.send(Message(text='ok').encode())
+
+        with SocketListener(self.socket_path) as listener:
+            thread = self._start_serving(listener, _handler)
+
+            # On valid message
+            self.assertEqual(self._send_raw(b'{"name": "foo", "payload": "bar"}\0\x01\0'), b'{"text": "ok"}\0\x01\0')
+            self.assertEqual(commands, [{'name': 'foo', 'payload': 'bar'}])
+
+            # On unnamed / malformed message
+            self.assertEqual(self._send_raw(b'{"payload": "bar"}\0\x01\0'), b'Message format unrecognized')
+            self.assertEqual(self._send_raw(b'\x01\0'), b'Message format unrecognized')
+            self.assertEqual(len(commands), 1)
+
+            # On message sent in parts
+            connection = socket_.socket(socket_.AF_UNIX)
+            connection.connect(self.socket_path)
+            connection.sendall(b'{"name": ')
+            time.sleep(0.05)
+            connection.sendall(b'"baz"}\0')
+            self.assertEqual(connection.makefile('rb').read(), b'{"text": "ok"}\0\x01\0')
+            connection.close()
+
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
 
         # On closed state
-        self.assertRaises(StopIteration, next, listener.commands)
+        listener.serve(_handler)
+
+    def test_concurrency(self):
+        """ Test a slow command does not block other clients """
+        release = threading.Event()
+
+        def _handler(command, connection):
+            if command.name == 'slow':
+                release.wait(5)
+            connection.send(Message(text=command.name).encode())
+
+        with SocketListener(self.socket_path) as listener:
+            thread = self._start_serving(listener, _handler)
+
+            slow_response = []
+            slow_client = threading.Thread(target=lambda: slow_response.append(self._send_raw(b'{"name": "slow"}\0')))
+            slow_client.start()
+
+            started_at = time.monotonic()
+            self.assertEqual(self._send_raw(b'{"name": "fast"}\0'), b'{"text": "fast"}\0\x01\0')
+            self.assertLess(time.monotonic() - started_at, 1)
+            self.assertTrue(slow_client.is_alive())
+
+            release.set()
+            slow_client.join(1)
+            self.assertEqual(slow_response, [b'{"text": "slow"}\0\x01\0'])
+
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def test_shutdown(self):
+        """ Test idle clients are dropped and running commands are completed on close """
+        started = threading.Event()
+
+        def _handler(command, connection):
+            started.set()
+            time.sleep(0.2)
+            connection.send(Message(text=command.name).encode())
+
+        listener = SocketListener(self.socket_path)
+        listener._CLIENT_TIMEOUT = 0.1
+        listener.open()
+        thread = self._start_serving(listener, _handler)
+
+        idle_client = socket_.socket(socket_.AF_UNIX)
+        idle_client.connect(self.socket_path)
+        self.assertEqual(idle_client.recv(4096), b'')
+        idle_client.close()
+
+        response = []
+        client = threading.Thread(target=lambda: response.append(self._send_raw(b'{"name": "foo"}\0')))
+        client.start()
+        started.wait(1)
+
+        listener.close()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        client.join(1)
+        self.assertEqual(response, [b'{"text": "foo"}\0\x01\0'])
 
 
 class TestClient(unittest.TestCase):
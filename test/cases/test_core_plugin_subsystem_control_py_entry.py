@@ -12,16 +12,19 @@ from dewyatochka.core.plugin.exceptions import PluginRegistrationError
 class TestControl(unittest.TestCase):
     """ Tests suite for dewyatochka.core.plugin.subsystem.control.py_entry.control """
 
+    @patch('dewyatochka.core.plugin.subsystem.control.py_entry.get_entry')
     @patch('dewyatochka.core.plugin.subsystem.control.py_entry.entry_point')
-    def test_decorator(self, entry_point_mock):
+    def test_decorator(self, entry_point_mock, get_entry_mock):
         """ Test @control decorator """
         def _entry():
             pass
 
+        get_entry_mock.side_effect = [None, None, object()]
         control('name1', 'description1', services=['service1', 'service2'])(_entry)
         control('name2', 'description2')(_entry)
 
         self.assertRaises(PluginRegistrationError, control('name2', 'description2'), _entry)
+        get_entry_mock.assert_called_with('ctl', name='test_core_plugin_subsystem_control_py_entry.name2')
         entry_point_mock.assert_has_calls([
             call('ctl', services=['service1', 'service2'],
                  name='test_core_plugin_subsystem_control_py_entry.name1',
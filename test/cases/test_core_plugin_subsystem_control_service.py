@@ -12,6 +12,7 @@ from unittest.mock import call, Mock, ANY
 
 from dewyatochka.core.plugin.subsystem.control.service import *
 from dewyatochka.core.plugin.subsystem.control.network import Message
+from dewyatochka.core.plugin.subsystem.control.job import CancelToken, JobCancelledError
 from dewyatochka.core.application import VoidApplication, Registry
 from dewyatochka.core.plugin.base import PluginEntry
 
@@ -51,6 +52,16 @@ class TestOutput(unittest.TestCase):
             call.info('no_args_say(%s)'),
         ])
 
+    def test_write(self):
+        """ Test bulky output is not logged """
+        socket_mock = Mock()
+        logger_mock = Mock()
+
+        Output(socket_mock, logger_mock).write('write(%s)', 'arg1')
+
+        socket_mock.send.assert_called_once_with(b'{"text": "write(arg1)"}\x00')
+        self.assertEqual(logger_mock.mock_calls, [])
+
     def test_disconnected_client(self):
         """ Test BrokenPipeError handling on unexpected client disconnect """
         socket_mock = Mock()
@@ -67,6 +78,25 @@ class TestOutput(unittest.TestCase):
         logger_mock.info.assert_has_calls([call('info(%d)', 1), call('info(%d)', 2), call('info(%d)', 3)])
 
 
+    def test_progress(self):
+        """ Test progress messages and cancellation checks """
+        socket_mock = Mock()
+        logger_mock = Mock()
+        cancel_token = CancelToken()
+
+        output_wrapper = Output(socket_mock, logger_mock, cancel_token)
+        output_wrapper.progress('progress(%d%%)', 50)
+        output_wrapper.raise_if_cancelled()
+        self.assertFalse(output_wrapper.cancelled)
+
+        cancel_token.cancel()
+        self.assertTrue(output_wrapper.cancelled)
+        self.assertRaises(JobCancelledError, output_wrapper.raise_if_cancelled)
+
+        socket_mock.send.assert_called_once_with(b'{"progress": "progress(50%)"}\x00')
+        logger_mock.progress.assert_called_once_with('progress(%d%%)', 50)
+
+
 class TestWrapper(unittest.TestCase):
     """ Tests suite for dewyatochka.core.plugin.subsystem.control.service.Wrapper """
 
@@ -115,14 +145,12 @@ class TestService(unittest.TestCase):
 
     def test_loading(self):
         """ Test plugins loading """
-        loader_mock = Mock()
-        loader_mock.load.return_value = [
+        loader_service_mock = Mock()
+        loader_service_mock.get_entries.return_value = (
             PluginEntry(lambda **_: None, dict(name='cmd1')),
             PluginEntry(lambda **_: None, dict(name='cmd2')),
             PluginEntry(lambda **_: None, dict(name='cmd1')),
-        ]
-        loader_service_mock = Mock()
-        loader_service_mock.loaders = [loader_mock]
+        )
 
         application = VoidApplication()
         application.depend(loader_service_mock, 'plugins_loader')
@@ -141,6 +169,12 @@ class TestService(unittest.TestCase):
         self.assertIsInstance(service.get_command('cmd2'), Environment)
         self.assertRaises(RuntimeError, service.get_command, 'cmd3')
 
+        # Jobs are kept on plugins reload
+        jobs, command = service.jobs, service.get_command('cmd1')
+        service.load()
+        self.assertIs(service.jobs, jobs)
+        self.assertIsNot(service.get_command('cmd1'), command)
+
     def test_accepts(self):
         """ Test acceptable plugin types getter """
         self.assertEqual(Service(VoidApplication()).accepts, ['ctl'])
@@ -70,14 +70,12 @@ class TestService(unittest.TestCase):
 
     def test_loading(self):
         """ Test plugins loading """
-        loader_mock = Mock()
-        loader_mock.load.return_value = [
+        loader_service_mock = Mock()
+        loader_service_mock.get_entries.return_value = (
             PluginEntry(lambda **_: None, dict(type='schedule', schedule='@minutely')),
             PluginEntry(lambda **_: None, dict(type='bootstrap')),
             PluginEntry(lambda **_: None, dict(type='daemon')),
-        ]
-        loader_service_mock = Mock()
-        loader_service_mock.loaders = [loader_mock]
+        )
 
         application = VoidApplication()
         application.depend(loader_service_mock, 'plugins_loader')
@@ -93,6 +91,11 @@ class TestService(unittest.TestCase):
         self.assertEqual(len(service.daemon_plugins), 1)
         self.assertEqual(len(service.bootstrap_plugins), 1)
 
+        schedule_plugins = service.schedule_plugins
+        service.load()
+        self.assertEqual(len(service.schedule_plugins), 1)
+        self.assertIsNot(service.schedule_plugins, schedule_plugins)
+
     def test_accepts(self):
         """ Test acceptable plugin types getter """
         self.assertEqual(set(Service(VoidApplication()).accepts), {'schedule', 'daemon', 'bootstrap'})
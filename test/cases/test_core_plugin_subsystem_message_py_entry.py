@@ -34,13 +34,16 @@ class TestChatMessage(unittest.TestCase):
 class TestChatCommand(unittest.TestCase):
     """ Tests suite for dewyatochka.core.plugin.subsystem.message.py_entry.chat_command """
 
+    @patch('dewyatochka.core.plugin.subsystem.message.py_entry.get_entry')
     @patch('dewyatochka.core.plugin.subsystem.message.py_entry.entry_point')
-    def test_decorator(self, entry_point_mock):
+    def test_decorator(self, entry_point_mock, get_entry_mock):
         """ Test @chat_command decorator """
+        get_entry_mock.side_effect = [None, None, object()]
         chat_command('name1', services=['service1', 'service2'])(_entry)
         chat_command('name2')(_entry)
 
         self.assertRaises(PluginRegistrationError, chat_command, 'name2')
+        get_entry_mock.assert_called_with('chat_command', command='name2')
         entry_point_mock.assert_has_calls([
             call('chat_command', services=['service1', 'service2'], command='name1'),
             call()(_entry),
@@ -3,7 +3,7 @@
 """ Tests suite for dewyatochka.core.plugin.subsystem.message.service """
 
 import unittest
-from unittest.mock import Mock, call
+from unittest.mock import Mock, call, patch
 
 from dewyatochka.core.plugin.subsystem.message.service import *
 
@@ -103,9 +103,16 @@ class TestEnvironment(unittest.TestCase):
         text_message = TextMessage(_Participant('1'), _Participant('2'), text='text')
 
         Environment(_plugin, Registry(), _ChatManagerImpl(VoidApplication()), _TrueMatcher())(message=text_message)
-        Environment(_plugin, Registry(), _ChatManagerImpl(VoidApplication()), _FalseMatcher())(message=text_message)
+        skipped = Environment(_plugin, Registry(), _ChatManagerImpl(VoidApplication()), _FalseMatcher())
+        invocations = skipped._metrics[0].value.count
+        with patch('dewyatochka.core.plugin.base.tracer') as tracer_mock:
+            skipped(message=text_message)
         callable_mock.assert_called_once_with()
 
+        # Messages not matched are neither traced nor measured
+        tracer_mock.trace.assert_not_called()
+        self.assertEqual(skipped._metrics[0].value.count, invocations)
+
 
 class TestWrapper(unittest.TestCase):
     """ Tests suite for dewyatochka.core.plugin.subsystem.message.service.Wrapper """
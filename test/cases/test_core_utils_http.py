@@ -2,9 +2,20 @@
 
 """ Tests suite for dewyatochka.core.utils.http """
 
+import io
+import os
+import gzip
+import zlib
+import shutil
+import tempfile
+import threading
 import unittest
-from unittest.mock import patch, call
+from urllib.parse import urlparse, parse_qs
+from unittest.mock import patch, call, PropertyMock
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
 
+from dewyatochka.core.application import VoidApplication
 from dewyatochka.core.utils.http import *
 from dewyatochka import __version__
 
@@ -99,3 +110,311 @@ class TestWebClient(unittest.TestCase):
         )
         document_text = WebClient('localhost').get('/')('body')[0].text.strip()
         self.assertEqual(document_text, 'Привет, мир!!')
+
+    @patch('dewyatochka.core.utils.http.HTTPConnection')
+    def test_html_encoding(self, http_connection_mock):
+        """ Test html-doc encoding detection """
+        text = 'Привет, мир!!'
+        cases = (
+            # Body, body encoding, content-type header
+            ('<meta charset="koi8-r"><p>%s</p>' % text, 'koi8-r', 'text/html; charset=cp1251'),
+            ('<META CONTENT="text/html; charset=windows-1251" HTTP-EQUIV="content-type"><p>%s</p>' % text,
+             'cp1251', 'text/html'),
+            ('<!-- <meta charset="koi8-r"> --><p>%s</p>' % text, 'cp1251', 'text/html; charset=cp1251'),
+            ('<p>%s</p>' % text, 'cp1251', 'text/html; charset=cp1251'),
+            ('<meta charset="no-such-charset"><p>%s</p>' % text, 'cp1251', 'text/html; charset=cp1251'),
+            ('<meta charset="utf-16"><p>%s</p>' % text, 'utf-8', 'text/html'),
+            ('\ufeff<meta charset="cp1251"><p>%s</p>' % text, 'utf-8', 'text/html'),
+            ('<!-- %s --><meta charset="koi8-r"><p>%s</p>' % ('x' * 4096, text), 'cp1251', 'text/html; charset=cp1251'),
+        )
+
+        for body, encoding, content_type in cases:
+            self._setup_response(http_connection_mock, body.encode(encoding), content_type)
+            self.assertEqual(WebClient('localhost').get('/')('p').text(), text)
+
+        self._setup_response(http_connection_mock, b'', 'text/html')
+        self.assertEqual(len(WebClient('localhost').get('/')), 0)
+
+
+class _TestHTTPServer(ThreadingMixIn, HTTPServer):
+    """ Local keep-alive HTTP server stand-in """
+
+    daemon_threads = True
+
+    def __init__(self):
+        """ Listen on a random local port """
+        super().__init__(('127.0.0.1', 0), _TestHTTPRequestHandler)
+        self.connections = []
+        self.drop_connections = False
+        self.statuses = []
+
+    @property
+    def port(self) -> int:
+        """ Get port server is bound to """
+        return self.server_address[1]
+
+    def handle_error(self, *_):
+        """ Ignore connections reset by client """
+        pass
+
+
+class _TestHTTPRequestHandler(BaseHTTPRequestHandler):
+    """ Responds with client port, drops connections silently if requested """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    # Content returned for /content uri
+    CONTENT = ''.join('Строка #%d\n' % i for i in range(50000)).encode()
+
+    def do_GET(self):
+        """ Handle GET request """
+        if self.client_address not in self.server.connections:
+            self.server.connections.append(self.client_address)
+
+        headers = {'Content-Type': 'text/plain; charset=utf-8'}
+        status = 200
+        if self.path.startswith('/cached'):
+            # Cacheable content, headers are set by query params
+            params = {param: values[0] for param, values in parse_qs(urlparse(self.path).query).items()}
+            if 'cc' in params:
+                headers['Cache-Control'] = params['cc']
+            if 'etag' in params:
+                headers['ETag'] = params['etag']
+            body = ('Content for %s' % params.get('etag')).encode()
+            if 'etag' in params and self.headers.get('If-None-Match') == params['etag']:
+                status, body = 304, b''
+        elif self.path.startswith('/content'):
+            body = self.CONTENT
+            encoding = self.path[len('/content/'):]
+            if encoding and encoding in self.headers.get('Accept-Encoding', ''):
+                headers['Content-Encoding'] = encoding
+                body = gzip.compress(body) if encoding == 'gzip' else zlib.compress(body)
+            elif encoding == 'raw-deflate':
+                headers['Content-Encoding'] = 'deflate'
+                compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+                body = compressor.compress(body) + compressor.flush()
+        else:
+            body = str(self.client_address[1]).encode()
+
+        self.server.statuses.append(status)
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        # Close connection with no "Connection: close" header so client still thinks it is alive
+        self.close_connection = self.server.drop_connections
+
+    def log_message(self, *_):
+        """ Keep silent """
+        pass
+
+
+class TestHTTPService(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.utils.http.HTTPService """
+
+    def setUp(self):
+        """ Start local server """
+        self._server = _TestHTTPServer()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        self._log_patcher = patch.object(HTTPService, 'log', new_callable=PropertyMock)
+        self._log_patcher.start()
+        self._service = HTTPService(VoidApplication())
+
+    def tearDown(self):
+        """ Stop local server """
+        self._service.close()
+        self._log_patcher.stop()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _get(self) -> str:
+        """ Do a request using a pooled client """
+        with self._service.client('127.0.0.1', self._server.port) as client:
+            return client.get('/')
+
+    def test_keep_alive(self):
+        """ Test connections are reused """
+        self.assertEqual(len({self._get() for _ in range(5)}), 1)
+        self.assertEqual(len(self._server.connections), 1)
+
+    def test_pool_size(self):
+        """ Test idle clients count is bounded """
+        with patch.object(HTTPService, 'pool_size', 1):
+            with self._service.client('127.0.0.1', self._server.port) as client1:
+                with self._service.client('127.0.0.1', self._server.port) as client2:
+                    self.assertIsNot(client1, client2)
+                    ports = {client1.get('/'), client2.get('/')}
+
+            self.assertIn(self._get(), ports)
+            self.assertEqual(len(self._server.connections), 2)
+
+    def test_idle_timeout(self):
+        """ Test idle clients eviction """
+        with patch('time.time', return_value=1000):
+            first_port = self._get()
+        with patch('time.time', return_value=1000 + HTTPService(VoidApplication()).idle_timeout + 1):
+            self.assertNotEqual(self._get(), first_port)
+
+    def test_stale_connection(self):
+        """ Test reconnection if connection has been closed by server """
+        self._server.drop_connections = True
+        ports = [self._get() for _ in range(3)]
+
+        self.assertEqual(len(set(ports)), 3)
+        self.assertEqual(len(self._server.connections), 3)
+
+    def test_error(self):
+        """ Test client is not returned to the pool on error """
+        with self.assertRaises(RuntimeError):
+            with self._service.client('127.0.0.1', self._server.port) as client:
+                client.get_raw('/')  # Response is not read, client is not reusable
+                raise RuntimeError()
+
+        with self._service.client('127.0.0.1', self._server.port) as client:
+            client.get_raw('/')
+        self._get()
+
+        self.assertEqual(len(self._server.connections), 3)
+
+    def test_compression(self):
+        """ Test compressed content transfer """
+        content = _TestHTTPRequestHandler.CONTENT
+
+        with self._service.client('127.0.0.1', self._server.port) as client:
+            for encoding in ('', 'gzip', 'deflate', 'raw-deflate'):
+                self.assertEqual(client.get('/content/' + encoding), content.decode())
+            for encoding in ('gzip', 'deflate'):
+                self.assertEqual(client.get_raw('/content/' + encoding).read(), content)  # Not negotiated
+
+        self.assertEqual(len(self._server.connections), 1)
+
+    def test_stream(self):
+        """ Test content streaming """
+        content = _TestHTTPRequestHandler.CONTENT
+
+        with self._service.client('127.0.0.1', self._server.port) as client:
+            for encoding in ('', 'gzip', 'deflate'):
+                chunks = list(client.get_stream('/content/' + encoding, chunk_size=1024))
+                self.assertEqual(b''.join(chunks), content)
+                self.assertGreater(len(chunks), 1)
+
+                output = io.BytesIO()
+                self.assertEqual(client.get_stream('/content/' + encoding, output=output), len(content))
+                self.assertEqual(output.getvalue(), content)
+
+            # Partially read response makes connection unusable, so it is reopened
+            stream = client.get_stream('/content/gzip', chunk_size=1024)
+            next(stream)
+            stream.close()
+            self.assertEqual(client.get('/content/gzip'), content.decode())
+
+        self.assertEqual(len(self._server.connections), 2)
+
+    def test_cache(self):
+        """ Test responses caching """
+        def _get(uri, cache_ttl=None, cache=True):
+            with self._service.client('127.0.0.1', self._server.port, cache_ttl=cache_ttl, cache=cache) as client:
+                return client.get(uri)
+
+        # Not requested
+        self.assertEqual([_get('/cached?cc=max-age=60&v=0', cache=False) for _ in range(2)], ['Content for None'] * 2)
+        self.assertEqual(self._server.statuses, [200, 200])
+        self._server.statuses.clear()
+
+        # Revalidated each time
+        self.assertEqual([_get('/cached?etag="v1"') for _ in range(3)], ['Content for "v1"'] * 3)
+        self.assertEqual(self._server.statuses, [200, 304, 304])
+        self.assertEqual(_get('/cached?etag="v2"'), 'Content for "v2"')
+
+        # Fresh
+        self._server.statuses.clear()
+        self.assertEqual([_get('/cached?cc=max-age=60') for _ in range(3)], ['Content for None'] * 3)
+        self.assertEqual(self._server.statuses, [200])
+
+        # TTL override
+        self._server.statuses.clear()
+        ports = {_get('/', 60, cache=False) for _ in range(3)}
+        self.assertEqual(len(ports), 1)
+        self.assertEqual(self._server.statuses, [200])
+
+        # Not stored
+        self._server.statuses.clear()
+        for _ in range(3):
+            _get('/cached?cc=no-store&etag="v3"')
+            _get('/?no-validators')
+        self.assertEqual(self._server.statuses, [200] * 6)
+
+    def test_name(self):
+        """ Test service name """
+        self.assertEqual(HTTPService.name(), 'http')
+
+
+class TestResponseCache(unittest.TestCase):
+    """ Tests suite for dewyatochka.core.utils.http.ResponseCache """
+
+    def setUp(self):
+        """ Create cache directory """
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Remove cache directory """
+        shutil.rmtree(self._directory)
+
+    def test_freshness(self):
+        """ Test freshness lifetime detection """
+        cache = ResponseCache()
+        with patch('time.time', return_value=1000):
+            cache.put('max-age', {'cache-control': 'public, max-age=30'}, b'')
+            cache.put('expires', {'Date': 'Sun, 06 Nov 1994 08:49:37 GMT',
+                                  'Expires': 'Sun, 06 Nov 1994 08:50:37 GMT'}, b'')
+            cache.put('invalid', {'Expires': '0', 'ETag': '"x"'}, b'')
+            cache.put('no-cache', {'Cache-Control': 'no-cache, max-age=30', 'Last-Modified': 'Sun, 06 Nov 1994'}, b'')
+            cache.put('override', {'Cache-Control': 'max-age=30'}, b'', 5)
+            cache.put('no-validators', {}, b'')
+            cache.put('no-store', {'Cache-Control': 'no-store', 'ETag': '"x"'}, b'', 5)
+
+        self.assertEqual(cache.get('max-age').expires_at, 1030)
+        self.assertEqual(cache.get('expires').expires_at, 1060)
+        self.assertEqual(cache.get('invalid').expires_at, 1000)
+        self.assertEqual(cache.get('no-cache').expires_at, 1000)
+        self.assertEqual(cache.get('override').expires_at, 1005)
+        self.assertIsNone(cache.get('no-validators'))
+        self.assertIsNone(cache.get('no-store'))
+
+    def test_lru(self):
+        """ Test memory cache size limit """
+        cache = ResponseCache(250)
+        headers = {'Cache-Control': 'max-age=60'}  # 24 bytes
+
+        cache.put('a', headers, b'a' * 50)
+        cache.put('b', headers, b'b' * 50)
+        cache.put('c', headers, b'c' * 50)
+        cache.get('a')
+        cache.put('d', headers, b'd' * 50)
+        cache.put('too-big', headers, b'x' * 250)
+
+        self.assertEqual([key for key in 'abcd' if cache.get(key) is not None], ['a', 'c', 'd'])
+        self.assertIsNone(cache.get('too-big'))
+
+    def test_disk(self):
+        """ Test disk cache """
+        headers = {'Cache-Control': 'max-age=60'}
+
+        cache = ResponseCache(100, self._directory)
+        cache.put('a', headers, b'a' * 1000)
+        self.assertEqual(cache.get('a').body, b'a' * 1000)
+
+        cache = ResponseCache(100, self._directory, 2500)
+        self.assertEqual(cache.get('a').headers, headers)
+        self.assertEqual(cache.get('a').body, b'a' * 1000)
+
+        for key in 'bcd':
+            cache.put(key, headers, key.encode() * 1000)
+        self.assertEqual(len(os.listdir(self._directory)), 2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('d').body, b'd' * 1000)
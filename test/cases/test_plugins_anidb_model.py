@@ -0,0 +1,132 @@
+# -*- coding=utf-8
+
+""" Tests suite for dewyatochka.plugins.anidb.model """
+
+import os
+import gzip
+import time
+import tempfile
+import unittest
+import tracemalloc
+from unittest.mock import patch
+
+from dewyatochka.plugins.anidb import model
+
+
+# Cartoons count in a synthetic dump for benchmark (close to the real AniDB one)
+_BENCHMARK_CARTOONS = 50000
+
+# Max memory allocated by python objects on import of the synthetic dump (bytes)
+_BENCHMARK_MEMORY_LIMIT = 32 * 2 ** 20
+
+
+def _write_source(file: str, titles: dict):
+    """ Write AniDB titles XML file
+
+    :param str file: File path
+    :param dict titles: aid -> main title
+    :return None:
+    """
+    with open(file, 'w') as xml_file:
+        xml_file.write('<animetitles>')
+        for aid, title in titles.items():
+            xml_file.write('<anime aid="%d"><title type="main" xml:lang="x-jat">%s</title></anime>' % (aid, title))
+        xml_file.write('</animetitles>')
+
+
+class TestImportData(unittest.TestCase):
+    """ Tests suite for dewyatochka.plugins.anidb.model.import_data """
+
+    def setUp(self):
+        """ Create an empty storage in a temporary directory
+
+        :return None:
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        storage = model.Storage()
+        previous_path = storage.path
+        self.addCleanup(setattr, storage, 'path', previous_path)
+        self.addCleanup(storage.close)
+
+        storage.path = os.path.join(directory.name, 'ani.db')
+        storage.create()
+
+        self.storage = storage
+        self.source = model.XmlDataSource(os.path.join(directory.name, 'animetitles.xml'))
+
+    def _get_titles(self) -> dict:
+        """ Get stored primary titles by aid
+
+        :return dict:
+        """
+        return {aid: self.storage.find_cartoon(str(aid) + ' title').primary_title
+                for aid in self.storage.cartoons_digests}
+
+    def test_import(self):
+        """ Test new, modified and removed cartoons sync """
+        _write_source(self.source.file, {1: '1 title', 2: '2 title', 3: '3 title'})
+        self.assertEqual(model.import_data(self.source), (3, 3, 0))
+
+        _write_source(self.source.file, {1: '1 title', 2: '2 title new', 4: '4 title'})
+        self.assertEqual(model.import_data(self.source), (3, 2, 1))
+        self.assertEqual(self._get_titles(), {1: '1 title', 2: '2 title new', 4: '4 title'})
+        self.assertFalse(os.path.exists(self.storage.path + '.sync'))
+
+    @patch('dewyatochka.plugins.anidb.model._SYNC_CHUNK_SIZE', 1)
+    def test_read_while_syncing(self):
+        """ Test readers see the previous data set until sync is completed """
+        _write_source(self.source.file, {1: '1 title', 2: '2 title'})
+        model.import_data(self.source)
+
+        seen = []
+        _write_source(self.source.file, {1: '1 title new', 3: '3 title'})
+        model.import_data(self.source, lambda _: seen.append(self._get_titles()))
+
+        self.assertEqual(seen, [{1: '1 title', 2: '2 title'}] * 2)
+        self.assertEqual(self._get_titles(), {1: '1 title new', 3: '3 title'})
+
+    @patch('dewyatochka.plugins.anidb.model._SYNC_CHUNK_SIZE', 1)
+    def test_abort(self):
+        """ Test data is kept as is if sync is aborted """
+        _write_source(self.source.file, {1: '1 title', 2: '2 title'})
+        model.import_data(self.source)
+
+        def _checkpoint(processed):
+            if processed > 1:
+                raise RuntimeError('Cancelled')
+
+        _write_source(self.source.file, {1: '1 title new', 3: '3 title'})
+        self.assertRaises(RuntimeError, model.import_data, self.source, _checkpoint)
+
+        self.assertEqual(self._get_titles(), {1: '1 title', 2: '2 title'})
+        self.assertFalse(os.path.exists(self.storage.path + '.sync'))
+
+    @unittest.skipUnless(os.environ.get('BENCHMARK'), 'Set BENCHMARK env var to run benchmarks')
+    def test_benchmark(self):
+        """ Measure import time and peak memory on a synthetic AniDB dump """
+        self.source = model.XmlDataSource(self.source.file + '.gz')
+        with gzip.open(self.source.file, 'wt', encoding='utf-8') as xml_file:
+            xml_file.write('<?xml version="1.0" encoding="UTF-8"?>\n<animetitles>\n')
+            for aid in range(1, _BENCHMARK_CARTOONS + 1):
+                xml_file.write('<anime aid="{0}"><title type="main" xml:lang="x-jat">Anime {0}</title>'
+                               '<title type="official" xml:lang="en">Official title {0}</title>'
+                               '<title type="syn" xml:lang="ru">Синоним {0}</title>'
+                               '<title type="short" xml:lang="en">A{0}</title></anime>\n'.format(aid))
+            xml_file.write('</animetitles>\n')
+
+        for sync, expected_stats in (('initial', (_BENCHMARK_CARTOONS, _BENCHMARK_CARTOONS, 0)),
+                                     ('unchanged', (_BENCHMARK_CARTOONS, 0, 0))):
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            try:
+                self.assertEqual(model.import_data(self.source), expected_stats)
+                elapsed = time.perf_counter() - started_at
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+            print('%s import: %.2fs, %.0f cartoons/s, peak memory %.1fMB'
+                  % (sync, elapsed, _BENCHMARK_CARTOONS / elapsed, peak / 2 ** 20))
+            self.assertLess(peak, _BENCHMARK_MEMORY_LIMIT)
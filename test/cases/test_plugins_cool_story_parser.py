@@ -0,0 +1,109 @@
+# -*- coding=utf-8
+
+""" Tests suite for dewyatochka.plugins.cool_story.parser """
+
+import os
+import json
+import time
+import unittest
+from os import path
+from unittest.mock import patch
+
+from lxml.html import fragment_fromstring
+from pyquery import PyQuery
+
+from dewyatochka.plugins.cool_story.parser import chattyfish, nya_sh
+from dewyatochka.plugins.cool_story.parser._base import parse_multiline_html
+
+
+# Root path to saved pages and posts parsed from them
+_PAGES_ROOT = path.dirname(__file__) + '/../files/cool_story'
+
+# Time to parse pages for on each parser benchmark run (sec.)
+_BENCHMARK_TIME = 2
+
+
+def _read_page(name: str) -> tuple:
+    """ Read saved page html and expected parsing result
+
+    :param str name: Page name
+    :return tuple: (html, expected posts, expected pages)
+    """
+    with open(path.join(_PAGES_ROOT, name + '.html')) as html_file, \
+            open(path.join(_PAGES_ROOT, name + '.json')) as json_file:
+        expected = json.load(json_file)
+
+        return html_file.read(), expected['posts'], expected['pages']
+
+
+class TestParseMultilineHtml(unittest.TestCase):
+    """ Tests suite for dewyatochka.plugins.cool_story.parser._base.parse_multiline_html """
+
+    def _parse(self, *paragraphs) -> str:
+        """ Parse paragraphs html
+
+        :param tuple paragraphs: Paragraphs html code
+        :return str:
+        """
+        return parse_multiline_html([fragment_fromstring(paragraph) for paragraph in paragraphs])
+
+    def test_lines(self):
+        """ Test paragraphs and line breaks """
+        self.assertEqual(self._parse('<p> a <b>b</b><br>c<br/><i>d<br >e</i> </p>', '<p>f</p>', '<p> <br> </p>'),
+                         'a b\nc\nd\ne\nf')
+        self.assertEqual(self._parse('<p>&lt;&amp;&gt;&nbsp;"</p>'), '&lt;&amp;&gt;\xa0"')
+
+    def test_serialized(self):
+        """ Test markup stripped from serialized html as is """
+        self.assertEqual(self._parse('<p>a<script>b < c</script>d</p>'), 'ab d')
+        self.assertEqual(self._parse('<p>a<style>p > b {}</style></p>'), 'ap > b {}')
+        self.assertEqual(self._parse('<p>a<!-- b --> c<!-- d\ne --></p>'), 'a c<!-- d\ne -->')
+        self.assertEqual(self._parse('<p>a<br class="b">c</p>'), 'ac')
+        self.assertEqual(self._parse('<p><span title="a\nb">c</span></p>', '<p>d</p>'), '<span title="a\nb">c\nd')
+
+
+class TestParsers(unittest.TestCase):
+    """ Tests suite for dewyatochka.plugins.cool_story.parser parsers on saved pages """
+
+    def assert_parsed(self, parser, page: str):
+        """ Check parsing result matches the one saved
+
+        :param AbstractParser parser:
+        :param str page: Page name
+        :return None:
+        """
+        html, expected_posts, expected_pages = _read_page(page)
+        posts = [[post.id, post.source, post.title, post.text, sorted(post.tags)]
+                 for post in parser.parse_page_html(html)]
+
+        self.assertEqual(posts, expected_posts)
+        self.assertEqual(parser._parse_pages_collection(PyQuery(html)), expected_pages)
+
+    def test_zadolba_li(self):
+        """ Test zadolba.li page parsing """
+        self.assert_parsed(chattyfish.ZadolbaLiParser(), 'zadolba_li')
+
+    def test_nya_sh(self):
+        """ Test nya.sh page parsing """
+        self.assert_parsed(nya_sh.Parser(), 'nya_sh')
+
+    @unittest.skipUnless(os.environ.get('BENCHMARK'), 'Set BENCHMARK env var to run benchmarks')
+    def test_benchmark(self):
+        """ Compare pages per second parsed by walking element trees and by stripping serialized html """
+        def _get_rate(parser, html: str) -> float:
+            started_at = time.perf_counter()
+            pages = 0
+            while time.perf_counter() - started_at < _BENCHMARK_TIME:
+                parser.parse_page_html(html)
+                pages += 1
+
+            return pages / (time.perf_counter() - started_at)
+
+        for parser, page in ((chattyfish.ZadolbaLiParser(), 'zadolba_li'), (nya_sh.Parser(), 'nya_sh')):
+            html = _read_page(page)[0]
+            rate = _get_rate(parser, html)
+            with patch('dewyatochka.plugins.cool_story.parser._base._collect_lines', return_value=False):
+                serialized_rate = _get_rate(parser, html)
+
+            print('%s: %.0f pages/s, %.0f pages/s serialized' % (page, rate, serialized_rate))
+            self.assertGreater(rate, serialized_rate)